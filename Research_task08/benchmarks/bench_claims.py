@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+bench_claims.py
+
+Speed and match parity of the single-pass claim extractor (claim_extractor.py) against
+the legacy NUMERIC_PATTERNS / COMPARATIVE_PATTERNS in validate_claims.py.
+
+- parity: per response, claims are compared as multisets of (claim_type, player, value)
+  with the player resolved through the ground-truth roster; counts of shared,
+  legacy-only and single-pass-only claims are reported per claim type, with examples
+  (--examples), plus how many validation statuses (true/false/unverifiable) each side
+  produces.
+- speed: both extractors over every response, --repeat times (best of --rounds).
+- scaling: one synthetic response of --long-sentences sentences with player mentions and
+  no comparative cue on a single line, where the legacy `{entity}.*cue` patterns rescan
+  the rest of the line from every mention.
+
+Usage:
+    python benchmarks/bench_claims.py
+    python benchmarks/bench_claims.py --runs benchmarks/corpus/runs.ndjson --repeat 1 --out bench_claims.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from collections import Counter, defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+import validate_claims  # noqa: E402
+from run_log import iter_records  # noqa: E402
+
+DEFAULT_RUNS = ROOT / "results" / "h1_runs.ndjson"
+DEFAULT_GT = ROOT / "data" / "lacrosse_clean.csv"
+
+
+def claim_keys(claims, gt) -> Counter:
+    keys = Counter()
+    for c in claims:
+        groups = c.get("groups") or []
+        player = gt.matcher.canonical(groups[0]) or groups[0] if groups and groups[0] else None
+        value = groups[1] if len(groups) > 1 else None
+        keys[(c["claim_type"], player, value)] += 1
+    return keys
+
+
+def time_extractor(fn, texts, repeat: int, rounds: int) -> float:
+    best = None
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for t in texts:
+                fn(t)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def extractors(gt) -> dict:
+    """The two extractors with the ground truth's roster patterns."""
+    patterns = gt.claim_patterns
+    return {"legacy": lambda text: validate_claims.extract_claims_legacy(text, patterns),
+            "single-pass": patterns.single_pass.extract}
+
+
+def parity(texts, gt, examples: int) -> dict:
+    legacy_fn, single_fn = extractors(gt).values()
+    per_type = defaultdict(Counter)
+    statuses = {"legacy": Counter(), "single-pass": Counter()}
+    samples = []
+    identical = 0
+    for text in texts:
+        legacy, single = legacy_fn(text), single_fn(text)
+        for name, claims in (("legacy", legacy), ("single-pass", single)):
+            statuses[name].update(validate_claims.validate_claim(c, gt)["validation"]["status"] for c in claims)
+        a, b = claim_keys(legacy, gt), claim_keys(single, gt)
+        for key, n in (a & b).items():
+            per_type[key[0]]["shared"] += n
+        for key, n in (a - b).items():
+            per_type[key[0]]["legacy_only"] += n
+        for key, n in (b - a).items():
+            per_type[key[0]]["single_pass_only"] += n
+        if a == b:
+            identical += 1
+        elif len(samples) < examples:
+            samples.append({"legacy_only": [list(k) for k in (a - b)], "single_pass_only": [list(k) for k in (b - a)],
+                            "response_text": text})
+    totals = Counter()
+    for c in per_type.values():
+        totals.update(c)
+    return {"responses": len(texts), "identical_responses": identical, "totals": dict(totals),
+            "per_type": {k: dict(v) for k, v in sorted(per_type.items())},
+            "statuses": {k: dict(v) for k, v in statuses.items()}, "examples": samples}
+
+
+def long_response(sentences: int) -> str:
+    parts = [f"Player {'ABC'[i % 3]} had a steady game with {i % 9} clearances and solid defense"
+             for i in range(sentences)]
+    return ". ".join(parts) + "."
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", default=str(DEFAULT_RUNS), help="Run log whose responses are extracted")
+    parser.add_argument("--gt", default=str(DEFAULT_GT), help="Ground truth CSV (roster for the claim patterns)")
+    parser.add_argument("--repeat", type=int, default=50, help="Passes over the responses per timing round")
+    parser.add_argument("--rounds", type=int, default=3, help="Timing rounds (best is reported)")
+    parser.add_argument("--long-sentences", default="100,200,400,800",
+                        help="Comma-separated sentence counts for the single-line scaling test")
+    parser.add_argument("--examples", type=int, default=3, help="Differing responses to include")
+    parser.add_argument("--out", default=None, help="Optional results JSON path")
+    args = parser.parse_args()
+
+    gt = validate_claims.load_inputs(Path(args.gt))
+    texts = [r.get("response_text") or "" for r in iter_records(Path(args.runs))]
+    chars = sum(len(t) for t in texts)
+
+    results = {"runs": args.runs, "parity": parity(texts, gt, args.examples), "speed": {}, "scaling": []}
+    for name, fn in extractors(gt).items():
+        seconds = time_extractor(fn, texts, args.repeat, args.rounds)
+        results["speed"][name] = {"seconds": seconds, "responses_per_s": len(texts) * args.repeat / seconds,
+                                  "mb_per_s": chars * args.repeat / seconds / 1e6}
+    for n in [int(v) for v in args.long_sentences.split(",") if v.strip()]:
+        text = long_response(n)
+        row = {"sentences": n, "chars": len(text)}
+        for name, fn in extractors(gt).items():
+            row[f"{name}_ms"] = time_extractor(fn, [text], 1, args.rounds) * 1000
+        results["scaling"].append(row)
+
+    p = results["parity"]
+    print(f"parity on {p['responses']} responses: {p['identical_responses']} identical; claims {p['totals']}")
+    for ctype, c in p["per_type"].items():
+        print(f"  {ctype:<15} {c}")
+    print(f"  statuses: {p['statuses']}")
+    for name, s in results["speed"].items():
+        print(f"{name:>12}: {s['seconds']:.3f}s for {args.repeat} passes  {s['responses_per_s']:.0f} responses/s  "
+              f"{s['mb_per_s']:.1f} MB/s")
+    for row in results["scaling"]:
+        print(f"single line, {row['sentences']:>5} sentences ({row['chars']} chars): legacy {row['legacy_ms']:.1f}ms  "
+              f"single-pass {row['single-pass_ms']:.1f}ms")
+    if args.out:
+        with open(args.out, "w", encoding="utf8") as fh:
+            json.dump(results, fh, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+bench_hedging.py
+
+Tail latency of dispatch.Dispatcher with and without hedging, against a local
+StandInProvider whose calls occasionally stall (--slow-rate at --slow-latency).
+Requests are issued from --concurrency threads under an AdaptiveLimiter, as
+run_experiment.py does, and p50/p95/p99 latency, hedges and cancels are reported
+for each mode (plus a deadline-only mode when --deadline is given).
+
+Usage:
+    python benchmarks/bench_hedging.py --requests 2000 --latency 0.02 --slow-rate 0.02 --slow-latency 1
+    python benchmarks/bench_hedging.py --deadline 0.5 --out bench_hedging.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from dispatch import DeadlineExceeded, Dispatcher, ProviderAdapter, StandInProvider  # noqa: E402
+from latency_report import percentile  # noqa: E402
+from rate_control import AdaptiveLimiter  # noqa: E402
+
+
+def run_mode(args, deadline=None, hedge=False) -> dict:
+    standin = StandInProvider(latency=args.latency, slow_latency=args.slow_latency, slow_rate=args.slow_rate,
+                              seed=args.seed)
+    dispatcher = Dispatcher({"standin": ProviderAdapter("standin", standin, cancellable=True)}, deadline=deadline,
+                            hedge=hedge, hedge_quantile=args.hedge_quantile, hedge_budget=args.hedge_budget,
+                            hedge_min_samples=args.hedge_min_samples)
+    limiter = AdaptiveLimiter(args.concurrency * 2, initial_limit=args.concurrency * 2)
+
+    def one(i):
+        limiter.acquire()
+        start = time.perf_counter()
+        try:
+            dispatcher.call(f"prompt {i}", "standin", "standin-1", 0.0, 64, limiter=limiter)
+        except DeadlineExceeded:
+            return (time.perf_counter() - start) * 1000, False
+        return (time.perf_counter() - start) * 1000, True
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(one, range(args.requests)))
+    wall = time.perf_counter() - start
+    latencies = sorted(ms for ms, _ in results)
+    return {"requests": args.requests, "wall_s": wall, "provider_calls": standin.calls,
+            "failed": sum(1 for _, ok in results if not ok),
+            **{f"latency_ms_p{q}": percentile(latencies, q) for q in (50, 95, 99)},
+            "latency_ms_max": latencies[-1], **dispatcher.stats}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.02, help="Normal stand-in latency (s)")
+    parser.add_argument("--slow-rate", type=float, default=0.02, help="Fraction of stalled calls")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency of a stalled call (s)")
+    parser.add_argument("--hedge-quantile", type=float, default=95.0)
+    parser.add_argument("--hedge-budget", type=float, default=0.1)
+    parser.add_argument("--hedge-min-samples", type=int, default=20)
+    parser.add_argument("--deadline", type=float, default=None, help="Also run a deadline-only mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Optional results JSON path")
+    args = parser.parse_args()
+
+    modes = {"baseline": run_mode(args), "hedged": run_mode(args, hedge=True)}
+    if args.deadline is not None:
+        modes["deadline"] = run_mode(args, deadline=args.deadline)
+    for name, r in modes.items():
+        print(f"{name:>9}: p50 {r['latency_ms_p50']:.0f}ms  p95 {r['latency_ms_p95']:.0f}ms  "
+              f"p99 {r['latency_ms_p99']:.0f}ms  max {r['latency_ms_max']:.0f}ms  calls {r['provider_calls']}  "
+              f"hedges {r['hedges']} ({r['hedge_wins']} won)  cancels {r['cancels']}  failed {r['failed']}")
+    if args.out:
+        with open(args.out, "w", encoding="utf8") as fh:
+            json.dump({"options": vars(args), "modes": modes}, fh, indent=2)
+        print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
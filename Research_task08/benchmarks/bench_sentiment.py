@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+bench_sentiment.py
+
+Compare sentiment.SentimentEngine with the original analyze_bias.simple_sentiment:
+1. identical scores on every response in the given runs files with the default POS/NEG sets;
+2. throughput on the default lexicon and on a synthetic lexicon of --lexicon-size stems.
+
+Usage:
+    python benchmarks/bench_sentiment.py --runs results/h1_runs.ndjson --repeat 200 --lexicon-size 5000
+"""
+
+import argparse
+import json
+import random
+import re
+import string
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from analyze_bias import NEG_WORDS, POS_WORDS, simple_sentiment  # noqa: E402
+from sentiment import SentimentEngine  # noqa: E402
+
+
+def reference_sentiment(text, pos_words, neg_words):
+    """simple_sentiment with the word sets as parameters (same O(words x lexicon) scan)."""
+    words = re.findall(r"\w+", text.lower())
+    pos = sum(1 for w in words if any(p in w for p in pos_words))
+    neg = sum(1 for w in words if any(p in w for p in neg_words))
+    return (pos - neg) / max(1, len(words))
+
+
+def load_texts(paths):
+    texts = []
+    for path in paths:
+        with open(path, "r", encoding="utf8") as fh:
+            for line in fh:
+                texts.append(json.loads(line).get("response_text") or "")
+    return texts
+
+
+def synthetic_lexicon(size, seed=0):
+    rng = random.Random(seed)
+    pos, neg = set(POS_WORDS), set(NEG_WORDS)
+    while len(pos) + len(neg) < size:
+        stem = "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 8)))
+        (pos if rng.random() < 0.5 else neg).add(stem)
+    return pos, neg
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", nargs="+", default=["results/h1_runs.ndjson"], help="NDJSON run logs")
+    parser.add_argument("--repeat", type=int, default=100, help="Repeat the corpus this many times for timing")
+    parser.add_argument("--lexicon-size", type=int, default=5000, help="Stems in the synthetic large lexicon")
+    args = parser.parse_args()
+
+    texts = load_texts(args.runs)
+    engine = SentimentEngine.from_word_sets(POS_WORDS, NEG_WORDS)
+    mismatches = sum(1 for t in texts if engine.score(t) != simple_sentiment(t))
+    corpus = texts * args.repeat
+    results = {"texts": len(texts), "parity_mismatches": mismatches, "timings": {}}
+
+    ref, ref_s = timed(lambda: [simple_sentiment(t) for t in corpus])
+    new, new_s = timed(lambda: SentimentEngine.from_word_sets(POS_WORDS, NEG_WORDS).score_batch(corpus))
+    results["timings"]["default_lexicon"] = {
+        "lexicon_size": len(POS_WORDS) + len(NEG_WORDS), "texts": len(corpus),
+        "reference_s": ref_s, "engine_s": new_s, "speedup": ref_s / new_s if new_s else None,
+        "identical": ref == new,
+    }
+
+    pos, neg = synthetic_lexicon(args.lexicon_size)
+    sample = corpus[: max(1, len(corpus) // 10)]  # the reference scan is too slow for the full corpus
+    ref, ref_s = timed(lambda: [reference_sentiment(t, pos, neg) for t in sample])
+    new, new_s = timed(lambda: SentimentEngine.from_word_sets(pos, neg).score_batch(sample))
+    results["timings"]["large_lexicon"] = {
+        "lexicon_size": len(pos) + len(neg), "texts": len(sample),
+        "reference_s": ref_s, "engine_s": new_s, "speedup": ref_s / new_s if new_s else None,
+        "identical": ref == new,
+    }
+
+    print(json.dumps(results, indent=2))
+    return 0 if mismatches == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+bench_startup.py
+
+Startup cost of the scripts/cli.py subcommands: median wall time over --repeat fresh
+interpreter runs, and which heavy modules (pandas, numpy, scipy, matplotlib, openai) each
+command imports (from `python -X importtime`). A reference row imports all heavy modules,
+i.e. what every invocation used to pay.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 10
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+CLI = str(ROOT / "scripts" / "cli.py")
+HEAVY = ("pandas", "numpy", "scipy", "matplotlib", "openai")
+
+
+def cases(tmpdir: Path):
+    return {
+        "cli --help": [CLI, "--help"],
+        "design --help": [CLI, "design", "--help"],
+        "run --help": [CLI, "run", "--help"],
+        "validate --help": [CLI, "validate", "--help"],
+        "analyze --help": [CLI, "analyze", "--help"],
+        "validate (results/h1_runs.ndjson)": [CLI, "validate", "--gt", str(ROOT / "data" / "lacrosse_clean.csv"),
+                                              "--runs", str(ROOT / "results" / "h1_runs.ndjson"),
+                                              "--out", str(tmpdir / "validations.ndjson")],
+        "reference: import all heavy modules": ["-c", "import pandas, scipy.stats, matplotlib.pyplot, openai"],
+    }
+
+
+def heavy_imports(args):
+    proc = subprocess.run([sys.executable, "-X", "importtime"] + args, capture_output=True, text=True, cwd=ROOT)
+    loaded = set()
+    for line in proc.stderr.splitlines():
+        name = line.rsplit("|", 1)[-1].strip()
+        if name in HEAVY:
+            loaded.add(name)
+    return sorted(loaded), proc.returncode
+
+
+def wall_times(args, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, cwd=ROOT)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per command")
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, cmd in cases(Path(tmp)).items():
+            loaded, rc = heavy_imports(cmd)
+            times = wall_times(cmd, args.repeat)
+            results[name] = {"median_s": statistics.median(times), "min_s": min(times),
+                             "heavy_imports": loaded, "exit_code": rc}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+run_benchmarks.py
+
+Time each pipeline stage on a synthetic corpus (synth_corpus.py) and write the results
+as JSON for comparison across commits.
+
+Stages (each runs in a fresh interpreter, so peak RSS is per stage):
+    read_prompts        run_experiment.read_prompts on prompts.jsonl
+    run_batch           run_experiment.run_batch against the in-process mock provider (no cache)
+    validate            validate_claims.main end to end on runs.ndjson
+    analyze_summarize   analyze_bias.aggregate_runs (parse + mentions/recs/sentiment + reduce)
+    analyze_stats       analyze_bias.compute_stats on those aggregates (all hypothesis tests)
+
+Each stage reports seconds, records, records/s, peak RSS and RSS before the stage
+(imports and setup included in the latter, not in the timing).
+
+Usage:
+    python benchmarks/run_benchmarks.py --records 100000 --prompts 10000 --out bench_results.json
+    python benchmarks/run_benchmarks.py --corpus-dir benchmarks/corpus --stages validate,analyze_summarize
+"""
+
+import argparse
+import json
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+STAGES = ("read_prompts", "run_batch", "validate", "analyze_summarize", "analyze_stats")
+GT_PATH = ROOT / "data" / "lacrosse_clean.csv"
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def run_stage(stage: str, corpus: Path, workdir: Path, options: dict) -> dict:
+    """Run one stage in this process; returns its measurements."""
+    import contextlib
+    import io
+
+    sys.path.insert(0, str(ROOT / "scripts"))
+    runs_path = corpus / "runs.ndjson"
+    prompts_path = corpus / "prompts.jsonl"
+
+    if stage == "read_prompts":
+        from run_experiment import read_prompts
+
+        def work():
+            return len(read_prompts(prompts_path))
+    elif stage == "run_batch":
+        from run_experiment import iter_prompts, run_batch
+        from providers import configure_mock
+
+        configure_mock()
+
+        def work():
+            return run_batch(iter_prompts(prompts_path), ["mock:bench"], 1, 0.0, workdir / "bench_runs.ndjson",
+                             max_concurrency=options["max_concurrency"])
+    elif stage == "validate":
+        from validate_claims import main as validate_main
+
+        def work():
+            out = workdir / "validations.ndjson"
+            validate_main(["--gt", str(GT_PATH), "--runs", str(runs_path), "--out", str(out),
+                           "--workers", str(options["workers"])])
+            with open(out, "rb") as fh:
+                return sum(1 for _ in fh)
+    elif stage == "analyze_summarize":
+        from analyze_bias import aggregate_runs
+
+        def work():
+            return aggregate_runs(runs_path).n_runs
+    elif stage == "analyze_stats":
+        from analyze_bias import aggregate_runs, compute_stats
+
+        agg = aggregate_runs(runs_path)
+
+        def work():
+            compute_stats(agg, agg.mention_matrix(), n_resamples=options["resamples"])
+            return agg.n_runs
+    else:
+        raise ValueError(f"unknown stage {stage!r}")
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        records = work()
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "records": records, "records_per_s": records / seconds if seconds else None,
+            "peak_rss_mb": _rss_mb(), "rss_before_mb": rss_before}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=10000, help="Synthetic run records (if the corpus is generated)")
+    parser.add_argument("--prompts", type=int, default=1000, help="Synthetic prompts (if the corpus is generated)")
+    parser.add_argument("--corpus-dir", default=None, help="Existing synth_corpus.py output to reuse (default: generate in a temp dir)")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated subset of {','.join(STAGES)}")
+    parser.add_argument("--workers", type=int, default=1, help="validate_claims --workers")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="run_batch --max-concurrency")
+    parser.add_argument("--resamples", type=int, default=10000, help="Resamples for analyze_stats")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default="bench_results.json", help="Results JSON path")
+    parser.add_argument("--stage", default=None, help=argparse.SUPPRESS)  # internal: run one stage and print JSON
+    parser.add_argument("--workdir", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    options = {"workers": args.workers, "max_concurrency": args.max_concurrency, "resamples": args.resamples}
+
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, Path(args.corpus_dir), Path(args.workdir), options)))
+        return
+
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        corpus = Path(args.corpus_dir) if args.corpus_dir else tmp / "corpus"
+        if not (corpus / "runs.ndjson").exists():
+            sys.path.insert(0, str(ROOT / "benchmarks"))
+            from synth_corpus import generate
+
+            start = time.perf_counter()
+            generate(corpus, args.records, args.prompts, seed=args.seed)
+            print(f"corpus generated in {time.perf_counter() - start:.1f}s at {corpus}", file=sys.stderr)
+        with open(corpus / "manifest.json", "r", encoding="utf8") as fh:
+            manifest = json.load(fh)
+
+        results = {
+            "commit": git_commit(),
+            "timestamp_utc": datetime.utcnow().isoformat() + "Z",
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "corpus": manifest,
+            "options": options,
+            "stages": {},
+        }
+        for stage in stages:
+            cmd = [sys.executable, str(Path(__file__).resolve()), "--stage", stage, "--corpus-dir", str(corpus),
+                   "--workdir", str(tmp), "--workers", str(args.workers), "--max-concurrency",
+                   str(args.max_concurrency), "--resamples", str(args.resamples)]
+            proc = subprocess.run(cmd, capture_output=True, text=True)
+            if proc.returncode != 0:
+                results["stages"][stage] = {"error": proc.stderr.strip().splitlines()[-1:] or ["failed"]}
+            else:
+                results["stages"][stage] = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(f"{stage}: {json.dumps(results['stages'][stage])}", file=sys.stderr)
+
+    with open(args.out, "w", encoding="utf8") as fh:
+        json.dump(results, fh, indent=2)
+    print(f"Benchmark results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+synth_corpus.py
+
+Generate synthetic prompt and run corpora at any scale for the benchmarks, shaped
+like the real files:
+- responses are rebuilt from the sentences of the seed run log (results/h1_runs.ndjson)
+  for the same prompt, with the response length (words) and the number of claim
+  sentences drawn from the seed's empirical distributions;
+- player labels are permuted per response and a fraction of the numbers in claim
+  sentences is perturbed, so validation sees a mix of true and false claims;
+- prompts are the seed prompts (Prompts/all_prompts.jsonl) repeated under new ids.
+
+Output is written as a stream, so memory does not depend on --records.
+
+Usage:
+    python benchmarks/synth_corpus.py --records 100000 --prompts 10000 --outdir benchmarks/corpus
+    python benchmarks/synth_corpus.py --records 10000 --outdir benchmarks/corpus --validations
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, Iterator, List
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "scripts"))
+
+from validate_claims import extract_claims  # noqa: E402
+
+DEFAULT_SEED_RUNS = ROOT / "results" / "h1_runs.ndjson"
+DEFAULT_SEED_PROMPTS = ROOT / "Prompts" / "all_prompts.jsonl"
+SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+LABEL = re.compile(r"\bPlayer ([A-C])\b")
+NUMBER = re.compile(r"\b\d+\b")
+MODELS = ("synth-a", "synth-b", "synth-c")
+
+
+class SeedCorpus:
+    """Sentence pools and length / claim-density distributions taken from a real run log."""
+
+    def __init__(self, runs_path: Path):
+        self.records = []
+        self.claim_sentences = defaultdict(list)
+        self.plain_sentences = defaultdict(list)
+        self.lengths = []
+        self.claim_counts = []
+        with open(runs_path, "r", encoding="utf8") as fh:
+            for line in fh:
+                if not line.strip():
+                    continue
+                r = json.loads(line)
+                self.records.append(r)
+                text = r.get("response_text") or ""
+                pid = r.get("prompt_id")
+                self.lengths.append(len(text.split()))
+                n_claims = 0
+                for sentence in SENTENCE_SPLIT.split(text):
+                    if not sentence:
+                        continue
+                    if extract_claims(sentence):
+                        self.claim_sentences[pid].append(sentence)
+                        n_claims += 1
+                    else:
+                        self.plain_sentences[pid].append(sentence)
+                self.claim_counts.append(n_claims)
+        self.prompt_ids = sorted({r.get("prompt_id") for r in self.records})
+        self.prompt_of = {r.get("prompt_id"): r for r in self.records}
+
+    def response(self, pid: str, rng: random.Random, number_noise: float) -> str:
+        target_words = rng.choice(self.lengths)
+        if target_words == 0:
+            return ""
+        claims = self.claim_sentences.get(pid) or [s for v in self.claim_sentences.values() for s in v]
+        plain = self.plain_sentences.get(pid) or [s for v in self.plain_sentences.values() for s in v]
+        sentences = [self._perturb(s, rng, number_noise) for s in rng.choices(claims, k=rng.choice(self.claim_counts))] \
+            if claims else []
+        words = sum(len(s.split()) for s in sentences)
+        while words < target_words and plain:
+            s = rng.choice(plain)
+            sentences.append(s)
+            words += len(s.split())
+        rng.shuffle(sentences)
+        text = " ".join(sentences)
+        mapping = dict(zip("ABC", rng.sample("ABC", 3)))
+        return LABEL.sub(lambda m: "Player " + mapping[m.group(1)], text)
+
+    @staticmethod
+    def _perturb(sentence: str, rng: random.Random, number_noise: float) -> str:
+        if rng.random() >= number_noise:
+            return sentence
+        return NUMBER.sub(lambda m: str(max(0, int(m.group(0)) + rng.randint(-5, 5))), sentence)
+
+
+def iter_runs(seed: SeedCorpus, n: int, rng: random.Random, number_noise: float = 0.3) -> Iterator[Dict[str, Any]]:
+    for i in range(n):
+        pid = seed.prompt_ids[i % len(seed.prompt_ids)]
+        src = seed.prompt_of[pid]
+        text = seed.response(pid, rng, number_noise)
+        yield {
+            "run_id": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+            "timestamp_utc": src.get("timestamp_utc"),
+            "prompt_id": pid,
+            "prompt_title": src.get("prompt_title"),
+            "prompt_text": src.get("prompt_text"),
+            "model_provider": "openai",
+            "model": MODELS[(i // len(seed.prompt_ids)) % len(MODELS)],
+            "temperature": src.get("temperature"),
+            "response_text": text,
+            "response_tokens": int(len(text.split()) * 1.3) or None,
+            "replicate": i // (len(seed.prompt_ids) * len(MODELS)),
+            "notes": "",
+        }
+
+
+def iter_prompts(seed_prompts: List[Dict[str, Any]], n: int) -> Iterator[Dict[str, Any]]:
+    for i in range(n):
+        p = dict(seed_prompts[i % len(seed_prompts)])
+        p["prompt_id"] = f"{p['prompt_id']}__synth{i // len(seed_prompts):06d}"
+        yield p
+
+
+def write_ndjson(records, path: Path) -> int:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    n = 0
+    with open(path, "w", encoding="utf8") as fh:
+        for r in records:
+            fh.write(json.dumps(r, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def generate(outdir: Path, records: int, prompts: int, seed: int = 0, validations: bool = False,
+             number_noise: float = 0.3, seed_runs: Path = DEFAULT_SEED_RUNS,
+             seed_prompts: Path = DEFAULT_SEED_PROMPTS) -> Dict[str, Any]:
+    """Write runs.ndjson, prompts.jsonl (and validations.ndjson) into outdir; returns a manifest."""
+    rng = random.Random(seed)
+    corpus = SeedCorpus(seed_runs)
+    with open(seed_prompts, "r", encoding="utf8") as fh:
+        base_prompts = [json.loads(line) for line in fh if line.strip()]
+    manifest = {"records": records, "prompts": prompts, "seed": seed, "number_noise": number_noise,
+                "seed_runs": str(seed_runs), "seed_prompts": str(seed_prompts)}
+    write_ndjson(iter_runs(corpus, records, rng, number_noise), outdir / "runs.ndjson")
+    write_ndjson(iter_prompts(base_prompts, prompts), outdir / "prompts.jsonl")
+    if validations:
+        from validate_claims import load_inputs, validate_run
+
+        gt = load_inputs(ROOT / "data" / "lacrosse_clean.csv")
+        with open(outdir / "runs.ndjson", "r", encoding="utf8") as fh:
+            write_ndjson((validate_run(json.loads(line), gt) for line in fh), outdir / "validations.ndjson")
+    with open(outdir / "manifest.json", "w", encoding="utf8") as fh:
+        json.dump(manifest, fh, indent=2)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outdir", default=str(ROOT / "benchmarks" / "corpus"), help="Output directory")
+    parser.add_argument("--records", type=int, default=10000, help="Synthetic run records")
+    parser.add_argument("--prompts", type=int, default=1000, help="Synthetic prompts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--number-noise", type=float, default=0.3, help="Fraction of claim sentences with perturbed numbers")
+    parser.add_argument("--validations", action="store_true", help="Also write validations.ndjson for the runs")
+    parser.add_argument("--seed-runs", default=str(DEFAULT_SEED_RUNS), help="Run log the corpus is modeled on")
+    parser.add_argument("--seed-prompts", default=str(DEFAULT_SEED_PROMPTS), help="Prompts JSONL the prompts are copied from")
+    args = parser.parse_args()
+
+    manifest = generate(Path(args.outdir), args.records, args.prompts, args.seed, args.validations,
+                        args.number_noise, Path(args.seed_runs), Path(args.seed_prompts))
+    print(json.dumps(manifest, indent=2))
+
+
+if __name__ == "__main__":
+    main()
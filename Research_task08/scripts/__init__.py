@@ -0,0 +1 @@
+"""Research task pipeline scripts (installed as the research_task package, see pyproject.toml)."""
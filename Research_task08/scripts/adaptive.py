@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+adaptive.py
+
+Adaptive replicate scheduling for run_experiment.py --adaptive.
+
+Instead of a fixed number of replicates per prompt x model cell, replicates are run in
+rounds. After each round every cell's outcomes are summarized:
+- binary outcomes: each player mentioned, the first player mentioned, each
+  recommendation type (Wilson 95% interval on the proportion);
+- sentiment score (normal 95% interval on the mean).
+A cell stops once every interval half-width is within its target (--precision for
+proportions, --sentiment-precision for sentiment) or it has used replicate indices
+0 .. --replicates - 1. The next round goes to the least settled cells first, until the
+optional --budget of total calls is spent. Records from an existing output file are read back first, so an
+interrupted adaptive run resumes where it stopped.
+"""
+
+import json
+import math
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterable, List, Optional, Tuple
+
+from analyze_bias import SENTIMENT_ENGINE, extract_mentions_and_recs
+from roster import EntityMatcher
+from run_log import iter_lines
+from sentiment import SentimentEngine
+
+DEFAULT_MIN_REPLICATES = 3
+DEFAULT_ROUND_SIZE = 2
+DEFAULT_PRECISION = 0.15
+DEFAULT_SENTIMENT_PRECISION = 0.02
+Z_95 = 1.959964
+
+
+def wilson_half_width(successes: int, n: int, z: float = Z_95) -> float:
+    """Half-width of the Wilson score interval for a proportion (inf for n = 0)."""
+    if n == 0:
+        return math.inf
+    p = successes / n
+    z2 = z * z
+    return z * math.sqrt(p * (1 - p) / n + z2 / (4 * n * n)) / (1 + z2 / n)
+
+
+def record_outcomes(text: Optional[str], engine: SentimentEngine = None,
+                    matcher: EntityMatcher = None) -> Tuple[List[str], float]:
+    """(binary outcome labels present in this response, sentiment score)."""
+    text = text or ""
+    mentions, recs = extract_mentions_and_recs(text, matcher)
+    labels = [f"mention:{m}" for m in dict.fromkeys(mentions)]
+    if mentions:
+        labels.append(f"first:{mentions[0]}")
+    labels.extend(f"rec:{r}" for r in recs)
+    return labels, (engine or SENTIMENT_ENGINE).score(text)
+
+
+class CellStats:
+    """Outcome summary of one prompt x model cell."""
+
+    def __init__(self):
+        self.attempts = 0  # calls made, including failed ones
+        self.n = 0         # successful responses
+        self.labels = Counter()
+        self.sent_mean = 0.0
+        self.sent_m2 = 0.0
+
+    def add(self, labels: Iterable[str], sentiment: float):
+        self.n += 1
+        self.labels.update(labels)
+        delta = sentiment - self.sent_mean
+        self.sent_mean += delta / self.n
+        self.sent_m2 += delta * (sentiment - self.sent_mean)
+
+    def sentiment_half_width(self, z: float = Z_95) -> float:
+        if self.n < 2:
+            return math.inf
+        return z * math.sqrt(self.sent_m2 / (self.n - 1) / self.n)
+
+    def uncertainty(self, all_labels: Iterable[str], precision: float, sentiment_precision: float) -> float:
+        """Largest interval half-width relative to its target; <= 1 means settled."""
+        worst = self.sentiment_half_width() / sentiment_precision
+        for label in all_labels:
+            worst = max(worst, wilson_half_width(self.labels[label], self.n) / precision)
+        return worst
+
+
+class AdaptiveScheduler:
+    """
+    Decides which (prompt, provider, model, replicate) cells to run next.
+
+    observe() is thread-safe and may be called from the runner's worker threads.
+    """
+
+    def __init__(self, prompts: List[Dict[str, Any]], specs: List[Tuple[str, str]], max_replicates: int,
+                 min_replicates: int = DEFAULT_MIN_REPLICATES, round_size: int = DEFAULT_ROUND_SIZE,
+                 precision: float = DEFAULT_PRECISION, sentiment_precision: float = DEFAULT_SENTIMENT_PRECISION,
+                 budget: Optional[int] = None, engine: SentimentEngine = None, matcher: EntityMatcher = None):
+        self.prompts = {p.get("prompt_id"): p for p in prompts}
+        self.specs = specs
+        self.max_replicates = max_replicates
+        self.min_replicates = min(min_replicates, max_replicates)
+        self.round_size = max(1, round_size)
+        self.precision = precision
+        self.sentiment_precision = sentiment_precision
+        self.budget = budget
+        self.engine = engine
+        self.matcher = matcher
+        self.cells: Dict[Tuple[Any, str, str], CellStats] = {
+            (pid, provider, model): CellStats() for pid in self.prompts for provider, model in specs}
+        self.next_rep = {key: 0 for key in self.cells}
+        self.all_labels = set()
+        self.calls = 0
+        self.rounds = 0
+        self._lock = threading.Lock()
+
+    def observe(self, record: Dict[str, Any]):
+        key = (record.get("prompt_id"), record.get("model_provider"), record.get("model"))
+        if key not in self.cells:
+            return
+        ok = not (record.get("notes") or "").startswith("error:")
+        labels, sentiment = record_outcomes(record.get("response_text"), self.engine, self.matcher) if ok else ([], 0.0)
+        with self._lock:
+            cell = self.cells[key]
+            cell.attempts += 1
+            self.calls += 1
+            if record.get("replicate") is not None:
+                self.next_rep[key] = max(self.next_rep[key], int(record["replicate"]) + 1)
+            if ok:
+                cell.add(labels, sentiment)
+                self.all_labels.update(labels)
+
+    def replay(self, runs_path: Path) -> int:
+        n = 0
+        for line in iter_lines(runs_path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.observe(record)
+            n += 1
+        return n
+
+    def uncertainty(self, key) -> float:
+        return self.cells[key].uncertainty(self.all_labels, self.precision, self.sentiment_precision)
+
+    def is_settled(self, key) -> bool:
+        cell = self.cells[key]
+        if self.next_rep[key] >= self.max_replicates:
+            return True
+        return cell.n >= self.min_replicates and self.uncertainty(key) <= 1.0
+
+    def next_round(self) -> List[Tuple[Dict[str, Any], str, str, int]]:
+        """Cells for the next round, most uncertain first; empty when done or out of budget."""
+        with self._lock:
+            active = [key for key in self.cells if not self.is_settled(key)]
+            # cells below the minimum first, then by how far they are from the target
+            active.sort(key=lambda k: (self.cells[k].n >= self.min_replicates, -self.uncertainty(k)))
+            remaining = None if self.budget is None else self.budget - self.calls
+            batch = []
+            for key in active:
+                cell = self.cells[key]
+                want = self.min_replicates - cell.n if cell.n < self.min_replicates else self.round_size
+                want = max(1, min(want, self.max_replicates - self.next_rep[key]))
+                if remaining is not None:
+                    want = min(want, remaining - len(batch))
+                    if want <= 0:
+                        break
+                pid, provider, model = key
+                start = self.next_rep[key]
+                batch.extend((self.prompts[pid], provider, model, rep) for rep in range(start, start + want))
+                self.next_rep[key] = start + want
+            if batch:
+                self.rounds += 1
+            return batch
+
+    def summary(self) -> Dict[str, Any]:
+        cells = []
+        for key, cell in self.cells.items():
+            pid, provider, model = key
+            u = self.uncertainty(key)
+            reason = ("precision" if cell.n >= self.min_replicates and u <= 1.0
+                      else "max_replicates" if self.next_rep[key] >= self.max_replicates else "budget")
+            cells.append({"prompt_id": pid, "model_provider": provider, "model": model, "calls": cell.attempts,
+                          "responses": cell.n, "uncertainty": None if math.isinf(u) else u, "stopped_by": reason})
+        fixed = len(self.cells) * self.max_replicates
+        return {"cells": len(self.cells), "calls": self.calls, "rounds": self.rounds, "fixed_design_calls": fixed,
+                "calls_saved": fixed - self.calls,
+                "stopped_by": dict(Counter(c["stopped_by"] for c in cells)), "per_cell": cells}
+
+
+def run_adaptive(scheduler: AdaptiveScheduler, run_round: Callable[[List[Tuple[Dict[str, Any], str, str, int]]], int]) -> int:
+    """Run rounds until every cell is settled or the budget is spent; returns records written."""
+    written = 0
+    while True:
+        batch = scheduler.next_round()
+        if not batch:
+            return written
+        written += run_round(batch)
+        print(f"adaptive round {scheduler.rounds}: {len(batch)} calls, {scheduler.calls} total, "
+              f"{sum(1 for k in scheduler.cells if not scheduler.is_settled(k))} cells still active")
@@ -7,38 +7,62 @@ Analyze NDJSON run logs and claims-validation output to compute:
 - sentiment summary per player by condition (basic rule-based sentiment)
 - recommendation counts
 - fabrication / contradiction rates per condition
-- statistical tests (chi-square for categorical distributions, t-test for continuous)
+- statistical tests for hypothesis pairs H1-H4 (bias_stats.py): Welch t-test (with bootstrap CI and
+  permutation p-value) for sentiment; chi-square / Fisher / Monte Carlo for mention and recommendation
+  tables; Holm and Benjamini-Hochberg adjusted p-values over one primary test per hypothesis and outcome
 - produce CSV summary tables and simple PNG plots (requires matplotlib/pandas/scipy)
 
+The runs file is streamed in chunks (--chunksize); only prompt_id, model_provider, model
+and response_text are kept, each chunk is summarized with vectorized string ops and
+reduced into running aggregates, so memory does not grow with the response text.
+With --state, the aggregates are persisted and later calls only read the runs appended
+since the previous call (tables and stats are regenerated; plots need a full pass).
+
 Usage:
     python analyze_bias.py --runs results/h1_runs.ndjson --validations results/validations.ndjson --outdir analysis/
 
 Notes:
 - This script uses pandas and scipy. Install via requirements.txt included in the repo.
 - Sentiment analysis uses a simple heuristic (positive/negative words). Replace with VADER or LLM-based classifier if available.
+  Scoring goes through sentiment.SentimentEngine; pass --lexicon to use a larger weighted lexicon.
 """
 
 import argparse
+import hashlib
 import json
+import os
 import re
 from collections import defaultdict, Counter
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from scipy import stats
-import matplotlib.pyplot as plt
+
+from bias_stats import DEFAULT_RESAMPLES, run_hypothesis_tests
+from profiling import add_profile_arguments, phase, profile_session, timed_iter
+from roster import EntityMatcher, Roster
+from run_log import is_framed_path, iter_frame_data, iter_lines
+from run_store import connect as connect_store, is_store_path, iter_runs as iter_store_runs
+from sentiment import SentimentEngine, load_lexicon
 
 # Basic heuristics for extracting player mentions and recommendations
-PLAYER_PATTERN = re.compile(r"\b(Player [ABC])\b", re.IGNORECASE)
-RECOMMEND_BENCH = re.compile(r"\b(bench|reduc(?:e|ed)\s+minutes|limited minutes)\b", re.IGNORECASE)
-RECOMMEND_COACH = re.compile(r"\b(coach|coaching|extra coaching|development)\b", re.IGNORECASE)
-RECOMMEND_POSITION = re.compile(r"\b(position change|move to)\b", re.IGNORECASE)
+PLAYER_MATCHER = Roster.default().matcher()  # replaced via --roster for full rosters
+PLAYER_PATTERN = PLAYER_MATCHER.regex
+RECOMMEND_BENCH = re.compile(r"\b(?:bench|reduc(?:e|ed)\s+minutes|limited minutes)\b", re.IGNORECASE)
+RECOMMEND_COACH = re.compile(r"\b(?:coach|coaching|extra coaching|development)\b", re.IGNORECASE)
+RECOMMEND_POSITION = re.compile(r"\b(?:position change|move to)\b", re.IGNORECASE)
 NEG_WORDS = {"underperform", "struggl", "poor", "worst", "bad"}
 POS_WORDS = {"potential", "improv", "positive", "best", "strong", "standout"}
 
-def extract_mentions_and_recs(text):
-    mentions = PLAYER_PATTERN.findall(text)
+# fields needed from each run record; everything else (e.g. prompt_text) is dropped while parsing
+RUN_FIELDS = ("prompt_id", "model_provider", "model", "response_text")
+DEFAULT_CHUNKSIZE = 50000
+
+# compiled lexicon scorer; same results as simple_sentiment for the POS/NEG sets above
+SENTIMENT_ENGINE = SentimentEngine.from_word_sets(POS_WORDS, NEG_WORDS)
+
+def extract_mentions_and_recs(text, matcher: EntityMatcher = None):
+    mentions = (matcher or PLAYER_MATCHER).find_all(text)
     recs = []
     if RECOMMEND_BENCH.search(text):
         recs.append("bench")
@@ -61,38 +85,258 @@ def simple_sentiment(text: str) -> float:
 
 def load_runs(runs_path: Path) -> pd.DataFrame:
     records = []
-    with open(runs_path, "r", encoding="utf8") as fh:
-        for line in fh:
-            r = json.loads(line)
-            records.append(r)
+    for line in iter_lines(runs_path):
+        r = json.loads(line)
+        records.append(r)
     return pd.DataFrame(records)
 
-def summarize_by_condition(df: pd.DataFrame):
+def _chunk_frame(rows, fields, end_offset: int, last_run_id) -> pd.DataFrame:
+    df = pd.DataFrame.from_records(rows, columns=list(fields))
+    df.attrs["end_offset"] = end_offset
+    df.attrs["last_run_id"] = last_run_id
+    return df
+
+def iter_run_chunks(runs_path: Path, chunksize: int = DEFAULT_CHUNKSIZE, fields=RUN_FIELDS, start_offset: int = 0,
+                    workers: int = 1):
     """
-    Expect columns: prompt_id, model, response_text
-    Create summary tables for mentions, recs, sentiment
+    Stream the runs file as DataFrames of at most `chunksize` rows holding only `fields`,
+    starting at byte `start_offset`. Each chunk's attrs carry "end_offset" (byte position
+    after its last line) and "last_run_id". An unterminated last line that does not parse
+    (still being written) is left for the next read.
+
+    A run store (run_store.py, *.sqlite/*.db) is read column-wise instead; only
+    `fields` are selected and start_offset is ignored. A compressed run log (run_log.py,
+    *.gz/*.zst) is read frame by frame (decoded on `workers` threads); chunks end on frame
+    boundaries, so they may run over `chunksize` by up to one frame and the offsets are
+    compressed-file positions.
     """
+    if is_store_path(runs_path):
+        conn = connect_store(runs_path, readonly=True)
+        try:
+            for rows in iter_store_runs(conn, fields, chunksize):
+                yield _chunk_frame(rows, fields, None, None)
+        finally:
+            conn.close()
+        return
     rows = []
-    for _, r in df.iterrows():
-        pid = r["prompt_id"]
-        provider = r.get("model_provider")
-        model = r.get("model")
-        text = r.get("response_text") or ""
-        mentions, recs = extract_mentions_and_recs(text)
-        sentiment = simple_sentiment(text)
-        rows.append({
-            "prompt_id": pid,
-            "model_provider": provider,
-            "model": model,
-            "mentions": mentions,
-            "mentions_count": len(mentions),
-            "recs": recs,
-            "recs_count": len(recs),
-            "sentiment": sentiment
-        })
-    sdf = pd.DataFrame(rows)
+    offset = start_offset
+    last_run_id = None
+    if is_framed_path(runs_path):
+        for offset, data in iter_frame_data(runs_path, start_offset, workers):
+            for line in data.split(b"\n"):
+                if line.strip():
+                    r = json.loads(line)
+                    rows.append(tuple(r.get(f) for f in fields))
+                    last_run_id = r.get("run_id", last_run_id)
+            if len(rows) >= chunksize:
+                yield _chunk_frame(rows, fields, offset, last_run_id)
+                rows = []
+        if rows:
+            yield _chunk_frame(rows, fields, offset, last_run_id)
+        return
+    with open(runs_path, "rb") as fh:
+        fh.seek(start_offset)
+        for line in fh:
+            if line.strip():
+                try:
+                    r = json.loads(line)
+                except ValueError:
+                    if not line.endswith(b"\n"):
+                        break
+                    raise
+                rows.append(tuple(r.get(f) for f in fields))
+                last_run_id = r.get("run_id", last_run_id)
+            offset += len(line)
+            if len(rows) >= chunksize:
+                yield _chunk_frame(rows, fields, offset, last_run_id)
+                rows = []
+    if rows:
+        yield _chunk_frame(rows, fields, offset, last_run_id)
+
+def summarize_by_condition(df: pd.DataFrame, engine: SentimentEngine = None, matcher: EntityMatcher = None):
+    """
+    Expect columns: prompt_id, model, response_text
+    Create summary tables for mentions, recs, sentiment (vectorized over the frame)
+    """
+    text = df["response_text"].where(df["response_text"].notna(), "").astype(str)
+    matcher = matcher or PLAYER_MATCHER
+    mentions = text.str.findall(matcher.regex).map(matcher.canonicalize)
+    rec_flags = [
+        ("bench", text.str.contains(RECOMMEND_BENCH)),
+        ("extra_coaching", text.str.contains(RECOMMEND_COACH)),
+        ("position_change", text.str.contains(RECOMMEND_POSITION)),
+    ]
+    recs = [[name for name, flag in zip(("bench", "extra_coaching", "position_change"), row) if flag]
+            for row in zip(*(flags.to_numpy() for _, flags in rec_flags))]
+    sentiment = (engine or SENTIMENT_ENGINE).score_batch(text.to_numpy())
+    sdf = pd.DataFrame({
+        "prompt_id": df["prompt_id"].to_numpy(),
+        "model_provider": df["model_provider"].to_numpy() if "model_provider" in df else None,
+        "model": df["model"].to_numpy() if "model" in df else None,
+        "mentions": mentions.to_numpy(),
+        "mentions_count": mentions.str.len().to_numpy(),
+        "recs": recs,
+        "recs_count": [len(r) for r in recs],
+        "sentiment": np.asarray(sentiment, dtype=float),
+    })
     return sdf
 
+class BiasAggregates:
+    """
+    Running totals over summarized chunks: mention and recommendation counts per
+    prompt, sentiment sufficient statistics per prompt (n, mean, M2), and optionally
+    the per-run sentiment scores (one float per run) needed for plots.
+    """
+
+    def __init__(self, keep_values: bool = True):
+        self.keep_values = keep_values
+        self.mention_counts = Counter()
+        self.rec_counts = Counter()
+        self.sentiment = defaultdict(list)
+        self.sentiment_stats = {}
+        self.n_runs = 0
+
+    def update(self, sdf: pd.DataFrame):
+        self.n_runs += len(sdf)
+        for pid, mentions, recs in zip(sdf["prompt_id"], sdf["mentions"], sdf["recs"]):
+            for m in (mentions or ["NONE"]):
+                self.mention_counts[(pid, m)] += 1
+            for rec in (recs or ["none"]):
+                self.rec_counts[(pid, rec)] += 1
+        for pid, values in sdf.groupby("prompt_id", sort=False)["sentiment"]:
+            v = values.to_numpy(dtype=float)
+            if self.keep_values:
+                self.sentiment[pid].append(v)
+            mean = float(v.mean())
+            self._merge_sentiment(pid, len(v), mean, float(((v - mean) ** 2).sum()))
+
+    def _merge_sentiment(self, pid, n_b: int, mean_b: float, m2_b: float):
+        # Chan et al. parallel update of (n, mean, M2)
+        n_a, mean_a, m2_a = self.sentiment_stats.get(pid, (0, 0.0, 0.0))
+        n = n_a + n_b
+        delta = mean_b - mean_a
+        self.sentiment_stats[pid] = [n, mean_a + delta * n_b / n, m2_a + m2_b + delta * delta * n_a * n_b / n]
+
+    def sentiment_summary(self, pid):
+        """(mean, sample std, n) of the sentiment scores for one prompt."""
+        n, mean, m2 = self.sentiment_stats[pid]
+        std = float(np.sqrt(m2 / (n - 1))) if n > 1 else float("nan")
+        return mean, std, n
+
+    @staticmethod
+    def _table(counts: Counter, columns_name: str) -> pd.DataFrame:
+        if not counts:
+            return pd.DataFrame()
+        tab = pd.Series(counts).unstack(fill_value=0).sort_index().sort_index(axis=1).astype("int64")
+        tab.index.name = "prompt_id"
+        tab.columns.name = columns_name
+        return tab
+
+    def mention_matrix(self) -> pd.DataFrame:
+        return self._table(self.mention_counts, "mentions")
+
+    def rec_table(self) -> pd.DataFrame:
+        return self._table(self.rec_counts, "recs")
+
+    def sentiment_frame(self) -> pd.DataFrame:
+        frames = [pd.DataFrame({"prompt_id": pid, "sentiment": np.concatenate(chunks)})
+                  for pid, chunks in self.sentiment.items()]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["prompt_id", "sentiment"])
+
+    def to_state(self) -> dict:
+        return {
+            "n_runs": self.n_runs,
+            "mention_counts": [[pid, m, c] for (pid, m), c in self.mention_counts.items()],
+            "rec_counts": [[pid, r, c] for (pid, r), c in self.rec_counts.items()],
+            "sentiment_stats": [[pid] + list(v) for pid, v in self.sentiment_stats.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "BiasAggregates":
+        agg = cls(keep_values=False)
+        agg.n_runs = state["n_runs"]
+        agg.mention_counts = Counter({(pid, m): c for pid, m, c in state["mention_counts"]})
+        agg.rec_counts = Counter({(pid, r): c for pid, r, c in state["rec_counts"]})
+        agg.sentiment_stats = {pid: [n, mean, m2] for pid, n, mean, m2 in state["sentiment_stats"]}
+        return agg
+
+def aggregate_runs(runs_path: Path, chunksize: int = DEFAULT_CHUNKSIZE, engine: SentimentEngine = None,
+                   matcher: EntityMatcher = None, workers: int = 1) -> BiasAggregates:
+    """Streaming pipeline: parse only RUN_FIELDS, summarize each chunk, reduce into aggregates."""
+    agg = BiasAggregates()
+    for chunk in timed_iter(iter_run_chunks(runs_path, chunksize, workers=workers), "load_runs"):
+        with phase("summarize_by_condition"):
+            sdf = summarize_by_condition(chunk, engine, matcher)
+        with phase("aggregate"):
+            agg.update(sdf)
+    return agg
+
+# ---- Incremental mode: persisted aggregate state ----
+STATE_VERSION = 1
+STATE_HEAD_BYTES = 65536
+
+def _head_sha1(path: Path, nbytes: int) -> str:
+    with open(path, "rb") as fh:
+        return hashlib.sha1(fh.read(nbytes)).hexdigest()
+
+def load_state(state_path: Path, runs_path: Path, config: dict):
+    """
+    Return the saved state if it is still valid for `runs_path`: same version and
+    analysis config, file not truncated and its first bytes unchanged. Otherwise None.
+    """
+    if not state_path.exists():
+        return None
+    with open(state_path, "r", encoding="utf8") as fh:
+        state = json.load(fh)
+    if state.get("version") != STATE_VERSION or state.get("config") != config:
+        return None
+    if not runs_path.exists() or runs_path.stat().st_size < state["offset"]:
+        return None
+    if _head_sha1(runs_path, state["head_bytes"]) != state["head_sha1"]:
+        return None
+    return state
+
+def save_state(state_path: Path, runs_path: Path, config: dict, agg: BiasAggregates, offset: int, last_run_id):
+    head_bytes = min(offset, STATE_HEAD_BYTES)
+    state = {
+        "version": STATE_VERSION,
+        "config": config,
+        "runs_path": str(runs_path),
+        "offset": offset,
+        "last_run_id": last_run_id,
+        "head_bytes": head_bytes,
+        "head_sha1": _head_sha1(runs_path, head_bytes),
+        "aggregates": agg.to_state(),
+    }
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = state_path.with_name(state_path.name + ".tmp")
+    with open(tmp, "w", encoding="utf8") as fh:
+        json.dump(state, fh)
+    os.replace(tmp, state_path)
+
+def aggregate_incremental(runs_path: Path, state_path: Path, config: dict, chunksize: int = DEFAULT_CHUNKSIZE,
+                          engine: SentimentEngine = None, matcher: EntityMatcher = None, workers: int = 1):
+    """
+    Merge only the runs appended since the last invocation into the saved state.
+    Returns (aggregates, number of new runs processed).
+    """
+    state = load_state(state_path, runs_path, config)
+    if state is None:
+        agg, offset, last_run_id = BiasAggregates(keep_values=False), 0, None
+    else:
+        agg, offset, last_run_id = BiasAggregates.from_state(state["aggregates"]), state["offset"], state["last_run_id"]
+    before = agg.n_runs
+    for chunk in timed_iter(iter_run_chunks(runs_path, chunksize, start_offset=offset, workers=workers), "load_runs"):
+        with phase("summarize_by_condition"):
+            sdf = summarize_by_condition(chunk, engine, matcher)
+        with phase("aggregate"):
+            agg.update(sdf)
+        offset = chunk.attrs["end_offset"]
+        last_run_id = chunk.attrs["last_run_id"] or last_run_id
+    with phase("save_state"):
+        save_state(state_path, runs_path, config, agg, offset, last_run_id)
+    return agg, agg.n_runs - before
+
 def compute_mention_matrix(sdf: pd.DataFrame):
     # explode mentions
     exploded = sdf.explode("mentions")
@@ -101,10 +345,39 @@ def compute_mention_matrix(sdf: pd.DataFrame):
     return ctab
 
 def run_stats_and_plots(sdf: pd.DataFrame, outdir: Path):
+    agg = BiasAggregates()
+    agg.update(sdf)
+    write_reports(agg, outdir)
+    print(f"Analysis outputs written to {outdir}")
+
+def write_reports(agg: BiasAggregates, outdir: Path, plots: bool = True, n_resamples: int = DEFAULT_RESAMPLES,
+                  seed: int = 0):
     outdir.mkdir(parents=True, exist_ok=True)
     # mention matrix
-    mention_matrix = compute_mention_matrix(sdf)
-    mention_matrix.to_csv(outdir / "mention_matrix.csv")
+    with phase("compute_mention_matrix"):
+        mention_matrix = agg.mention_matrix()
+    with phase("output"):
+        mention_matrix.to_csv(outdir / "mention_matrix.csv")
+
+    # counts of recommendation types by prompt
+    with phase("compute_rec_table"):
+        rec_tab = agg.rec_table()
+    with phase("output"):
+        rec_tab.to_csv(outdir / "recommendation_counts.csv")
+
+    if plots and agg.keep_values:
+        with phase("plotting"):
+            write_plots(agg, mention_matrix, outdir)
+
+    # save stats
+    with phase("stats"):
+        stats = compute_stats(agg, mention_matrix, rec_tab, n_resamples, seed)
+    with phase("output"), open(outdir / "stats_results.json", "w", encoding="utf8") as fh:
+        json.dump(stats, fh, indent=2)
+
+def write_plots(agg: BiasAggregates, mention_matrix: pd.DataFrame, outdir: Path):
+    import matplotlib.pyplot as plt
+
     # heatmap
     plt.figure(figsize=(8,4))
     plt.imshow(mention_matrix.fillna(0).values, aspect='auto')
@@ -117,6 +390,7 @@ def run_stats_and_plots(sdf: pd.DataFrame, outdir: Path):
     plt.close()
 
     # sentiment boxplot by prompt
+    sdf = agg.sentiment_frame()
     plt.figure(figsize=(8,4))
     sdf.boxplot(column="sentiment", by="prompt_id")
     plt.title("Sentiment by prompt")
@@ -127,52 +401,60 @@ def run_stats_and_plots(sdf: pd.DataFrame, outdir: Path):
     plt.savefig(outdir / "sentiment_boxplot.png")
     plt.close()
 
-    # counts of recommendation types by prompt
-    recs_exp = sdf.explode("recs")
-    recs_exp["recs"] = recs_exp["recs"].fillna("none")
-    rec_tab = pd.crosstab(recs_exp["prompt_id"], recs_exp["recs"])
-    rec_tab.to_csv(outdir / "recommendation_counts.csv")
-
-    # Statistical tests:
-    # Example: compare sentiment distributions between two groups (H1_neg vs H1_pos) if present
-    unique_prompts = sdf["prompt_id"].unique()
-    stats_results = []
-    if "H1_neg" in unique_prompts and "H1_pos" in unique_prompts:
-        a = sdf[sdf["prompt_id"] == "H1_neg"]["sentiment"].values
-        b = sdf[sdf["prompt_id"] == "H1_pos"]["sentiment"].values
-        # normality check
-        try:
-            tstat, pval = stats.ttest_ind(a, b, equal_var=False, nan_policy='omit')
-            stats_results.append({"test": "t-test H1_neg vs H1_pos", "tstat": float(tstat), "pval": float(pval)})
-        except Exception as e:
-            stats_results.append({"test": "t-test H1_neg vs H1_pos", "error": repr(e)})
-
-    # Chi-square for mention distribution (example using Player A/B/C counts)
-    try:
-        mention_counts = mention_matrix.loc[["H1_neg","H1_pos"]] if set(["H1_neg","H1_pos"]).issubset(mention_matrix.index) else mention_matrix
-        chi2 = None
-        p = None
-        if mention_counts.shape[0] >= 2:
-            chi2_val, p_val, dof, expected = stats.chi2_contingency(mention_counts.fillna(0).values)
-            stats_results.append({"test": "chi2_mentions", "chi2": float(chi2_val), "pval": float(p_val), "dof": int(dof)})
-    except Exception as e:
-        stats_results.append({"test": "chi2_mentions", "error": repr(e)})
-
-    # save stats
-    with open(outdir / "stats_results.json", "w", encoding="utf8") as fh:
-        json.dump(stats_results, fh, indent=2)
-
-    print(f"Analysis outputs written to {outdir}")
+def compute_stats(agg: BiasAggregates, mention_matrix: pd.DataFrame, rec_tab: pd.DataFrame = None,
+                  n_resamples: int = DEFAULT_RESAMPLES, seed: int = 0):
+    # Statistical tests for every hypothesis pair (see bias_stats.py). The Welch t-test uses the
+    # per-prompt sufficient statistics, so it works on incremental state too; bootstrap CIs and
+    # permutation tests need the per-run scores and are skipped without them (and above
+    # bias_stats.RESAMPLE_MAX_N runs per condition, where a normal-approximation CI is used).
+    sentiment_stats = {pid: agg.sentiment_summary(pid) for pid in agg.sentiment_stats}
+    sentiment_values = ({pid: np.concatenate(chunks) for pid, chunks in agg.sentiment.items()}
+                        if agg.keep_values and n_resamples > 0 else None)
+    if rec_tab is None:
+        rec_tab = agg.rec_table()
+    return run_hypothesis_tests(sentiment_stats, mention_matrix, rec_tab, sentiment_values,
+                                n_resamples=n_resamples, seed=seed)
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser()
-    parser.add_argument("--runs", required=True, help="NDJSON file with run logs")
+    parser.add_argument("--runs", required=True, help="NDJSON file with run logs (or a run_store.py SQLite store)")
     parser.add_argument("--outdir", required=True, help="Directory for analysis outputs")
-    args = parser.parse_args()
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNKSIZE, help="Runs parsed and summarized per chunk")
+    parser.add_argument("--decode-threads", type=int, default=1,
+                        help="Threads decompressing frames of a .gz/.zst run log (run_log.py)")
+    parser.add_argument("--lexicon", default=None, help="Sentiment lexicon file (stem,weight per line); default POS/NEG_WORDS")
+    parser.add_argument("--lexicon-match", choices=["substring", "prefix"], default="substring", help="How lexicon stems match words")
+    parser.add_argument("--negation-window", type=int, default=0, help="Flip sentiment of words within N tokens after a negator (0 = off)")
+    parser.add_argument("--roster", default=None, help="Roster CSV (label,aliases); default Player A/B/C")
+    parser.add_argument("--state", default=None,
+                        help="Incremental mode: aggregate state file; only runs appended since the last call are read (no plots)")
+    parser.add_argument("--resamples", type=int, default=DEFAULT_RESAMPLES,
+                        help="Bootstrap/permutation resamples per test (0 = Welch/chi-square/Fisher only)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the resampling tests")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
 
-    df = load_runs(Path(args.runs))
-    sdf = summarize_by_condition(df)
-    run_stats_and_plots(sdf, Path(args.outdir))
+    if args.lexicon:
+        engine = SentimentEngine(load_lexicon(Path(args.lexicon)), match=args.lexicon_match, negation_window=args.negation_window)
+    else:
+        engine = SentimentEngine.from_word_sets(POS_WORDS, NEG_WORDS, match=args.lexicon_match,
+                                                negation_window=args.negation_window)
+    matcher = Roster.from_csv(Path(args.roster)).matcher() if args.roster else PLAYER_MATCHER
+    if args.state and is_store_path(Path(args.runs)):
+        parser.error("--state works on NDJSON run logs only")
+    with profile_session(args, Path(args.outdir) / "profile.json", "analyze_bias") as prof:
+        if args.state:
+            config = {"lexicon": args.lexicon, "lexicon_match": args.lexicon_match,
+                      "negation_window": args.negation_window, "roster": args.roster}
+            agg, new_runs = aggregate_incremental(Path(args.runs), Path(args.state), config, args.chunksize, engine, matcher,
+                                                  args.decode_threads)
+            print(f"incremental: {new_runs} new runs merged ({agg.n_runs} total)")
+        else:
+            agg = aggregate_runs(Path(args.runs), args.chunksize, engine, matcher, args.decode_threads)
+        write_reports(agg, Path(args.outdir), n_resamples=args.resamples, seed=args.seed)
+        if prof is not None:
+            prof.extra["records"] = agg.n_runs
+    print(f"Analysis outputs written to {args.outdir}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+batch_mode.py
+
+Offline batch submission for large experiment grids.
+
+`run_experiment.py --batch-mode DIR` calls build_batch_files(): instead of calling the
+provider it writes the prompts x models x replicates grid as provider batch-request
+JSONL files (OpenAI /v1/chat/completions batch format, one model per file, chunked to
+the provider's request-count and byte limits), plus:
+    DIR/manifest.jsonl  one line per request: custom_id -> grid cell
+    DIR/prompts.jsonl   each prompt once, keyed by prompt_id
+
+Once the batches have run, this script maps the downloaded result (and error) files
+back into the exact NDJSON record schema written by run_batch (METRIC_FIELDS included:
+token counts from the batch usage, timings None). tests/fixtures/batch holds a small
+batch dir with output/error files for checking the ingest offline.
+
+Usage:
+    python batch_mode.py --batch-dir batches/ --results batches/output_*.jsonl --out results/h1_runs.ndjson
+"""
+
+import argparse
+import hashlib
+import json
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from profiling import add_profile_arguments, phase, profile_session
+from run_experiment import (DEFAULT_MAX_TOKENS, METRIC_FIELDS, iter_cells, make_record, openai_chat_request,
+                            parse_model_spec, prompt_prefix)
+from run_writer import RecordWriter
+
+# (max requests, max bytes) per batch input file
+BATCH_LIMITS = {
+    "openai": (50000, 200 * 1024 * 1024),
+}
+DEFAULT_BATCH_LIMITS = BATCH_LIMITS["openai"]
+CHAT_COMPLETIONS_URL = "/v1/chat/completions"
+
+
+def custom_id_for(prompt_id: Any, provider: str, model: str, replicate: int) -> str:
+    digest = hashlib.sha1(json.dumps([prompt_id, provider, model, replicate]).encode("utf8")).hexdigest()
+    return f"cell-{digest[:24]}"
+
+
+def _safe_name(s: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in s)
+
+
+class _ChunkedRequestFile:
+    """Batch request file for one provider/model that rolls over at the provider's limits."""
+
+    def __init__(self, outdir: Path, provider: str, model: str):
+        self.outdir, self.provider, self.model = outdir, provider, model
+        self.max_requests, self.max_bytes = BATCH_LIMITS.get(provider.lower(), DEFAULT_BATCH_LIMITS)
+        self.paths: List[Path] = []
+        self._fh, self._requests, self._bytes = None, 0, 0
+
+    def write(self, line: str) -> Path:
+        size = len(line.encode("utf8"))
+        if self._fh is None or self._requests >= self.max_requests or self._bytes + size > self.max_bytes:
+            self.close()
+            path = self.outdir / f"batch_{_safe_name(self.provider)}_{_safe_name(self.model)}_{len(self.paths):04d}.jsonl"
+            self._fh = open(path, "w", encoding="utf8")
+            self.paths.append(path)
+            self._requests, self._bytes = 0, 0
+        self._fh.write(line)
+        self._requests += 1
+        self._bytes += size
+        return self.paths[-1]
+
+    def close(self):
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def build_batch_files(prompts: Iterable[Dict[str, Any]], model_specs: List[str], replicates: int, temperature: float,
+                      outdir: Path, max_tokens: int = DEFAULT_MAX_TOKENS,
+                      shard: Optional[Tuple[int, int]] = None) -> List[Path]:
+    """
+    Write batch request files, manifest.jsonl and prompts.jsonl to `outdir`; return the request files.
+    shard=(i, N) writes only the cells of shard i (run_experiment.shard_of).
+    `prompts` is consumed in one pass, so it may be a lazy stream. Request bodies are laid out
+    like live calls (run_experiment.openai_chat_request), prefix cache hint included.
+    """
+    outdir.mkdir(parents=True, exist_ok=True)
+    specs = [parse_model_spec(s) for s in model_specs]
+    files = {spec: _ChunkedRequestFile(outdir, *spec) for spec in specs}
+
+    with open(outdir / "prompts.jsonl", "w", encoding="utf8") as prompts_fh, \
+            open(outdir / "manifest.jsonl", "w", encoding="utf8") as manifest:
+        for p in prompts:
+            prompts_fh.write(json.dumps({"prompt_id": p.get("prompt_id"), "title": p.get("title"), "text": p.get("text")},
+                                        ensure_ascii=False) + "\n")
+            request = openai_chat_request(p["text"], prompt_prefix(p))
+            for _, provider, model, rep in iter_cells([p], specs, replicates, shard=shard):
+                cid = custom_id_for(p.get("prompt_id"), provider, model, rep)
+                path = files[(provider, model)].write(json.dumps({
+                    "custom_id": cid,
+                    "method": "POST",
+                    "url": CHAT_COMPLETIONS_URL,
+                    "body": {
+                        "model": model,
+                        **request,
+                        "temperature": temperature,
+                        "max_tokens": max_tokens,
+                    },
+                }, ensure_ascii=False) + "\n")
+                manifest.write(json.dumps({
+                    "custom_id": cid, "prompt_id": p.get("prompt_id"), "model_provider": provider,
+                    "model": model, "temperature": temperature, "replicate": rep, "batch_file": path.name,
+                }, ensure_ascii=False) + "\n")
+    for f in files.values():
+        f.close()
+    return [path for f in files.values() for path in f.paths]
+
+
+def _load_jsonl(path: Path) -> List[Dict[str, Any]]:
+    with open(path, "r", encoding="utf8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def parse_batch_result(result: Dict[str, Any]) -> Tuple[Any, Any, str, str]:
+    """Return (response_text, response_tokens, notes, timestamp) for one batch output/error line."""
+    response = result.get("response") or {}
+    body = response.get("body") or {}
+    created = body.get("created")
+    ts = (datetime.fromtimestamp(created, timezone.utc).replace(tzinfo=None).isoformat() + "Z") if created else \
+        datetime.utcnow().isoformat() + "Z"
+    error = result.get("error") or body.get("error")
+    status = response.get("status_code")
+    if error or (status is not None and status != 200):
+        return None, None, f"error: {json.dumps(error or {'status_code': status}, ensure_ascii=False)}", ts
+    try:
+        text = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError) as e:
+        return None, None, f"error: malformed batch result {repr(e)}", ts
+    return text, (body.get("usage") or {}).get("total_tokens"), "", ts
+
+
+def batch_metrics(result: Dict[str, Any]) -> Dict[str, Any]:
+    """METRIC_FIELDS for a batch result: token usage when reported; no timings, retries or hedges."""
+    body = (result.get("response") or {}).get("body") or {}
+    usage = body.get("usage") or {}
+    metrics = {f: None for f in METRIC_FIELDS}
+    metrics.update(prompt_tokens=usage.get("prompt_tokens"), completion_tokens=usage.get("completion_tokens"),
+                   cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens"),
+                   cache_hit=False)
+    return metrics
+
+
+def ingest_batch_results(batch_dir: Path, result_files: List[Path], out_path: Path) -> Dict[str, int]:
+    """
+    Append one run record per batch result to `out_path`. Counts: written, errors (error
+    records among them), unknown (custom_id not in the manifest), duplicates (a cell's
+    later results in this ingest; the first is kept) and missing (cells without a result).
+    """
+    prompts = {p["prompt_id"]: p for p in _load_jsonl(batch_dir / "prompts.jsonl")}
+    manifest = {m["custom_id"]: m for m in _load_jsonl(batch_dir / "manifest.jsonl")}
+    seen = set()
+    counts = {"written": 0, "errors": 0, "unknown": 0, "duplicates": 0, "missing": 0}
+
+    with RecordWriter(out_path) as writer:
+        for path in result_files:
+            with open(path, "r", encoding="utf8") as fh:
+                for line in fh:
+                    if not line.strip():
+                        continue
+                    result = json.loads(line)
+                    cid = result.get("custom_id")
+                    cell = manifest.get(cid)
+                    if cell is None:
+                        counts["unknown"] += 1
+                        continue
+                    if cid in seen:
+                        counts["duplicates"] += 1
+                        continue
+                    seen.add(cid)
+                    text, tokens, notes, ts = parse_batch_result(result)
+                    p = prompts.get(cell["prompt_id"], {"prompt_id": cell["prompt_id"]})
+                    # run_id is derived from the cell so it is stable across re-ingests
+                    run_id = str(uuid.uuid5(uuid.NAMESPACE_URL, cid))
+                    writer.write(make_record(run_id, ts, p, cell["model_provider"], cell["model"],
+                                             cell["temperature"], cell["replicate"], text, tokens, notes,
+                                             batch_metrics(result)))
+                    counts["written"] += 1
+                    if notes:
+                        counts["errors"] += 1
+    counts["missing"] = len(manifest) - len(seen)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-dir", required=True, help="Directory written by run_experiment.py --batch-mode")
+    parser.add_argument("--results", required=True, nargs="+", help="Downloaded batch output/error JSONL files")
+    parser.add_argument("--out", required=True, help="Output NDJSON run log (appended)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with profile_session(args, Path(args.out + ".profile.json"), "batch_mode") as prof:
+        with phase("ingest_batch_results"):
+            counts = ingest_batch_results(Path(args.batch_dir), [Path(r) for r in args.results], Path(args.out))
+        if prof is not None:
+            prof.extra["records"] = counts["written"]
+    print(f"{counts['written']} records written to {args.out} ({counts['errors']} errors, "
+          f"{counts['missing']} cells missing, {counts['unknown']} unknown and {counts['duplicates']} duplicate results)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+bias_stats.py
+
+Hypothesis tests for analyze_bias.py, vectorized with NumPy.
+
+For each hypothesis pair (H1-H4) it compares the two prompt conditions on:
+- sentiment: Welch t-test (from sufficient statistics), and when per-run scores are
+  available a bootstrap CI for the difference in means and a permutation p-value as
+  robustness checks; above RESAMPLE_MAX_N runs per arm the CI is the normal
+  approximation from the Welch standard error and no permutation test is run;
+- player mentions and recommendation types: a contingency test that drops empty
+  rows/columns and falls back to Fisher's exact test (2x2) or a Monte Carlo
+  permutation chi-square when expected counts are small.
+
+Resamples are generated in blocks as 2-D arrays (one row per resample) rather than
+Python loops (scipy is imported on first use, keeping `--help` fast); Monte Carlo p-values
+stop early once clearly non-significant. Each (hypothesis, outcome) contributes one
+primary p-value ("pval": Welch for sentiment, the contingency test otherwise), and that
+family is adjusted with Holm and Benjamini-Hochberg; the permutation p-value is reported
+alongside, unadjusted.
+
+Cost: resampling is O(resamples x runs) per sentiment test. With the cap, 100k runs
+(run_benchmarks.py --records 100000) take ~0.5s of stats; uncapped they took ~18s,
+for a CI that the normal approximation already matches at that size.
+"""
+
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+HYPOTHESIS_PAIRS = [
+    ("H1", "H1_neg", "H1_pos"),
+    ("H2", "H2_neutral", "H2_demo"),
+    ("H3", "H3_unprimed", "H3_primed"),
+    ("H4", "H4_shots_focus", "H4_turnover_focus"),
+]
+DEFAULT_RESAMPLES = 10000
+BLOCK_ELEMENTS = 4_000_000  # max array elements materialized per resampling block
+MIN_EXPECTED = 5.0
+STOP_AFTER_EXCEEDANCES = 200  # permutation / Monte Carlo tests stop once this many resamples are as extreme
+RESAMPLE_MAX_N = 5000  # runs per arm above which sentiment uses the asymptotic CI instead of resampling
+
+
+def _blocks(n_resamples: int, row_len: int):
+    per_block = max(1, BLOCK_ELEMENTS // max(1, row_len))
+    done = 0
+    while done < n_resamples:
+        size = min(per_block, n_resamples - done)
+        yield size
+        done += size
+
+
+def bootstrap_mean_diff_ci(a: np.ndarray, b: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES,
+                           alpha: float = 0.05, rng: Optional[np.random.Generator] = None) -> Tuple[float, float]:
+    """Percentile bootstrap CI for mean(a) - mean(b)."""
+    rng = rng or np.random.default_rng()
+    diffs = np.empty(n_resamples)
+    pos = 0
+    for size in _blocks(n_resamples, len(a) + len(b)):
+        ma = np.take(a, rng.integers(0, len(a), size=(size, len(a)), dtype=np.int32)).mean(axis=1)
+        mb = np.take(b, rng.integers(0, len(b), size=(size, len(b)), dtype=np.int32)).mean(axis=1)
+        diffs[pos:pos + size] = ma - mb
+        pos += size
+    lo, hi = np.quantile(diffs, [alpha / 2, 1 - alpha / 2])
+    return float(lo), float(hi)
+
+
+def _sequential_pvalue(block_exceedances, n_resamples: int, row_len: int, stop_after: int) -> Tuple[float, int]:
+    """
+    Monte Carlo p-value (extreme + 1) / (drawn + 1), drawing blocks until n_resamples or until
+    `stop_after` resamples were at least as extreme (Besag-Clifford): a large p-value is then
+    already resolved and the remaining resamples would not change the conclusion.
+    """
+    extreme = drawn = 0
+    for size in _blocks(n_resamples, row_len):
+        extreme += block_exceedances(size)
+        drawn += size
+        if stop_after and extreme >= stop_after:
+            break
+    return (extreme + 1) / (drawn + 1), drawn
+
+
+def permutation_test_mean_diff(a: np.ndarray, b: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES,
+                               rng: Optional[np.random.Generator] = None,
+                               stop_after: int = STOP_AFTER_EXCEEDANCES) -> Tuple[float, int]:
+    """Two-sided permutation p-value for mean(a) - mean(b); returns (pval, resamples drawn)."""
+    rng = rng or np.random.default_rng()
+    pooled = np.concatenate([a, b])
+    na, n = len(a), len(pooled)
+    total = pooled.sum()
+    observed = abs(a.mean() - b.mean())
+
+    def exceedances(size):
+        perm = rng.permuted(np.broadcast_to(pooled, (size, n)), axis=1)
+        sum_a = perm[:, :na].sum(axis=1)
+        diff = sum_a / na - (total - sum_a) / (n - na)
+        return int(np.count_nonzero(np.abs(diff) >= observed - 1e-12))
+
+    return _sequential_pvalue(exceedances, n_resamples, n, stop_after)
+
+
+def _chi2_stat(observed: np.ndarray, expected: np.ndarray) -> np.ndarray:
+    return ((observed - expected) ** 2 / expected).sum(axis=(-2, -1))
+
+
+def random_tables(row_sums: np.ndarray, col_sums: np.ndarray, size: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    `size` uniformly random tables with the given margins (the permutation null), built cell by
+    cell from hypergeometric draws vectorized over resamples: shape (size, rows, cols).
+    """
+    r, c = len(row_sums), len(col_sums)
+    tables = np.zeros((size, r, c), dtype=np.int64)
+    remaining = np.tile(np.asarray(col_sums, dtype=np.int64), (size, 1))
+    for i in range(r - 1):
+        need = np.full(size, row_sums[i], dtype=np.int64)
+        left = remaining.sum(axis=1)
+        for j in range(c - 1):
+            left = left - remaining[:, j]
+            x = rng.hypergeometric(remaining[:, j], left, need)
+            tables[:, i, j] = x
+            need -= x
+        tables[:, i, c - 1] = need
+        remaining -= tables[:, i]
+    tables[:, r - 1] = remaining
+    return tables
+
+
+def monte_carlo_chi2(table: np.ndarray, n_resamples: int = DEFAULT_RESAMPLES,
+                     rng: Optional[np.random.Generator] = None,
+                     stop_after: int = STOP_AFTER_EXCEEDANCES) -> Tuple[float, float, int]:
+    """Chi-square statistic with a Monte Carlo p-value under fixed margins; returns (chi2, pval, drawn)."""
+    rng = rng or np.random.default_rng()
+    row_sums, col_sums = table.sum(axis=1), table.sum(axis=0)
+    expected = np.outer(row_sums, col_sums) / table.sum()
+    observed_stat = float(_chi2_stat(table, expected))
+
+    def exceedances(size):
+        tables = random_tables(row_sums, col_sums, size, rng)
+        return int(np.count_nonzero(_chi2_stat(tables, expected) >= observed_stat - 1e-9))
+
+    pval, drawn = _sequential_pvalue(exceedances, n_resamples, table.size, stop_after)
+    return observed_stat, pval, drawn
+
+
+def contingency_test(table: pd.DataFrame, n_resamples: int = DEFAULT_RESAMPLES,
+                     rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+    """Association test for a count table, choosing the method by sparsity."""
+    t = table.fillna(0).to_numpy(dtype=np.int64)
+    t = t[t.sum(axis=1) > 0][:, t.sum(axis=0) > 0]
+    if t.ndim != 2 or t.shape[0] < 2 or t.shape[1] < 2:
+        return {"method": "none", "note": "fewer than 2 non-empty rows/columns; no association to test"}
+    expected = np.outer(t.sum(axis=1), t.sum(axis=0)) / t.sum()
+    from scipy import stats
+
+    if expected.min() >= MIN_EXPECTED or (t.shape != (2, 2) and n_resamples <= 0):
+        chi2_val, p_val, dof, _ = stats.chi2_contingency(t)
+        result = {"method": "chi2", "chi2": float(chi2_val), "dof": int(dof), "pval": float(p_val)}
+        if expected.min() < MIN_EXPECTED:
+            result["note"] = "small expected counts; asymptotic p-value"
+        return result
+    if t.shape == (2, 2):
+        odds, p_val = stats.fisher_exact(t)
+        return {"method": "fisher_exact", "odds_ratio": float(odds), "pval": float(p_val)}
+    chi2_val, p_val, drawn = monte_carlo_chi2(t, n_resamples, rng)
+    return {"method": "monte_carlo_chi2", "chi2": chi2_val, "resamples": drawn, "pval": float(p_val)}
+
+
+def holm(pvals: Sequence[float]) -> List[float]:
+    p = np.asarray(pvals, dtype=float)
+    order = np.argsort(p)
+    adjusted = np.maximum.accumulate((len(p) - np.arange(len(p))) * p[order])
+    out = np.empty_like(p)
+    out[order] = np.minimum(adjusted, 1.0)
+    return out.tolist()
+
+
+def benjamini_hochberg(pvals: Sequence[float]) -> List[float]:
+    p = np.asarray(pvals, dtype=float)
+    n = len(p)
+    order = np.argsort(p)
+    scaled = p[order] * n / np.arange(1, n + 1)
+    adjusted = np.minimum.accumulate(scaled[::-1])[::-1]
+    out = np.empty_like(p)
+    out[order] = np.minimum(adjusted, 1.0)
+    return out.tolist()
+
+
+def welch_from_stats(sa: Tuple[float, float, int], sb: Tuple[float, float, int]) -> Dict[str, Any]:
+    from scipy import stats
+
+    (mean_a, std_a, n_a), (mean_b, std_b, n_b) = sa, sb
+    tstat, pval = stats.ttest_ind_from_stats(mean_a, std_a, n_a, mean_b, std_b, n_b, equal_var=False)
+    return {"method": "welch_t", "mean_diff": float(mean_a - mean_b), "tstat": float(tstat), "pval": float(pval)}
+
+
+def normal_mean_diff_ci(sa: Tuple[float, float, int], sb: Tuple[float, float, int],
+                        alpha: float = 0.05) -> Tuple[float, float]:
+    """Normal-approximation CI for mean(a) - mean(b) from the Welch standard error."""
+    from scipy import stats
+
+    (mean_a, std_a, n_a), (mean_b, std_b, n_b) = sa, sb
+    se = np.sqrt(std_a ** 2 / n_a + std_b ** 2 / n_b)
+    z = stats.norm.ppf(1 - alpha / 2)
+    diff = mean_a - mean_b
+    return float(diff - z * se), float(diff + z * se)
+
+
+def sentiment_test(sa: Tuple[float, float, int], sb: Tuple[float, float, int],
+                   va: Optional[np.ndarray] = None, vb: Optional[np.ndarray] = None,
+                   n_resamples: int = DEFAULT_RESAMPLES, rng: Optional[np.random.Generator] = None,
+                   max_n: int = RESAMPLE_MAX_N) -> Dict[str, Any]:
+    """
+    Welch t-test (the primary p-value), plus a CI for the difference in means and a
+    permutation p-value when per-run scores are given. Arms larger than `max_n` get the
+    normal-approximation CI and no permutation test.
+    """
+    result = welch_from_stats(sa, sb)
+    if va is None or vb is None or n_resamples <= 0:
+        return result
+    if min(len(va), len(vb)) > max_n:
+        result["ci95"] = list(normal_mean_diff_ci(sa, sb))
+        result["ci_method"] = "normal"
+        return result
+    lo, hi = bootstrap_mean_diff_ci(va, vb, n_resamples, rng=rng)
+    perm_p, drawn = permutation_test_mean_diff(va, vb, n_resamples, rng=rng)
+    result.update({"ci95": [lo, hi], "ci_method": "bootstrap", "bootstrap_resamples": n_resamples,
+                   "permutation_pval": perm_p, "permutation_resamples": drawn})
+    return result
+
+
+def run_hypothesis_tests(sentiment_stats: Dict[str, Tuple[float, float, int]],
+                         mention_matrix: pd.DataFrame, rec_table: pd.DataFrame,
+                         sentiment_values: Optional[Dict[str, np.ndarray]] = None,
+                         n_resamples: int = DEFAULT_RESAMPLES, seed: Optional[int] = 0,
+                         pairs=HYPOTHESIS_PAIRS) -> List[Dict[str, Any]]:
+    """
+    Run every test for every hypothesis pair present in the data.
+    sentiment_stats: prompt_id -> (mean, std, n); sentiment_values (optional): prompt_id -> per-run
+    scores, enabling the bootstrap CI and permutation test. One entry per (hypothesis, outcome);
+    its "pval" is the one adjusted for multiple comparisons.
+    """
+    rng = np.random.default_rng(seed)
+    results = []
+
+    def add(hyp, a, b, outcome, fn):
+        entry = {"hypothesis": hyp, "conditions": [a, b], "outcome": outcome}
+        try:
+            entry.update(fn())
+        except Exception as e:
+            entry["error"] = repr(e)
+        results.append(entry)
+
+    for hyp, a, b in pairs:
+        if a in sentiment_stats and b in sentiment_stats:
+            values = sentiment_values if sentiment_values is not None else {}
+            va, vb = values.get(a), values.get(b)
+            if va is not None and vb is not None:
+                va, vb = np.asarray(va, dtype=float), np.asarray(vb, dtype=float)
+            add(hyp, a, b, "sentiment",
+                lambda: sentiment_test(sentiment_stats[a], sentiment_stats[b], va, vb, n_resamples, rng))
+        for outcome, table in (("mentions", mention_matrix), ("recommendations", rec_table)):
+            if a in table.index and b in table.index:
+                add(hyp, a, b, outcome, lambda: contingency_test(table.loc[[a, b]], n_resamples, rng))
+
+    tested = [i for i, r in enumerate(results) if "pval" in r and np.isfinite(r["pval"])]
+    if tested:
+        pvals = [results[i]["pval"] for i in tested]
+        for i, p_holm, p_bh in zip(tested, holm(pvals), benjamini_hochberg(pvals)):
+            results[i]["pval_holm"] = p_holm
+            results[i]["pval_bh"] = p_bh
+    return results
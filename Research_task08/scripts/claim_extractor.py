@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+claim_extractor.py
+
+Single-pass claim extraction (validate_claims.py --extractor single-pass).
+
+One compiled scanner walks a response once, left to right, and yields three kinds of
+tokens: a player mention, optionally followed by a numeric tail ("has 12 goals",
+"scored 3 goals"); a comparative cue ("most assists", "least goals", "highest number of
+turnovers", ...); and a sentence end ([.!?] before whitespace, or a newline).
+- Numeric claims are whole tokens, so they match exactly what the legacy
+  NUMERIC_PATTERNS match (metric words must end at a word boundary).
+- Comparative claims are resolved per sentence. A cue is attributed to the closest player
+  mentioned before it in the same sentence, or else to the first one after it ("Despite
+  having the most assists, Player C ..."), and a sentence yields at most one claim per
+  (type, player). The legacy COMPARATIVE_PATTERNS instead match `{entity}.*cue` over a
+  whole line: the first player on the line, one match per pattern, and backtracking
+  over the rest of the line for every mention. A cue with no player in its sentence
+  yields no claim (legacy "highest number of turnovers" produced one without a player).
+Work is one regex step per token plus constant bookkeeping, with no backtracking across
+sentences. Claims use the same dicts as validate_claims.extract_claims (claim_type,
+claim_text, groups), ordered like the legacy output: by claim type, then position.
+"""
+
+import re
+from typing import Dict, Any, List
+
+from roster import EntityMatcher
+
+CLAIM_TYPES = ("HAS_GOALS", "HAS_ASSISTS", "HAS_SHOTS", "HAS_TURNOVERS",
+               "MOST_ASSISTS", "MOST_SHOTS", "MOST_TURNOVERS", "LEAST_GOALS")
+NUMERIC_CLAIMS = {"goal": "HAS_GOALS", "assist": "HAS_ASSISTS", "shot": "HAS_SHOTS", "turnover": "HAS_TURNOVERS"}
+COMPARATIVE_CUES = {
+    "most assists": "MOST_ASSISTS",
+    "most shots": "MOST_SHOTS",
+    "most turnovers": "MOST_TURNOVERS",
+    "highest number of turnovers": "MOST_TURNOVERS",
+    "least goals": "LEAST_GOALS",
+}
+_ORDER = {ctype: i for i, ctype in enumerate(CLAIM_TYPES)}
+
+
+class ClaimExtractor:
+    """Numeric and comparative claims for one roster (EntityMatcher), in a single scan."""
+
+    def __init__(self, matcher: EntityMatcher):
+        cues = "|".join(re.escape(c).replace(r"\ ", " ") for c in COMPARATIVE_CUES)
+        self.scanner = re.compile(
+            r"(?P<ent>" + matcher.pattern + r")"
+            r"(?:\s+(?P<verb>scor(?:ed|es)|has)\s+(?P<num>\d+)\s+(?P<metric>goal|assist|shot|turnover)s?\b)?"
+            r"|\b(?P<cue>" + cues + r")"
+            r"|(?P<end>[.!?](?=\s|$)|\n)",
+            re.IGNORECASE)
+        # the matcher's own capturing group (the player as written) follows <ent>
+        self._player = self.scanner.groupindex["ent"] + 1
+
+    def extract(self, text: str) -> List[Dict[str, Any]]:
+        found = []
+        last = None     # (start, player) of the latest mention in the current sentence
+        pending = []    # (claim type, cue start) seen before any mention in the current sentence
+        seen = set()    # (claim type, player) already claimed in the current sentence
+        for m in self.scanner.finditer(text):
+            if m.start("ent") >= 0:
+                player = m.group(self._player)
+                last = (m.start(), player)
+                for ctype, cue_start in pending:
+                    self._comparative(found, seen, ctype, player, cue_start, text[cue_start:m.end("ent")])
+                pending = []
+                metric = m.group("metric")
+                if metric is not None:
+                    metric = metric.lower()
+                    # "scored"/"scores" only state goals
+                    if metric == "goal" or m.group("verb").lower() == "has":
+                        ctype = NUMERIC_CLAIMS[metric]
+                        found.append((_ORDER[ctype], m.start(), {"claim_type": ctype, "claim_text": m.group(0),
+                                                                 "groups": [player, m.group("num")]}))
+            elif m.start("cue") >= 0:
+                ctype = COMPARATIVE_CUES[m.group("cue").lower()]
+                if last is None:
+                    pending.append((ctype, m.start()))
+                else:
+                    self._comparative(found, seen, ctype, last[1], last[0], text[last[0]:m.end()])
+            else:
+                last = None
+                pending = []
+                seen.clear()
+        found.sort(key=lambda t: (t[0], t[1]))
+        return [claim for _, _, claim in found]
+
+    @staticmethod
+    def _comparative(found: list, seen: set, ctype: str, player: str, pos: int, claim_text: str):
+        key = (ctype, player.lower())
+        if key not in seen:
+            seen.add(key)
+            found.append((_ORDER[ctype], pos, {"claim_type": ctype, "claim_text": claim_text,
+                                               "groups": [player.strip()]}))
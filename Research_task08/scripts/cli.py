@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+cli.py
+
+Single entry point for the pipeline scripts. Each subcommand's module is imported only
+when that subcommand runs, so `--help` and light commands (design, validate, store) do
+not pay for pandas, matplotlib, scipy or the openai SDK.
+
+Usage:
+    python cli.py design --outdir ../prompts --overwrite
+    python cli.py run --prompts ../prompts/all_prompts.jsonl --models mock:echo --out ../results/runs.ndjson
+    python cli.py validate --gt ../data/ground_truth.csv --runs ../results/runs.ndjson --out ../results/validations.ndjson
+    python cli.py analyze --runs ../results/runs.ndjson --outdir ../analysis
+    python cli.py <command> --help
+
+Installed (pip install . from Research_task08/, see pyproject.toml) the same commands are
+available as `research-task <command> ...`.
+"""
+
+import argparse
+import importlib
+import os
+import sys
+
+# subcommand -> (module, description); modules expose main(argv=None)
+COMMANDS = {
+    "design": ("experiment_design", "Generate prompt files (optionally the full factorial design)"),
+    "run": ("run_experiment", "Run prompts against model backends and write NDJSON run logs"),
+    "validate": ("validate_claims", "Validate numeric and comparative claims against ground truth"),
+    "analyze": ("analyze_bias", "Aggregate run logs into bias tables, statistics and plots"),
+    "latency": ("latency_report", "Latency percentiles and tokens/sec per provider/model from run logs"),
+    "merge": ("merge_shards", "Merge --shard run logs: dedupe by cell, report missing cells, sort"),
+    "batch": ("batch_mode", "Ingest provider batch results written for --batch-mode"),
+    "log": ("run_log", "Compress run logs into indexed frames, look up runs, rebuild the index"),
+    "store": ("run_store", "Import/export NDJSON run logs and validations to a SQLite store"),
+    "mock-server": ("mock_server", "Serve the mock backend over HTTP (chat-completions shape)"),
+}
+
+
+def main(argv=None):
+    # installed as research_task.cli, the subcommand modules still import their siblings by name
+    here = os.path.dirname(os.path.abspath(__file__))
+    if here not in sys.path:
+        sys.path.insert(0, here)
+    parser = argparse.ArgumentParser(
+        description="Research task pipeline",
+        epilog="\n".join(f"  {name:<12} {desc}" for name, (_, desc) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command", help="One of the commands below")
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="Arguments for the command (see <command> --help)")
+    args = parser.parse_args(argv)
+
+    module_name, _ = COMMANDS[args.command]
+    module = importlib.import_module(module_name)
+    return module.main(args.args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
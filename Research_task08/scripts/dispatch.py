@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+dispatch.py
+
+Per-provider adapters and the request dispatcher used by run_experiment.py.
+
+- ProviderAdapter wraps one provider's call function and declares what it supports:
+  cancellation (the call watches a threading.Event and gives up when it is set) and a
+  per-request timeout (the remaining deadline is passed through to the client).
+- Dispatcher runs a request under an optional per-request deadline and optional
+  hedging: when the request has not finished after the recent p95 (--hedge-quantile)
+  latency of its provider/model, one duplicate is issued and the first success wins;
+  the other attempt is cancelled (cancellable adapters stop early, others finish in
+  the background and their result is dropped). Duplicates take their own slot from the
+  provider's AdaptiveLimiter (skipped when none is free) and are capped at
+  --hedge-budget of all requests, so hedging cannot snowball under load.
+- StandInProvider is a local provider with a fast/slow latency mix for exercising
+  deadlines and hedging offline (benchmarks/bench_hedging.py).
+
+Without a deadline or hedging a request runs inline in the caller's thread, exactly as
+a direct call would.
+"""
+
+import math
+import queue
+import random
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Optional, Tuple
+
+from rate_control import AdaptiveLimiter, is_rate_limit_error, retry_after_seconds
+
+DEFAULT_HEDGE_QUANTILE = 95.0
+DEFAULT_HEDGE_BUDGET = 0.1
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 500
+
+
+class DeadlineExceeded(TimeoutError):
+    """No attempt of a request finished within its deadline."""
+
+
+class CallCancelled(Exception):
+    """Raised by cancellable calls whose cancel event was set."""
+
+
+class ProviderAdapter:
+    """
+    One provider backend. `fn(prompt, model=..., temperature=..., max_tokens=...)`
+    returns the response dict (text, tokens, ...); it is also passed stream=True and
+    prefix=... when used, cancel=<threading.Event> if `cancellable` and
+    timeout=<seconds left> if `timeout` is supported.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Dict[str, Any]], cancellable: bool = False, timeout: bool = False):
+        self.name = name
+        self.fn = fn
+        self.cancellable = cancellable
+        self.supports_timeout = timeout
+
+    def call(self, prompt: str, model: str, temperature: float, max_tokens: int, stream: bool = False,
+             prefix: Optional[str] = None, cancel: Optional[threading.Event] = None,
+             timeout: Optional[float] = None) -> Dict[str, Any]:
+        kwargs = {"model": model, "temperature": temperature, "max_tokens": max_tokens}
+        if stream:
+            kwargs["stream"] = True
+        if prefix:
+            kwargs["prefix"] = prefix
+        if cancel is not None and self.cancellable:
+            kwargs["cancel"] = cancel
+        if timeout is not None and self.supports_timeout:
+            kwargs["timeout"] = timeout
+        return self.fn(prompt, **kwargs)
+
+
+class StandInProvider:
+    """
+    Local stand-in: answers after `latency` seconds, or `slow_latency` for a `slow_rate`
+    fraction of calls (a stalled request). Cancellable; use with
+    ProviderAdapter(name, StandInProvider(...), cancellable=True).
+    """
+
+    def __init__(self, latency: float = 0.05, slow_latency: float = 1.0, slow_rate: float = 0.05, seed: int = 0):
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.slow_rate = slow_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, model: str = "standin", temperature: float = 0.0, max_tokens: int = 512,
+                 cancel: Optional[threading.Event] = None, **_) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+            delay = self.slow_latency if self._rng.random() < self.slow_rate else self.latency
+        if cancel is not None:
+            if cancel.wait(delay):
+                raise CallCancelled("stand-in call cancelled")
+        else:
+            time.sleep(delay)
+        words = prompt.split()
+        return {"text": f"stand-in answer from {model}", "tokens": len(words) + 5, "prompt_tokens": len(words),
+                "completion_tokens": 5, "model": model}
+
+
+class LatencyTracker:
+    """Recent successful-call latencies per key, for the hedge delay."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[Any, deque] = {}
+        self._observed: Dict[Any, int] = {}  # observations ever made per key (the window stops growing)
+        self._cached: Dict[Tuple[Any, float], Tuple[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds: float):
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+            self._observed[key] = self._observed.get(key, 0) + 1
+
+    def quantile(self, key, q: float, min_samples: int) -> Optional[float]:
+        """Nearest-rank quantile `q` (0-100) of the window, None below `min_samples`; re-sorted every 16 observations."""
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None or len(samples) < min_samples:
+                return None
+            observed = self._observed[key]
+            cached = self._cached.get((key, q))
+            if cached is not None and observed - cached[0] < 16:
+                return cached[1]
+            n = len(samples)
+            ordered = sorted(samples)
+            value = ordered[min(n - 1, max(0, math.ceil(q / 100 * n) - 1))]
+            self._cached[(key, q)] = (observed, value)
+            return value
+
+
+class Dispatcher:
+    """Runs provider requests with optional deadlines and hedging (see module docstring)."""
+
+    def __init__(self, adapters: Dict[str, ProviderAdapter], deadline: Optional[float] = None, hedge: bool = False,
+                 hedge_quantile: float = DEFAULT_HEDGE_QUANTILE, hedge_budget: float = DEFAULT_HEDGE_BUDGET,
+                 hedge_min_samples: int = DEFAULT_HEDGE_MIN_SAMPLES, hedge_min_delay: float = 0.0):
+        self.adapters = adapters
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_budget = hedge_budget
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_min_delay = hedge_min_delay
+        self.latencies = LatencyTracker()
+        self.stats = {"requests": 0, "hedges": 0, "hedge_wins": 0, "cancels": 0, "deadline_exceeded": 0}
+        self._lock = threading.Lock()
+
+    def adapter(self, provider: str) -> ProviderAdapter:
+        adapter = self.adapters.get(provider.lower())
+        if adapter is None:
+            raise ValueError(f"Unknown provider {provider!r}; expected one of {sorted(self.adapters)}")
+        return adapter
+
+    def hedge_delay(self, provider: str, model: str) -> Optional[float]:
+        if not self.hedge:
+            return None
+        q = self.latencies.quantile((provider.lower(), model), self.hedge_quantile, self.hedge_min_samples)
+        return None if q is None else max(q, self.hedge_min_delay)
+
+    def _count(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self.stats[k] += v
+
+    def _take_hedge_budget(self) -> bool:
+        with self._lock:
+            if self.stats["hedges"] + 1 > self.hedge_budget * self.stats["requests"]:
+                return False
+            self.stats["hedges"] += 1
+            return True
+
+    def deadline_at(self) -> Optional[float]:
+        """perf_counter() time by which a request starting now must finish (None without a deadline)."""
+        return None if self.deadline is None else time.perf_counter() + self.deadline
+
+    def deadline_error(self, provider: str, model: str) -> DeadlineExceeded:
+        """Count an exceeded deadline and return the exception to raise."""
+        self._count(deadline_exceeded=1)
+        return DeadlineExceeded(f"{provider}:{model} request exceeded the {self.deadline:g}s deadline")
+
+    def call(self, prompt: str, provider: str, model: str, temperature: float, max_tokens: int, stream: bool = False,
+             prefix: Optional[str] = None, limiter: Optional[AdaptiveLimiter] = None,
+             metrics: Optional[Dict[str, Any]] = None, deadline_at: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Run one request. If `limiter` is given the caller has already acquired one slot for
+        the first attempt; every attempt releases its own slot when it finishes. `metrics`
+        gets hedges (duplicates issued), cancels (attempts cancelled) and hedge_won.
+        `deadline_at` (from deadline_at()) lets a caller that retries keep one deadline for
+        the whole request; by default the deadline starts now.
+        """
+        adapter = self.adapter(provider)
+        metrics = {} if metrics is None else metrics
+        for k in ("hedges", "cancels"):
+            metrics[k] = metrics.get(k) or 0  # accumulated over the caller's retries
+        metrics["hedge_won"] = False
+        self._count(requests=1)
+        key = (provider.lower(), model)
+        hedge_delay = self.hedge_delay(provider, model)
+        start = time.perf_counter()
+        end = deadline_at if deadline_at is not None else self.deadline_at()
+        if end is not None and start >= end:
+            if limiter is not None:
+                limiter.release(adjust=False)
+            raise self.deadline_error(provider, model)
+
+        if end is None and hedge_delay is None:
+            resp = self._attempt(adapter, prompt, model, temperature, max_tokens, stream, prefix, None, None, limiter)
+            self.latencies.observe(key, time.perf_counter() - start)
+            return resp
+
+        results: "queue.Queue" = queue.Queue()
+        cancels = []
+
+        def launch(idx: int, attempt_limiter: Optional[AdaptiveLimiter]):
+            cancel = threading.Event()
+            cancels.append(cancel)
+            timeout = None if end is None else max(0.0, end - time.perf_counter())
+
+            def run():
+                t0 = time.perf_counter()
+                try:
+                    resp = self._attempt(adapter, prompt, model, temperature, max_tokens, stream, prefix, cancel,
+                                         timeout, attempt_limiter)
+                except BaseException as e:
+                    results.put((idx, False, e, None))
+                    return
+                results.put((idx, True, resp, time.perf_counter() - t0))
+
+            threading.Thread(target=run, name=f"dispatch-{adapter.name}-{idx}", daemon=True).start()
+
+        launch(0, limiter)
+        pending, first_error = 1, None
+        hedge_at = start + hedge_delay if hedge_delay is not None else None
+        while True:
+            now = time.perf_counter()
+            waits = [t - now for t in (hedge_at, end) if t is not None]
+            try:
+                idx, ok, value, elapsed = results.get(timeout=max(0.0, min(waits)) if waits else None)
+            except queue.Empty:
+                if end is not None and time.perf_counter() >= end:
+                    self._cancel(cancels, metrics, pending)
+                    raise self.deadline_error(provider, model)
+                hedge_at = None
+                if self._take_hedge_budget():
+                    if limiter is None or limiter.try_acquire():
+                        launch(len(cancels), limiter)
+                        pending += 1
+                        metrics["hedges"] += 1
+                    else:
+                        self._count(hedges=-1)
+                continue
+            pending -= 1
+            if ok:
+                self._cancel(cancels, metrics, pending)
+                metrics["hedge_won"] = idx > 0
+                if idx > 0:
+                    self._count(hedge_wins=1)
+                self.latencies.observe(key, elapsed)
+                return value
+            first_error = first_error or value
+            if pending == 0:
+                raise first_error
+
+    def _cancel(self, cancels, metrics: Dict[str, Any], pending: int):
+        for cancel in cancels:
+            cancel.set()
+        if pending:
+            metrics["cancels"] += pending
+            self._count(cancels=pending)
+
+    @staticmethod
+    def _attempt(adapter: ProviderAdapter, prompt: str, model: str, temperature: float, max_tokens: int, stream: bool,
+                 prefix: Optional[str], cancel: Optional[threading.Event], timeout: Optional[float],
+                 limiter: Optional[AdaptiveLimiter]) -> Dict[str, Any]:
+        # the attempt owns its limiter slot; a cancelled attempt releases it without moving the limit
+        try:
+            resp = adapter.call(prompt, model, temperature, max_tokens, stream=stream, prefix=prefix, cancel=cancel,
+                                timeout=timeout)
+        except BaseException as e:
+            if limiter is not None:
+                cancelled = cancel is not None and cancel.is_set()
+                rate_limited = is_rate_limit_error(e)
+                limiter.release(rate_limited=rate_limited, retry_after=retry_after_seconds(e) if rate_limited else None,
+                                adjust=not cancelled)
+            raise
+        if limiter is not None:
+            limiter.release(adjust=not (cancel is not None and cancel.is_set()))
+        return resp
@@ -16,18 +16,32 @@ Saves prompts in `prompts/` as .jsonl and plain .txt variants.
 
 Usage:
     python experiment_design.py --outdir ../prompts --overwrite
+    python experiment_design.py --outdir ../prompts_factorial --factorial --no-txt --shard-size 50000 --overwrite
 
 Outputs:
     - prompts/H1_neg.txt, H1_pos.txt, etc.
     - prompts/all_prompts.jsonl (one JSON per prompt with metadata)
+      Each entry carries "prefix" (everything up to and including the season data block,
+      shared by every prompt on the same season/order/labels/framing) and "suffix" (the
+      question), with text == prefix + suffix, so runners can lay requests out for
+      provider-side prompt prefix caching.
+    - with --factorial: prompts/prompts-00000.jsonl, ... (sharded), expanding
+      templates x framing variants x player-order permutations x label schemes x seasons
+      lazily and skipping prompts whose text was already emitted (content hash).
 """
 
 import argparse
+import hashlib
+import itertools
 import json
 import os
+import re
 from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple
 from uuid import uuid4
 
+from profiling import add_profile_arguments, phase, profile_session
+
 BASE_DATA_SNIPPET = """Season stats (Team total): Games 19, Goals 235, Shots 538, ShotPct .437, ShotsOnGoal 402, FreePos 44/90 (.489), DrawControls 240, Turnovers 270, CausedTurnovers 153.
 
 Top players (anonymized):
@@ -77,16 +91,207 @@ PROMPT_TEMPLATES = {
 }
 
 
+# ---- Factorial design ----
+# Structured form of BASE_DATA_SNIPPET; render_data_snippet(DEFAULT_SEASON, default order, "letters")
+# reproduces it exactly. Extra seasons can be loaded with --seasons (JSON in the same shape).
+SEASONS = {
+    "base": {
+        "team": "Season stats (Team total): Games 19, Goals 235, Shots 538, ShotPct .437, ShotsOnGoal 402, "
+                "FreePos 44/90 (.489), DrawControls 240, Turnovers 270, CausedTurnovers 153.",
+        "players": [
+            {"name": "Muchnick", "G": 34, "A": 7, "Shots": 71, "TO": 13},
+            {"name": "Trinkaus", "G": 32, "A": 11, "Shots": 72, "TO": 16},
+            {"name": "Ward", "G": 30, "A": 46, "Shots": 77, "TO": 41},
+        ],
+    },
+}
+DEFAULT_SEASON = "base"
+
+# (prefix, suffix) wrapped around each template's text
+FRAMINGS = {
+    "plain": ("", ""),
+    "analyst": ("You are a performance analyst for a college lacrosse team.\n\n", ""),
+    "concise": ("", "\nKeep the answer under 150 words."),
+}
+
+GREEK = ["Alpha", "Beta", "Gamma", "Delta", "Epsilon", "Zeta", "Eta", "Theta", "Iota", "Kappa", "Lambda", "Mu"]
+
+
+def _letters(i: int) -> str:
+    label = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        label = chr(65 + r) + label
+    return label
+
+
+# label scheme -> (label for the i-th listed player, whether the anonymization key line is shown)
+LABEL_SCHEMES = {
+    "letters": (lambda i, name: f"Player {_letters(i)}", True),
+    "numbers": (lambda i, name: f"Player {i + 1}", True),
+    "greek": (lambda i, name: f"Player {GREEK[i % len(GREEK)]}" + (str(i // len(GREEK)) if i >= len(GREEK) else ""), True),
+    "names": (lambda i, name: name, False),
+}
+
+
+def render_data_snippet(season: Dict[str, Any], order: Sequence[int], labels: Sequence[str], show_key: bool = True) -> str:
+    """Season block listing players in `order`; labels[j] is the label of the j-th listed player."""
+    players = season["players"]
+    lines = [season["team"], "", "Top players (anonymized):" if show_key else "Top players:"]
+    for label, idx in zip(labels, order):
+        p = players[idx]
+        lines.append(f"- {label}: G={p['G']}, A={p['A']}, Shots={p['Shots']}, TO={p['TO']}")
+    if show_key:
+        lines.append("(Anonymized labels: " + ", ".join(f"{label}={players[idx]['name']}" for label, idx in zip(labels, order)) + ")")
+    return "\n".join(lines) + "\n"
+
+
+def _relabel(text: str, mapping: Dict[str, str]) -> str:
+    # single pass so that e.g. A->B and B->A do not chain
+    if all(k == v for k, v in mapping.items()):
+        return text
+    pattern = re.compile("|".join(re.escape(k) for k in sorted(mapping, key=len, reverse=True)) + r"\b")
+    return pattern.sub(lambda m: mapping[m.group(0)], text)
+
+
+def split_template(template_text: str, base: str, prefix: str = "", suffix: str = "") -> Tuple[str, str]:
+    """
+    Render a template (with "{base}" already relabeled) around `base` and optional framing
+    prefix/suffix, returned as (shared prefix, variable suffix). The prefix ends with the
+    data block; a template without "{base}" is all suffix.
+    """
+    head, sep, tail = template_text.partition("{base}")
+    if not sep:
+        return prefix, template_text + suffix
+    return prefix + head + base, tail + suffix
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf8")).hexdigest()
+
+
+def iter_design(templates: Optional[Iterable[str]] = None, framings: Optional[Iterable[str]] = None,
+                label_schemes: Optional[Iterable[str]] = None, seasons: Optional[Dict[str, Dict[str, Any]]] = None,
+                permute_order: bool = True, max_orders: Optional[int] = None, dedupe: bool = True) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily expand the factorial design into prompt entries (same schema as all_prompts.jsonl
+    plus "template", "factors" and "content_hash"). Templates refer to players by their
+    default labels (Player A = first player of the season, ...); those are rewritten per
+    variant so each player keeps its identity under reordering and relabeling.
+    Only content hashes are retained for deduplication, never the prompts themselves.
+    """
+    templates = list(templates or PROMPT_TEMPLATES)
+    framings = list(framings or FRAMINGS)
+    label_schemes = list(label_schemes or LABEL_SCHEMES)
+    seasons = seasons or SEASONS
+    seen = set()
+
+    for season_key, season in seasons.items():
+        n = len(season["players"])
+        default_labels = [LABEL_SCHEMES["letters"][0](i, None) for i in range(n)]
+        orders = itertools.permutations(range(n)) if permute_order else iter([tuple(range(n))])
+        for order in itertools.islice(orders, max_orders):
+            order_key = "".join(str(i) for i in order) if n <= 10 else "-".join(str(i) for i in order)
+            for scheme in label_schemes:
+                label_fn, show_key = LABEL_SCHEMES[scheme]
+                # listed position j shows player order[j]
+                new_label = {order[j]: label_fn(j, season["players"][order[j]]["name"]) for j in range(n)}
+                listed_labels = [new_label[idx] for idx in order]
+                base = render_data_snippet(season, order, listed_labels, show_key)
+                mapping = {default_labels[i]: new_label[i] for i in range(n)}
+                for key in templates:
+                    meta = PROMPT_TEMPLATES[key]
+                    template_text = _relabel(meta["text"].replace("{base}", "\x00"), mapping).replace("\x00", "{base}")
+                    for framing in framings:
+                        shared, question = split_template(template_text, base, *FRAMINGS[framing])
+                        text = shared + question
+                        h = content_hash(text)
+                        if dedupe:
+                            if h in seen:
+                                continue
+                            seen.add(h)
+                        yield {
+                            "prompt_id": f"{key}__{framing}__o{order_key}__{scheme}__{season_key}",
+                            "uuid": str(uuid4()),
+                            "title": meta["title"],
+                            "text": text,
+                            "prefix": shared,
+                            "suffix": question,
+                            "template": key,
+                            "factors": {"framing": framing, "order": list(order), "labels": scheme, "season": season_key},
+                            "content_hash": h,
+                        }
+
+
+def write_prompt_shards(entries: Iterable[Dict[str, Any]], outdir: Path, shard_size: int = 50000,
+                        write_txt: bool = True) -> List[Path]:
+    """Stream entries into prompts-00000.jsonl, prompts-00001.jsonl, ... (and optional per-prompt .txt)."""
+    outdir.mkdir(parents=True, exist_ok=True)
+    shards = []
+    fh = None
+    count = 0
+    try:
+        for e in entries:
+            if fh is None or count >= shard_size:
+                if fh is not None:
+                    fh.close()
+                path = outdir / f"prompts-{len(shards):05d}.jsonl"
+                fh = open(path, "w", encoding="utf8")
+                shards.append(path)
+                count = 0
+            fh.write(json.dumps(e, ensure_ascii=False) + "\n")
+            count += 1
+            if write_txt:
+                with open(outdir / f"{e['prompt_id']}.txt", "w", encoding="utf8") as f:
+                    f.write(e["text"])
+    finally:
+        if fh is not None:
+            fh.close()
+    return shards
+
+
+def remove_prompt_txt(outdir: Path, jsonl_paths: Iterable[Path]) -> int:
+    """
+    Delete the per-prompt .txt files written for the prompts in `jsonl_paths` (outputs about to
+    be replaced), so a smaller or different design leaves no stale prompts behind. Other .txt
+    files in `outdir` are not ours and are kept. Returns the number removed.
+    """
+    removed = 0
+    for path in jsonl_paths:
+        with open(path, "r", encoding="utf8") as fh:
+            for line in fh:
+                try:
+                    pid = json.loads(line).get("prompt_id")
+                except ValueError:
+                    continue
+                if not isinstance(pid, str) or Path(pid).name != pid:
+                    continue
+                txt = outdir / f"{pid}.txt"
+                if txt.exists():
+                    txt.unlink()
+                    removed += 1
+    return removed
+
+
+def load_seasons(path: Path) -> Dict[str, Dict[str, Any]]:
+    with open(path, "r", encoding="utf8") as fh:
+        return json.load(fh)
+
+
 def build_prompts(outdir: Path, overwrite: bool = False):
     outdir.mkdir(parents=True, exist_ok=True)
     jsonl_path = outdir / "all_prompts.jsonl"
 
     if jsonl_path.exists() and not overwrite:
         raise FileExistsError(f"{jsonl_path} exists. Use --overwrite to replace.")
+    if jsonl_path.exists():
+        remove_prompt_txt(outdir, [jsonl_path])
 
     entries = []
     for key, meta in PROMPT_TEMPLATES.items():
-        text = meta["text"].format(base=BASE_DATA_SNIPPET)
+        prefix, suffix = split_template(meta["text"], BASE_DATA_SNIPPET)
+        text = prefix + suffix
         filename_txt = outdir / f"{key}.txt"
         with open(filename_txt, "w", encoding="utf8") as f:
             f.write(text)
@@ -94,7 +299,9 @@ def build_prompts(outdir: Path, overwrite: bool = False):
             "prompt_id": key,
             "uuid": str(uuid4()),
             "title": meta["title"],
-            "text": text
+            "text": text,
+            "prefix": prefix,
+            "suffix": suffix,
         }
         entries.append(entry)
 
@@ -107,16 +314,53 @@ def build_prompts(outdir: Path, overwrite: bool = False):
     return jsonl_path
 
 
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--outdir", default="./prompts", help="Output directory for prompts")
-    parser.add_argument("--overwrite", action="store_true", help="Overwrite existing outputs")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="Overwrite existing outputs (removing the .txt files of the prompts they replace)")
+    parser.add_argument("--factorial", action="store_true", help="Expand the full factorial design into sharded JSONL")
+    parser.add_argument("--framings", default=None, help=f"Comma-separated framing variants (default all: {','.join(FRAMINGS)})")
+    parser.add_argument("--label-schemes", default=None, help=f"Comma-separated label schemes (default all: {','.join(LABEL_SCHEMES)})")
+    parser.add_argument("--templates", default=None, help="Comma-separated template keys (default all)")
+    parser.add_argument("--seasons", default=None, help="JSON file of season snippets (default: the built-in season)")
+    parser.add_argument("--no-permutations", action="store_true", help="Keep the default player order")
+    parser.add_argument("--max-orders", type=int, default=None, help="Cap player-order permutations per season")
+    parser.add_argument("--shard-size", type=int, default=50000, help="Prompts per JSONL shard")
+    parser.add_argument("--no-txt", action="store_true", help="Skip per-prompt .txt files")
+
+    add_profile_arguments(parser)
 
     # NEW: Ignore unexpected Jupyter args like "-f"
-    args, unknown = parser.parse_known_args()
+    args, unknown = parser.parse_known_args(argv)
 
     outdir = Path(args.outdir)
-    build_prompts(outdir, overwrite=args.overwrite)
+    with profile_session(args, outdir / "profile.json", "experiment_design"):
+        _design(args, outdir)
+
+
+def _design(args, outdir: Path):
+    if not args.factorial:
+        with phase("build_prompts"):
+            build_prompts(outdir, overwrite=args.overwrite)
+        return
+
+    old_shards = sorted(outdir.glob("prompts-*.jsonl"))
+    if old_shards and not args.overwrite:
+        raise FileExistsError(f"{outdir} already has prompt shards. Use --overwrite to replace.")
+    stale = remove_prompt_txt(outdir, old_shards)
+    for old in old_shards:
+        old.unlink()
+    if stale:
+        print(f"Removed {stale} .txt files of the previous design")
+    split = lambda v: [x.strip() for x in v.split(",") if x.strip()] if v else None
+    entries = iter_design(templates=split(args.templates), framings=split(args.framings),
+                          label_schemes=split(args.label_schemes),
+                          seasons=load_seasons(Path(args.seasons)) if args.seasons else None,
+                          permute_order=not args.no_permutations, max_orders=args.max_orders)
+    with phase("write_prompt_shards"):
+        shards = write_prompt_shards(entries, outdir, shard_size=args.shard_size, write_txt=not args.no_txt)
+    print(f"Factorial prompts written to {outdir} ({len(shards)} shards)")
 
 
 if __name__ == "__main__":
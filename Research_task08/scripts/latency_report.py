@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+latency_report.py
+
+Latency and throughput summary per provider/model from the per-call instrumentation
+in run records (run_experiment.py): latency_ms, ttft_ms, queue_wait_ms, prompt_tokens,
+cached_tokens, completion_tokens, retries, cache_hit, hedges, cancels, hedge_won.
+
+Percentiles cover calls that reached the provider (errors and cache hits are only
+counted). tokens/sec is completion tokens over call latency; decode tokens/sec uses the
+time after the first token (streamed runs only). cached_input_pct is the share of input
+tokens the provider served from its prompt prefix cache. hedges / hedge_wins / cancels
+count duplicate requests issued by --hedge, those that finished first, and attempts
+cancelled (losing hedges and requests past --deadline).
+
+Usage:
+    python latency_report.py --runs ../results/runs.ndjson
+    python latency_report.py --runs ../results/runs.ndjson --out ../analysis/latency_report.csv
+"""
+
+import argparse
+import csv
+import json
+import math
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from profiling import add_profile_arguments, phase, profile_session, timed_iter
+from run_log import iter_records as iter_log_records
+from run_store import connect as connect_store, is_store_path, iter_run_records
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values: List[float], q: float) -> Optional[float]:
+    """Linear-interpolated percentile of an ascending list (None if empty)."""
+    if not sorted_values:
+        return None
+    pos = (len(sorted_values) - 1) * q / 100
+    lo, hi = math.floor(pos), math.ceil(pos)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def iter_records(runs_path: Path) -> Iterator[Dict[str, Any]]:
+    if is_store_path(runs_path):
+        conn = connect_store(runs_path, readonly=True)
+        try:
+            yield from iter_run_records(conn)
+        finally:
+            conn.close()
+        return
+    yield from iter_log_records(runs_path)
+
+
+def summarize(records: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    groups = defaultdict(lambda: defaultdict(list))
+    counts = defaultdict(lambda: defaultdict(int))
+    for r in records:
+        key = (r.get("model_provider"), r.get("model"))
+        c = counts[key]
+        c["records"] += 1
+        if "latency_ms" not in r:
+            c["uninstrumented"] += 1
+            continue
+        c["retries"] += r.get("retries") or 0
+        c["hedges"] += r.get("hedges") or 0
+        c["hedge_wins"] += 1 if r.get("hedge_won") else 0
+        c["cancels"] += r.get("cancels") or 0
+        if (r.get("notes") or "").startswith("error:"):
+            c["errors"] += 1
+            continue
+        if r.get("cache_hit"):
+            c["cache_hits"] += 1
+            continue
+        g = groups[key]
+        for f in ("latency_ms", "ttft_ms", "queue_wait_ms"):
+            if r.get(f) is not None:
+                g[f].append(float(r[f]))
+        completion, latency = r.get("completion_tokens"), r.get("latency_ms")
+        if completion is not None and latency:
+            c["completion_tokens"] += completion
+            c["prompt_tokens"] += r.get("prompt_tokens") or 0
+            c["cached_tokens"] += r.get("cached_tokens") or 0
+            g["tokens_per_s"].append(completion / (latency / 1000))
+            ttft = r.get("ttft_ms")
+            if ttft is not None and latency > ttft:
+                g["decode_tokens_per_s"].append(completion / ((latency - ttft) / 1000))
+
+    rows = []
+    for key in sorted(counts, key=lambda k: (str(k[0]), str(k[1]))):
+        c, g = counts[key], groups[key]
+        row = {"model_provider": key[0], "model": key[1], "records": c["records"], "calls": len(g["latency_ms"]),
+               "errors": c["errors"], "cache_hits": c["cache_hits"], "retries": c["retries"],
+               "uninstrumented": c["uninstrumented"], "hedges": c["hedges"], "hedge_wins": c["hedge_wins"],
+               "cancels": c["cancels"],
+               "prompt_tokens": c["prompt_tokens"], "cached_tokens": c["cached_tokens"],
+               "cached_input_pct": 100 * c["cached_tokens"] / c["prompt_tokens"] if c["prompt_tokens"] else None,
+               "completion_tokens": c["completion_tokens"]}
+        for f in ("latency_ms", "ttft_ms", "queue_wait_ms"):
+            values = sorted(g[f])
+            row[f"{f}_mean"] = sum(values) / len(values) if values else None
+            for q in PERCENTILES:
+                row[f"{f}_p{q}"] = percentile(values, q)
+            row[f"{f}_max"] = values[-1] if values else None
+        for f in ("tokens_per_s", "decode_tokens_per_s"):
+            values = sorted(g[f])
+            row[f"{f}_p50"] = percentile(values, 50)
+        rows.append(row)
+    return rows
+
+
+def print_table(rows: List[Dict[str, Any]]):
+    def fmt(v):
+        return "-" if v is None else f"{v:.0f}" if isinstance(v, float) else str(v)
+
+    cols = ["model_provider", "model", "calls", "errors", "cache_hits", "uninstrumented", "retries", "hedges", "latency_ms_p50",
+            "latency_ms_p95", "latency_ms_p99", "ttft_ms_p50", "ttft_ms_p95", "queue_wait_ms_p95", "tokens_per_s_p50",
+            "cached_input_pct"]
+    table = [cols] + [[fmt(r[c]) for c in cols] for r in rows]
+    widths = [max(len(line[i]) for line in table) for i in range(len(cols))]
+    for line in table:
+        print("  ".join(v.rjust(w) for v, w in zip(line, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", required=True, help="NDJSON run log (or a run_store.py SQLite store)")
+    parser.add_argument("--out", default=None, help="Optional CSV with every column (.json writes JSON instead)")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with profile_session(args, Path((args.out or args.runs + ".latency") + ".profile.json"), "latency_report"):
+        # summarize includes the load_runs time it spends pulling records
+        with phase("summarize"):
+            rows = summarize(timed_iter(iter_records(Path(args.runs)), "load_runs"))
+        print_table(rows)
+        if args.out:
+            out = Path(args.out)
+            out.parent.mkdir(parents=True, exist_ok=True)
+            with phase("output"), open(out, "w", encoding="utf8", newline="") as fh:
+                if out.suffix == ".json":
+                    json.dump(rows, fh, indent=2)
+                elif rows:
+                    writer = csv.DictWriter(fh, fieldnames=list(rows[0]))
+                    writer.writeheader()
+                    writer.writerows(rows)
+            print(f"Latency report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+merge_shards.py
+
+Combine the run logs written by `run_experiment.py --shard i/N` workers into one NDJSON
+file that validate_claims.py and analyze_bias.py read like any other run log.
+
+- Records are keyed by grid cell (prompt_id, provider, model, replicate). When a cell
+  appears more than once (a re-run shard, a resumed run, overlapping inputs) a successful
+  record wins over an "error:" record, then the earliest timestamp_utc (then run_id). Records without a
+  replicate are kept as they are (deduplicated by run_id).
+- The output is sorted by cell key, and the kept lines are copied byte for byte, so the
+  same inputs always give the same file whatever the order they are listed in.
+- Given the grid (--prompts, --models, --replicates), cells without a successful record
+  are reported, per shard with --shards N, and can be written to --missing as JSONL.
+  Truncated trailing lines (a killed worker) are skipped and counted.
+- Inputs and output may be compressed run logs (run_log.py, .gz/.zst); a compressed
+  output gets its run_id/prompt_id index.
+
+Usage:
+    python merge_shards.py ../results/h1_runs.shard*.ndjson --out ../results/h1_runs.ndjson
+    python merge_shards.py ../results/h1_runs.shard*.ndjson --out ../results/h1_runs.ndjson \
+        --prompts ../Prompts/all_prompts.jsonl --models openai:gpt-4 --replicates 30 --shards 4 \
+        --missing ../results/h1_missing.jsonl
+"""
+
+import argparse
+import json
+from collections import Counter
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+from profiling import add_profile_arguments, phase, profile_session
+from run_log import FramedWriter, is_framed_path, iter_lines
+from run_experiment import cell_key, iter_prompts, parse_model_spec, shard_of
+
+
+def _is_error(record: Dict[str, Any]) -> bool:
+    return (record.get("notes") or "").startswith("error:")
+
+
+def _sort_key(key: Tuple[Any, str, str, Optional[int]]) -> Tuple[str, str, str, int]:
+    prompt_id, provider, model, replicate = key
+    return (str(prompt_id), str(provider), str(model), -1 if replicate is None else replicate)
+
+
+class ShardMerger:
+    """Keeps the preferred line per cell across any number of shard logs."""
+
+    def __init__(self):
+        # cell key -> (rank, line); rank sorts the preferred record first
+        self.cells: Dict[Tuple[Any, str, str, int], Tuple[Tuple[int, str, str], str]] = {}
+        self.unkeyed: Dict[Any, Tuple[Any, str]] = {}  # run_id -> (prompt_id, line), for records without a replicate
+        self.stats = Counter()
+
+    def add_file(self, path: Path) -> int:
+        n = 0
+        for line in iter_lines(path):
+            line = line.rstrip("\n")
+            try:
+                r = json.loads(line)
+            except ValueError:
+                self.stats["bad_lines"] += 1
+                continue
+            self.add(r, line)
+            n += 1
+        self.stats["files"] += 1
+        return n
+
+    def add(self, r: Dict[str, Any], line: str):
+        self.stats["records"] += 1
+        if r.get("replicate") is None:
+            rid = r.get("run_id")
+            if rid in self.unkeyed:
+                self.stats["duplicates"] += 1
+            else:
+                self.unkeyed[rid] = (r.get("prompt_id"), line)
+            return
+        key = cell_key(r.get("prompt_id"), r.get("model_provider"), r.get("model"), r.get("replicate"))
+        rank = (1 if _is_error(r) else 0, r.get("timestamp_utc") or "", str(r.get("run_id")))
+        current = self.cells.get(key)
+        if current is not None:
+            self.stats["duplicates"] += 1
+            if current[0] <= rank:
+                return
+        self.cells[key] = (rank, line)
+
+    def completed(self) -> set:
+        return {key for key, (rank, _) in self.cells.items() if rank[0] == 0}
+
+    def iter_sorted(self) -> Iterator[Tuple[Any, Any, str]]:
+        """(run_id, prompt_id, line) of the kept records in output order."""
+        for key in sorted(self.cells, key=_sort_key):
+            rank, line = self.cells[key]
+            yield rank[2], key[0], line
+        for rid in sorted(self.unkeyed, key=str):
+            yield rid, self.unkeyed[rid][0], self.unkeyed[rid][1]
+
+    def write(self, out_path: Path) -> int:
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        n = 0
+        if is_framed_path(out_path):
+            writer = FramedWriter(out_path, append=False)
+            try:
+                for run_id, prompt_id, line in self.iter_sorted():
+                    writer.add(line + "\n", run_id, prompt_id)
+                    n += 1
+            finally:
+                writer.close()
+            return n
+        with open(out_path, "w", encoding="utf8") as fh:
+            for _, _, line in self.iter_sorted():
+                fh.write(line + "\n")
+                n += 1
+        return n
+
+
+def missing_cells(prompts: Iterable[Dict[str, Any]], specs: List[Tuple[str, str]], replicates: int,
+                  completed: set, shards: Optional[int] = None) -> List[Dict[str, Any]]:
+    """Grid cells without a successful record, with their shard when `shards` is given."""
+    missing = []
+    for p in prompts:
+        pid = p.get("prompt_id")
+        for provider, model in specs:
+            for rep in range(replicates):
+                if cell_key(pid, provider, model, rep) in completed:
+                    continue
+                cell = {"prompt_id": pid, "model_provider": provider, "model": model, "replicate": rep}
+                if shards:
+                    cell["shard"] = shard_of(pid, provider, model, rep, shards)
+                missing.append(cell)
+    return missing
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("inputs", nargs="+", help="Shard NDJSON run logs")
+    parser.add_argument("--out", required=True, help="Merged NDJSON run log")
+    parser.add_argument("--prompts", default=None, help="Prompts the grid was run with (enables the missing-cell report)")
+    parser.add_argument("--models", default=None, help="Comma-separated model specs the grid was run with")
+    parser.add_argument("--replicates", type=int, default=None, help="Replicates per prompt in the grid")
+    parser.add_argument("--shards", type=int, default=None, help="Shard count N, to attribute missing cells to shards")
+    parser.add_argument("--missing", default=None, help="Write the missing cells here as JSONL")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    grid = (args.prompts, args.models, args.replicates)
+    if any(v is not None for v in grid) and not all(v is not None for v in grid):
+        parser.error("--prompts, --models and --replicates go together")
+    out_path = Path(args.out)
+    if any(Path(p).resolve() == out_path.resolve() for p in args.inputs):
+        parser.error("--out must not be one of the inputs")
+
+    with profile_session(args, Path(args.out + ".profile.json"), "merge_shards"):
+        merger = ShardMerger()
+        with phase("load_shards"):
+            for path in args.inputs:
+                print(f"{path}: {merger.add_file(Path(path))} records")
+        with phase("output"):
+            written = merger.write(out_path)
+        st = merger.stats
+        print(f"Merged {st['records']} records from {st['files']} files into {written} records at {out_path} "
+              f"({st['duplicates']} duplicates dropped, {st['bad_lines']} unreadable lines skipped)")
+
+        if args.prompts:
+            with phase("missing_cells"):
+                specs = [parse_model_spec(s.strip()) for s in args.models.split(",") if s.strip()]
+                missing = missing_cells(iter_prompts(Path(args.prompts)), specs, args.replicates, merger.completed(),
+                                        args.shards)
+            failed = sum(1 for c in missing
+                         if cell_key(c["prompt_id"], c["model_provider"], c["model"], c["replicate"]) in merger.cells)
+            print(f"missing: {len(missing)} cells without a successful record ({failed} of them with only errors)")
+            if args.shards:
+                by_shard = Counter(c["shard"] for c in missing)
+                for i in range(args.shards):
+                    if by_shard[i]:
+                        print(f"  shard {i}/{args.shards}: {by_shard[i]} missing")
+            if args.missing:
+                with open(args.missing, "w", encoding="utf8") as fh:
+                    for cell in missing:
+                        fh.write(json.dumps(cell, ensure_ascii=False) + "\n")
+                print(f"Missing cells written to {args.missing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+mock_server.py
+
+Local HTTP stand-in for an OpenAI-compatible chat-completions endpoint, backed by
+providers.MockProvider. Requests with "stream": true are answered with server-sent
+chat.completion.chunk events (and a usage chunk when stream_options.include_usage is set).
+Message content may be a string or a list of text parts; with parts, everything before
+the last part is treated as a prefix cache breakpoint. usage.prompt_tokens_details.cached_tokens
+reports the input tokens served from the mock's prefix cache.
+Point the runner at it to load-test the full HTTP client path offline:
+
+Usage:
+    python mock_server.py --port 8089 --latency 0.2 --error-rate 0.01 --rate-limit-rate 0.02
+    python run_experiment.py --prompts ../Prompts/all_prompts.jsonl --models openai:mock-1 \
+        --base-url http://127.0.0.1:8089/v1 --replicates 10 --out results/mock_runs.ndjson
+"""
+
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional, Tuple
+
+from providers import MockError, MockPrefixCache, MockProvider, MockRateLimitError
+
+
+def usage_payload(result: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "prompt_tokens": result["prompt_tokens"],
+        "completion_tokens": result["completion_tokens"],
+        "total_tokens": result["tokens"],
+        "prompt_tokens_details": {"cached_tokens": result.get("cached_tokens") or 0},
+    }
+
+
+def request_prompt(messages: List[Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+    """(prompt text, prefix breakpoint or None) from chat messages with string or text-part content."""
+    parts = []
+    breakpoint = None
+    for m in messages:
+        content = m.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            texts = [c.get("text") or "" for c in content if isinstance(c, dict) and c.get("type") == "text"]
+            if len(texts) > 1:
+                breakpoint = "".join(parts + texts[:-1])
+            parts.extend(texts)
+    return "".join(parts), breakpoint
+
+
+def chat_completion_response(result: Dict[str, Any], model: str) -> Dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": result["text"]},
+            "finish_reason": "stop",
+        }],
+        "usage": usage_payload(result),
+    }
+
+
+def chat_completion_chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason=None,
+                          usage: Dict[str, Any] = None) -> Dict[str, Any]:
+    return {
+        "id": completion_id,
+        "object": "chat.completion.chunk",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        "usage": usage,
+    }
+
+
+def make_handler(provider: MockProvider):
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status: int, payload: Dict[str, Any], headers: Dict[str, str] = None):
+            body = json.dumps(payload).encode("utf8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send_json(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+            model = req.get("model", "mock")
+            prompt, prefix = request_prompt(req.get("messages", []))
+            stream = bool(req.get("stream"))
+            try:
+                kwargs = {"model": model, "temperature": req.get("temperature", 0.0), "max_tokens": req.get("max_tokens") or 512,
+                          "prefix": prefix}
+                if stream:
+                    result, pieces = provider.stream(prompt, **kwargs)
+                else:
+                    result = provider.complete(prompt, **kwargs)
+            except MockRateLimitError as e:
+                self._send_json(429, {"error": {"message": str(e), "type": "rate_limit_error"}},
+                                headers={"Retry-After": f"{e.retry_after:.3f}"})
+                return
+            except MockError as e:
+                self._send_json(500, {"error": {"message": str(e), "type": "server_error"}})
+                return
+            if stream:
+                include_usage = bool((req.get("stream_options") or {}).get("include_usage"))
+                self._send_stream(result, pieces, model, include_usage)
+            else:
+                self._send_json(200, chat_completion_response(result, model))
+
+        def _send_stream(self, result: Dict[str, Any], pieces, model: str, include_usage: bool):
+            # server-sent events, one chunk per piece; the connection is closed to end the body
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            self.close_connection = True
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+            def event(payload):
+                self.wfile.write(b"data: " + json.dumps(payload).encode("utf8") + b"\n\n")
+                self.wfile.flush()
+
+            event(chat_completion_chunk(completion_id, model, {"role": "assistant", "content": ""}))
+            for piece in pieces:
+                event(chat_completion_chunk(completion_id, model, {"content": piece}))
+            event(chat_completion_chunk(completion_id, model, {}, finish_reason="stop"))
+            if include_usage:
+                event(chat_completion_chunk(completion_id, model, {}, usage=usage_payload(result)))
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+
+    return ChatCompletionsHandler
+
+
+def serve(provider: MockProvider, host: str = "127.0.0.1", port: int = 8089, background: bool = False) -> ThreadingHTTPServer:
+    """Start the server; with background=True it runs in a daemon thread and is returned for shutdown()."""
+    server = ThreadingHTTPServer((host, port), make_handler(provider))
+    server.daemon_threads = True
+    if background:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        server.serve_forever()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- latency jitter in seconds")
+    parser.add_argument("--token-latency", type=float, default=0.0, help="Seconds between streamed tokens (stream=true requests)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of calls answered with HTTP 429")
+    parser.add_argument("--retry-after", type=float, default=0.1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Fraction of calls that stall for --slow-latency")
+    parser.add_argument("--slow-latency", type=float, default=1.0, help="Latency in seconds of a stalled call")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--prefix-cache", type=int, default=4096, help="Prefix cache entries (0 disables cached_tokens)")
+    args = parser.parse_args(argv)
+
+    provider = MockProvider(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                            rate_limit_rate=args.rate_limit_rate, retry_after=args.retry_after, seed=args.seed,
+                            token_latency=args.token_latency, prefix_cache=MockPrefixCache(max_entries=args.prefix_cache),
+                            slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    print(f"mock chat-completions server on http://{args.host}:{args.port}/v1")
+    serve(provider, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
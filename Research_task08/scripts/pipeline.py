@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+pipeline.py
+
+Streaming analysis for run_experiment.py --pipeline: every run record is validated
+(validate_claims.validate_run) and summarized (analyze_bias mentions, recommendations
+and sentiment) as it is produced, instead of rereading the NDJSON log afterwards.
+
+Runner threads hand records to `StreamingPipeline.submit()`; a bounded queue feeds
+one consumer thread, so a slow analysis step applies backpressure to the runner
+rather than growing memory. The consumer summarizes records in small batches,
+merges them into running aggregates (analyze_bias.BiasAggregates without per-run
+values, so memory stays flat over a multi-hour run) and every `report_interval`
+seconds rewrites the reports in `outdir`:
+
+    validations.ndjson          same records as validate_claims.py (appended as they arrive)
+    fabrication_rates.csv       claim status counts and rates per prompt_id x model
+    mention_matrix.csv, recommendation_counts.csv, stats_results.json   as analyze_bias.py
+    pipeline_status.json        runs processed, queue depth, last report time
+"""
+
+import csv
+import json
+import os
+import queue
+import threading
+import time
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+import pandas as pd
+
+from analyze_bias import RUN_FIELDS, BiasAggregates, summarize_by_condition, write_reports
+from roster import EntityMatcher
+from run_log import iter_lines
+from run_writer import drain_until_stop
+from sentiment import SentimentEngine
+from validate_claims import GroundTruth, validate_run
+
+DEFAULT_REPORT_INTERVAL = 30.0
+DEFAULT_QUEUE_SIZE = 1000
+DEFAULT_BATCH_SIZE = 200
+DEFAULT_REPORT_RESAMPLES = 2000  # Monte Carlo tests only; per-run sentiment values are not kept
+CLAIM_STATUSES = ("true", "false", "unverifiable", "error")
+
+_STOP = object()
+
+
+class FabricationCounts:
+    """Claim validation status counts per (prompt_id, model)."""
+
+    def __init__(self):
+        self.runs = Counter()
+        self.status = defaultdict(Counter)
+
+    def update(self, validated: Dict[str, Any]):
+        key = (validated.get("prompt_id"), validated.get("model"))
+        self.runs[key] += 1
+        counts = self.status[key]
+        for v in validated["validations"]:
+            counts[v["validation"]["status"]] += 1
+
+    def rows(self) -> List[Dict[str, Any]]:
+        rows = []
+        for (pid, model), n_runs in sorted(self.runs.items(), key=lambda kv: (str(kv[0][0]), str(kv[0][1]))):
+            counts = self.status[(pid, model)]
+            claims = sum(counts.values())
+            checkable = counts["true"] + counts["false"]
+            rows.append({
+                "prompt_id": pid, "model": model, "runs": n_runs, "claims": claims,
+                **{s: counts[s] for s in CLAIM_STATUSES},
+                # share of checkable claims contradicted by the ground truth
+                "fabrication_rate": counts["false"] / checkable if checkable else None,
+                "unverifiable_rate": counts["unverifiable"] / claims if claims else None,
+                "claims_per_run": claims / n_runs,
+            })
+        return rows
+
+
+def _write_atomic(path: Path, write):
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf8", newline="") as fh:
+        write(fh)
+    os.replace(tmp, path)
+
+
+class StreamingPipeline:
+    """
+    In-process validate + analyze stage fed by a bounded queue.
+
+    Use as a context manager; close() drains the queue and writes the final reports.
+    Errors raised in the consumer thread are re-raised from submit()/close().
+    """
+
+    def __init__(self, outdir: Path, gt: GroundTruth, engine: Optional[SentimentEngine] = None,
+                 matcher: Optional[EntityMatcher] = None, report_interval: float = DEFAULT_REPORT_INTERVAL,
+                 queue_size: int = DEFAULT_QUEUE_SIZE, batch_size: int = DEFAULT_BATCH_SIZE,
+                 n_resamples: int = DEFAULT_REPORT_RESAMPLES):
+        self.outdir = Path(outdir)
+        self.gt = gt
+        self.engine = engine
+        self.matcher = matcher
+        self.report_interval = report_interval
+        self.batch_size = batch_size
+        self.n_resamples = n_resamples
+        self.aggregates = BiasAggregates(keep_values=False)
+        self.fabrication = FabricationCounts()
+        self.records_processed = 0
+        self.reports_written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self.outdir.mkdir(parents=True, exist_ok=True)
+        self._validations = open(self.outdir / "validations.ndjson", "w", encoding="utf8")
+        self._thread = threading.Thread(target=self._run, name="StreamingPipeline", daemon=True)
+        self._thread.start()
+
+    def submit(self, record: Dict[str, Any]):
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError("submit to closed StreamingPipeline")
+        self._queue.put(record)
+
+    def replay(self, runs_path: Path) -> int:
+        """Submit the records already in a run log (e.g. before resuming into it)."""
+        n = 0
+        for line in iter_lines(runs_path):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            self.submit(record)
+            n += 1
+        return n
+
+    def _process(self, batch: List[Dict[str, Any]]):
+        lines = []
+        for record in batch:
+            validated = validate_run(record, self.gt)
+            self.fabrication.update(validated)
+            lines.append(json.dumps(validated, ensure_ascii=False) + "\n")
+        self._validations.write("".join(lines))
+        df = pd.DataFrame.from_records([tuple(r.get(f) for f in RUN_FIELDS) for r in batch], columns=list(RUN_FIELDS))
+        self.aggregates.update(summarize_by_condition(df, self.engine, self.matcher))
+        self.records_processed += len(batch)
+
+    def write_reports(self):
+        self._validations.flush()
+        write_reports(self.aggregates, self.outdir, plots=False, n_resamples=self.n_resamples)
+        rows = self.fabrication.rows()
+        fields = ["prompt_id", "model", "runs", "claims", *CLAIM_STATUSES,
+                  "fabrication_rate", "unverifiable_rate", "claims_per_run"]
+
+        def write_csv(fh):
+            writer = csv.DictWriter(fh, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+
+        _write_atomic(self.outdir / "fabrication_rates.csv", write_csv)
+        status = {"records_processed": self.records_processed, "queue_depth": self._queue.qsize(),
+                  "reports_written": self.reports_written + 1,
+                  "updated_utc": datetime.utcnow().isoformat() + "Z"}
+        _write_atomic(self.outdir / "pipeline_status.json", lambda fh: json.dump(status, fh, indent=2))
+        self.reports_written += 1
+
+    def _run(self):
+        last_report = time.monotonic()
+        dirty = False
+        stop = False
+        try:
+            while not stop:
+                timeout = max(0.0, self.report_interval - (time.monotonic() - last_report))
+                batch = []
+                try:
+                    item = self._queue.get(timeout=timeout)
+                    while True:
+                        if item is _STOP:
+                            stop = True
+                            break
+                        batch.append(item)
+                        if len(batch) >= self.batch_size:
+                            break
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+                if batch:
+                    self._process(batch)
+                    dirty = True
+
+                now = time.monotonic()
+                if stop or (dirty and now - last_report >= self.report_interval):
+                    self.write_reports()
+                    last_report = now
+                    dirty = False
+        except BaseException as e:
+            self._error = e
+            drain_until_stop(self._queue, _STOP, stop)
+        finally:
+            try:
+                self._validations.close()
+            except BaseException as e:
+                # closing flushes too; keep the first error
+                if self._error is None:
+                    self._error = e
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
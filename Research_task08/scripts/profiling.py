@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+profiling.py
+
+Opt-in per-phase timings for the pipeline scripts (--profile on each entry point).
+
+Code marks its phases with `with phase("name"):`, or wraps an iterator in timed_iter()
+to time producing each item. Without an active Profiler both are no-ops. With one, each
+phase accumulates its calls, wall time, CPU time of the calling thread and (mode "full")
+the peak tracemalloc-traced memory while it was open. Phases may nest and may be entered
+from several threads; a repeated phase sums its times and keeps its largest peak.
+tracemalloc slows allocation-heavy code, so use `--profile time` when comparing wall
+clock numbers.
+
+The summary is written as JSON next to the script's normal outputs (--profile-out to
+override); --profile-pstats also runs cProfile and dumps a pstats file (main thread).
+"""
+
+import contextlib
+import json
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+PROFILE_MODES = ("time", "full")
+MB = 1024 * 1024
+
+_ACTIVE = None
+_NULL = contextlib.nullcontext()
+
+
+def _peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (MB if sys.platform == "darwin" else 1024)
+
+
+class _Phase:
+    __slots__ = ("profiler", "name", "wall0", "cpu0", "mem0", "peak")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.profiler._enter(self)
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler._exit(self)
+        return False
+
+
+class Profiler:
+    """Accumulates per-phase timings; start() makes it the target of phase()/timed_iter()."""
+
+    def __init__(self, mode: str = "full", pstats_path: Optional[Path] = None):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"profile mode must be one of {PROFILE_MODES}, got {mode!r}")
+        self.mode = mode
+        self.trace_memory = mode == "full"
+        self.pstats_path = pstats_path
+        self.phases: Dict[str, Dict[str, Any]] = {}
+        self.extra: Dict[str, Any] = {}  # counters the script wants in the summary (records, workers, ...)
+        self.wall_s = self.cpu_s = None
+        self._open = []  # phases currently open in any thread, for peak memory attribution
+        self._peak = 0
+        self._lock = threading.Lock()
+        self._cprofile = None
+        self._own_tracing = False
+
+    # ---- lifecycle ----
+
+    def start(self) -> "Profiler":
+        global _ACTIVE
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracing = True
+        if self.pstats_path:
+            import cProfile
+
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        self._wall0, self._cpu0 = time.perf_counter(), time.process_time()
+        _ACTIVE = self
+        return self
+
+    def stop(self):
+        global _ACTIVE
+        self.wall_s = time.perf_counter() - self._wall0
+        self.cpu_s = time.process_time() - self._cpu0
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            Path(self.pstats_path).parent.mkdir(parents=True, exist_ok=True)
+            self._cprofile.dump_stats(str(self.pstats_path))
+        if self.trace_memory:
+            with self._lock:
+                self._fold_peak()
+            if self._own_tracing:
+                tracemalloc.stop()
+        if _ACTIVE is self:
+            _ACTIVE = None
+
+    # ---- phases ----
+
+    def phase(self, name: str) -> _Phase:
+        return _Phase(self, name)
+
+    def _fold_peak(self):
+        # caller holds the lock: credit the traced peak since the last reset to every open phase
+        peak = tracemalloc.get_traced_memory()[1]
+        for p in self._open:
+            p.peak = max(p.peak, peak)
+        self._peak = max(self._peak, peak)
+        tracemalloc.reset_peak()
+
+    def _enter(self, p: _Phase):
+        if self.trace_memory:
+            with self._lock:
+                self._fold_peak()
+                p.mem0 = p.peak = tracemalloc.get_traced_memory()[0]
+                self._open.append(p)
+        p.cpu0 = time.thread_time()
+        p.wall0 = time.perf_counter()
+
+    def _exit(self, p: _Phase):
+        wall = time.perf_counter() - p.wall0
+        cpu = time.thread_time() - p.cpu0
+        with self._lock:
+            if self.trace_memory:
+                self._fold_peak()
+                self._open.remove(p)
+            self._add(p.name, 1, wall, cpu, p.peak if self.trace_memory else None,
+                      p.peak - p.mem0 if self.trace_memory else None)
+
+    def _add(self, name: str, calls: int, wall: float, cpu: float, peak: Optional[int], growth: Optional[int]):
+        s = self.phases.get(name)
+        if s is None:
+            s = self.phases[name] = {"calls": 0, "wall_s": 0.0, "cpu_s": 0.0, "peak_bytes": None, "growth_bytes": None}
+        s["calls"] += calls
+        s["wall_s"] += wall
+        s["cpu_s"] += cpu
+        if peak is not None:
+            s["peak_bytes"] = max(s["peak_bytes"] or 0, peak)
+            s["growth_bytes"] = max(s["growth_bytes"] or 0, growth)
+
+    def drain(self) -> Dict[str, Dict[str, Any]]:
+        """Phase totals so far, then reset (worker processes ship these back with each chunk)."""
+        with self._lock:
+            phases, self.phases = self.phases, {}
+        return phases
+
+    def merge(self, phases: Dict[str, Dict[str, Any]]):
+        """Add phase totals from another profiler (e.g. a worker process); times are summed."""
+        with self._lock:
+            for name, s in phases.items():
+                self._add(name, s["calls"], s["wall_s"], s["cpu_s"], s["peak_bytes"], s["growth_bytes"])
+
+    # ---- output ----
+
+    def summary(self, script: Optional[str] = None) -> Dict[str, Any]:
+        def mb(v):
+            return None if v is None else round(v / MB, 3)
+
+        phases = {}
+        for name, s in self.phases.items():
+            phases[name] = {"calls": s["calls"], "wall_s": round(s["wall_s"], 6), "cpu_s": round(s["cpu_s"], 6),
+                            "wall_pct": round(100 * s["wall_s"] / self.wall_s, 2) if self.wall_s else None,
+                            "peak_traced_mb": mb(s["peak_bytes"]), "growth_traced_mb": mb(s["growth_bytes"])}
+        return {
+            "script": script,
+            "timestamp_utc": datetime.utcnow().isoformat() + "Z",
+            "mode": self.mode,
+            "wall_s": self.wall_s,
+            "cpu_s": self.cpu_s,
+            "peak_rss_mb": _peak_rss_mb(),
+            "peak_traced_mb": mb(self._peak) if self.trace_memory else None,
+            "pstats": str(self.pstats_path) if self.pstats_path else None,
+            **self.extra,
+            "phases": phases,
+        }
+
+    def write(self, path: Path, script: Optional[str] = None) -> Path:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf8") as fh:
+            json.dump(self.summary(script), fh, indent=2)
+        return path
+
+
+def active() -> Optional[Profiler]:
+    return _ACTIVE
+
+
+def phase(name: str):
+    """Context manager timing `name` under the active profiler (no-op without one)."""
+    return _ACTIVE.phase(name) if _ACTIVE is not None else _NULL
+
+
+def timed_iter(iterable: Iterable, name: str) -> Iterator:
+    """Iterate `iterable`, timing each step (the producer's work) as phase `name`."""
+    if _ACTIVE is None:
+        yield from iterable
+        return
+    it = iter(iterable)
+    while True:
+        with phase(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+# ---- command-line integration ----
+
+def add_profile_arguments(parser):
+    parser.add_argument("--profile", nargs="?", const="full", choices=PROFILE_MODES, default=None,
+                        help="Record wall/CPU time (and with 'full', the default, peak traced memory) per phase "
+                             "and write a JSON summary next to the outputs")
+    parser.add_argument("--profile-out", default=None, help="Path of the --profile JSON summary")
+    parser.add_argument("--profile-pstats", default=None, help="Also run cProfile and dump pstats here (implies --profile)")
+
+
+@contextmanager
+def profile_session(args, default_out: Path, script: str):
+    """Profile the body when --profile/--profile-pstats was given; yields the Profiler or None."""
+    mode = getattr(args, "profile", None) or ("full" if getattr(args, "profile_pstats", None) else None)
+    if mode is None:
+        yield None
+        return
+    prof = Profiler(mode, Path(args.profile_pstats) if args.profile_pstats else None).start()
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        out = prof.write(Path(args.profile_out) if args.profile_out else default_out, script)
+        print(f"profile: {out}" + (f" (pstats: {prof.pstats_path})" if prof.pstats_path else ""))
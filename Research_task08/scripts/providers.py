@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+providers.py
+
+Long-lived provider clients and the built-in mock backend used by run_experiment.py.
+
+- get_openai_client(): one pooled `openai.OpenAI` client per (base_url, api_key, timeout),
+  created on first use and shared by all worker threads. The SDK's own retries are
+  disabled because rate-limit retries are handled by rate_control.AdaptiveLimiter.
+- MockProvider: deterministic in-process stand-in with configurable latency, error
+  rate and rate-limit rate, for offline load tests (`--models mock:<name>`).
+  mock_server.py exposes the same backend over HTTP in the chat-completions shape.
+- MockPrefixCache: the mock's model of provider-side prompt prefix caching, so cached
+  input token accounting can be checked offline.
+"""
+
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, Optional, Tuple
+
+PLACEHOLDER_API_KEY = "OPENAI_API_KEY"
+
+_CLIENTS: Dict[Tuple, Any] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+
+def get_openai_client(base_url: Optional[str] = None, api_key: Optional[str] = None, timeout: Optional[float] = None):
+    """Return the shared OpenAI client for this configuration, creating it once."""
+    key = ("openai", base_url, api_key, timeout)
+    client = _CLIENTS.get(key)
+    if client is not None:
+        return client
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(key)
+        if client is None:
+            import openai
+
+            kwargs = {"max_retries": 0}
+            if base_url is not None:
+                kwargs["base_url"] = base_url
+            # local OpenAI-compatible servers (e.g. mock_server.py) need no key, but the SDK refuses to
+            # construct a client without one; a real endpoint rejects the placeholder with a clear 401
+            kwargs["api_key"] = api_key or os.environ.get("OPENAI_API_KEY") or PLACEHOLDER_API_KEY
+            if timeout is not None:
+                kwargs["timeout"] = timeout
+            client = openai.OpenAI(**kwargs)
+            _CLIENTS[key] = client
+    return client
+
+
+def close_clients():
+    with _CLIENTS_LOCK:
+        for client in _CLIENTS.values():
+            close = getattr(client, "close", None)
+            if close is not None:
+                close()
+        _CLIENTS.clear()
+
+
+# ---- Mock provider ----
+
+PLAYER_LINE = re.compile(r"-\s*(Player \w+):\s*G=(\d+),\s*A=(\d+),\s*Shots=(\d+),\s*TO=(\d+)")
+
+MOCK_TEMPLATES = [
+    "{p} shows the most potential. {p} has {a} assists and {p} has {s} shots, so extra coaching on "
+    "shot selection should improve conversion. {q} has {q_to} turnovers, which is a strong point.",
+    "Based on the data, {p} is underperforming relative to volume: {p} has {to} turnovers and {p} scored {g} goals "
+    "on {s} shots. Consider reduced minutes until ball security improves; {q} is a standout with {q_g} goals.",
+    "{p} has the most assists and should receive extra coaching for development. {q} has {q_g} goals and "
+    "struggles less with turnovers ({q_to}).",
+]
+
+
+class MockPrefixCache:
+    """
+    Prompt prefix cache as providers implement it: a request reuses the longest prefix of
+    its input tokens (whitespace words for the mock) that an earlier request already
+    processed, counted in whole `block_tokens` blocks and only from `min_tokens` on.
+    An explicit breakpoint (the end of the shared prefix when a request is sent as
+    separate content parts) is cached at its exact length as well. Prefixes are kept
+    by hash in an LRU of `max_entries`; 0 disables caching.
+
+    The defaults are scaled down from production values (1024-token minimum,
+    128-token blocks) so the short research prompts exercise the cache.
+    """
+
+    def __init__(self, max_entries: int = 4096, block_tokens: int = 16, min_tokens: int = 32):
+        self.max_entries = max_entries
+        self.block_tokens = max(1, block_tokens)
+        self.min_tokens = min_tokens
+        self._entries: "OrderedDict[bytes, None]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup_and_store(self, tokens, breakpoint: Optional[int] = None, namespace: str = "") -> int:
+        """
+        Number of leading tokens served from cache; the request's own prefixes are then
+        cached. Prefixes only match within the same `namespace` (the model).
+        """
+        if self.max_entries <= 0:
+            return 0
+        bounds = set(range(self.block_tokens, len(tokens) + 1, self.block_tokens))
+        if breakpoint:
+            bounds.add(breakpoint)
+        bounds = sorted(b for b in bounds if b >= self.min_tokens)
+        if not bounds:
+            return 0
+        digests = []
+        h = hashlib.sha1(namespace.encode("utf8") + b"\x00")
+        done = 0
+        for b in bounds:
+            for tok in tokens[done:b]:
+                h.update(tok.encode("utf8") + b"\x00")
+            done = b
+            digests.append((b, h.copy().digest()))
+        with self._lock:
+            cached = 0
+            for b, d in digests:
+                if d in self._entries:
+                    cached = b
+                    self._entries.move_to_end(d)
+            for _, d in digests:
+                self._entries[d] = None
+                self._entries.move_to_end(d)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+
+class MockError(Exception):
+    status_code = 500
+
+
+class MockCancelled(MockError):
+    status_code = 499
+
+
+class MockRateLimitError(MockError):
+    status_code = 429
+
+    def __init__(self, msg: str, retry_after: float):
+        super().__init__(msg)
+        self.retry_after = retry_after
+
+
+class MockProvider:
+    """
+    Offline stand-in for a chat model.
+
+    Responses are a deterministic function of (model, prompt) and reuse the player
+    stats found in the prompt, so downstream validation/analysis has realistic claims.
+    Latency is `latency` +/- uniform `jitter` seconds, or `slow_latency` for a `slow_rate`
+    fraction of calls (tail stalls); errors and 429s are drawn from a seeded RNG with the
+    given rates. A call given a `cancel` event stops waiting as soon as it is set. stream() yields the response word by word
+    after that latency (the time to first token), `token_latency` seconds apart.
+    Input tokens found in the prefix cache are reported as cached_tokens; `prefix` marks
+    an explicit cache breakpoint (the request's shared prefix sent as its own part).
+    """
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: float = 0.1, seed: int = 0, token_latency: float = 0.0,
+                 prefix_cache: Optional[MockPrefixCache] = None, slow_rate: float = 0.0, slow_latency: float = 0.0):
+        self.prefix_cache = prefix_cache if prefix_cache is not None else MockPrefixCache()
+        self.slow_rate = slow_rate
+        self.slow_latency = slow_latency
+        self.latency = latency
+        self.token_latency = token_latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def respond(self, prompt: str, model: str) -> str:
+        digest = int(hashlib.sha256(f"{model}\x00{prompt}".encode("utf8")).hexdigest(), 16)
+        players = PLAYER_LINE.findall(prompt) or [("Player A", "34", "7", "71", "13"), ("Player B", "32", "11", "72", "16")]
+        p = players[digest % len(players)]
+        q = players[(digest // 7 + 1) % len(players)] if len(players) > 1 else p
+        template = MOCK_TEMPLATES[(digest // 97) % len(MOCK_TEMPLATES)]
+        return template.format(p=p[0], g=p[1], a=p[2], s=p[3], to=p[4], q=q[0], q_g=q[1], q_to=q[4])
+
+    def complete(self, prompt: str, model: str = "mock", temperature: float = 0.0, max_tokens: int = 512,
+                 prefix: Optional[str] = None, cancel: Optional[threading.Event] = None) -> Dict[str, Any]:
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+            if self.slow_rate and self._rng.random() < self.slow_rate:
+                delay = self.slow_latency
+            draw = self._rng.random()
+        if cancel is not None:
+            if cancel.wait(delay):
+                raise MockCancelled("mock call cancelled")
+        elif delay:
+            time.sleep(delay)
+        if draw < self.rate_limit_rate:
+            raise MockRateLimitError("mock rate limit exceeded", retry_after=self.retry_after)
+        if draw < self.rate_limit_rate + self.error_rate:
+            raise MockError("mock provider error")
+
+        text = self.respond(prompt, model)
+        words = text.split()[:max_tokens]
+        text = " ".join(words)
+        prompt_words = prompt.split()
+        breakpoint = len(prefix.split()) if prefix and prompt.startswith(prefix) else None
+        cached = self.prefix_cache.lookup_and_store(prompt_words, breakpoint, namespace=model)
+        return {
+            "text": text,
+            "tokens": len(prompt_words) + len(words),
+            "prompt_tokens": len(prompt_words),
+            "cached_tokens": cached,
+            "completion_tokens": len(words),
+            "model": model,
+        }
+
+    def stream(self, prompt: str, model: str = "mock", temperature: float = 0.0, max_tokens: int = 512,
+               prefix: Optional[str] = None, cancel: Optional[threading.Event] = None) -> Tuple[Dict[str, Any], Iterator[str]]:
+        """(completion result, iterator of text pieces); errors are raised before the first piece."""
+        result = self.complete(prompt, model=model, temperature=temperature, max_tokens=max_tokens, prefix=prefix,
+                               cancel=cancel)
+
+        def pieces():
+            for i, word in enumerate(result["text"].split(" ")):
+                if i and self.token_latency:
+                    if cancel is not None:
+                        if cancel.wait(self.token_latency):
+                            raise MockCancelled("mock stream cancelled")
+                    else:
+                        time.sleep(self.token_latency)
+                yield word if i == 0 else " " + word
+
+        return result, pieces()
+
+
+_MOCK = MockProvider()
+
+
+def get_mock_provider() -> MockProvider:
+    return _MOCK
+
+
+def configure_mock(**kwargs) -> MockProvider:
+    """Replace the shared in-process mock provider (kwargs as for MockProvider)."""
+    global _MOCK
+    _MOCK = MockProvider(**kwargs)
+    return _MOCK
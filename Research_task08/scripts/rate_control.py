@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+rate_control.py
+
+Adaptive (AIMD) concurrency control for provider calls made by run_experiment.py.
+
+Each provider gets one `AdaptiveLimiter`. The limit grows additively (about +1 per
+window of successful calls) up to a configured maximum and is cut multiplicatively
+when the provider answers with a 429 / rate-limit error. While a Retry-After window
+is open no new calls are admitted for that provider.
+"""
+
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+DEFAULT_BACKOFF_SECONDS = 1.0
+MAX_BACKOFF_SECONDS = 60.0
+
+
+class AdaptiveLimiter:
+    """
+    AIMD limiter for the number of in-flight calls to a single provider.
+
+    acquire() blocks until a slot is free and no back-off window is active (or until its
+    timeout; try_acquire() takes one only if that is already the case); release() must be called exactly once
+    per acquire() and reports whether the call was rate limited. release(adjust=False)
+    frees the slot without moving the limit (e.g. for a cancelled duplicate request).
+    """
+
+    def __init__(self, max_limit: int, initial_limit: int = 1, min_limit: int = 1, decrease_factor: float = 0.5):
+        if max_limit < 1:
+            raise ValueError("max_limit must be >= 1")
+        self.max_limit = max_limit
+        self.min_limit = max(1, min(min_limit, max_limit))
+        self.decrease_factor = decrease_factor
+        self.limit = float(max(self.min_limit, min(initial_limit, max_limit)))
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.rate_limited_count = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Take a slot; with `timeout` (seconds) give up and return False once it has passed."""
+        give_up = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0 and self.in_flight < int(self.limit):
+                    break
+                if give_up is not None:
+                    if now >= give_up:
+                        return False
+                    wait = min(wait, give_up - now) if wait > 0 else give_up - now
+                self._cond.wait(wait if wait > 0 else None)
+            self.in_flight += 1
+            return True
+
+    def try_acquire(self) -> bool:
+        with self._cond:
+            if self.blocked_until > time.monotonic() or self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, rate_limited: bool = False, retry_after: Optional[float] = None, adjust: bool = True):
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if not adjust:
+                self._cond.notify_all()
+                return
+            if rate_limited:
+                self.rate_limited_count += 1
+                # only cut once per congestion event, not once per in-flight 429
+                if now >= self.blocked_until:
+                    self.limit = max(float(self.min_limit), self.limit * self.decrease_factor)
+                backoff = retry_after if retry_after is not None else DEFAULT_BACKOFF_SECONDS
+                self.blocked_until = max(self.blocked_until, now + min(backoff, MAX_BACKOFF_SECONDS))
+            else:
+                self.limit = min(float(self.max_limit), self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    code = getattr(exc, "status_code", None)
+    if code is None:
+        code = getattr(getattr(exc, "response", None), "status_code", None)
+    return code
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """True for HTTP 429s and provider errors that describe themselves as rate limits."""
+    if _status_code(exc) == 429:
+        return True
+    if type(exc).__name__ == "RateLimitError":
+        return True
+    msg = str(exc).lower()
+    return "rate limit" in msg or "rate_limit" in msg or "too many requests" in msg
+
+
+def retry_after_seconds(exc: BaseException) -> Optional[float]:
+    """
+    Read the back-off hint from an exception: a `retry_after` attribute, or the
+    Retry-After / retry-after-ms headers of the attached HTTP response.
+    """
+    explicit = getattr(exc, "retry_after", None)
+    if explicit is not None:
+        try:
+            return max(0.0, float(explicit))
+        except (TypeError, ValueError):
+            pass
+
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms is not None:
+            return max(0.0, float(ms) / 1000.0)
+        value = headers.get("retry-after")
+    except Exception:
+        return None
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
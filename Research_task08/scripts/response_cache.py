@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+response_cache.py
+
+Persistent, content-addressed cache for model responses (SQLite, stdlib only).
+
+Entries are keyed by a SHA-256 of the full request (provider, model, prompt text,
+temperature, max_tokens, replicate, and the endpoint when it is not the provider's
+default), so re-running an unchanged grid costs nothing and responses recorded against
+a local server are never replayed for the real API.
+Eviction is by age (`max_age_seconds`) and by size (`max_entries`, least recently
+used first), on open and close and every few writes in between (at most about 1/8 of
+max_entries over the cap). Hit/miss counters are kept per process in `stats`.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+DEFAULT_CACHE_PATH = Path(".cache/responses.sqlite")
+EVICT_EVERY = 256  # writes between evictions during a run (fewer for a small max_entries)
+
+
+def request_key(provider: str, model: str, prompt: str, temperature: float, max_tokens: int, replicate: int,
+                endpoint: Optional[str] = None) -> str:
+    """
+    `provider` should be the adapter name (aliases such as gpt/openai share entries) and
+    `endpoint` the base URL when one is configured; keys without it are unchanged.
+    """
+    fields = [provider.lower(), model, prompt, float(temperature), int(max_tokens), int(replicate)]
+    if endpoint:
+        fields.append(endpoint.rstrip("/"))
+    payload = json.dumps(fields, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe SQLite response cache.
+
+    refresh=True ignores existing entries on read (every lookup is a miss) but still
+    stores fresh responses, which overwrites stale ones.
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_PATH, max_entries: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None, refresh: bool = False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.refresh = refresh
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        self._evict_every = EVICT_EVERY if max_entries is None else max(1, min(EVICT_EVERY, max_entries // 8))
+        self._writes_since_evict = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed)")
+        self._conn.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if self.refresh:
+                self.stats["misses"] += 1
+                return None
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            now = time.time()
+            if row is None or (self.max_age_seconds is not None and now - row[1] > self.max_age_seconds):
+                self.stats["misses"] += 1
+                return None
+            self._conn.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.stats["hits"] += 1
+            return json.loads(row[0])
+
+    def put(self, key: str, response: Dict[str, Any]):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(response, ensure_ascii=False), now, now),
+            )
+            self._conn.commit()
+            self.stats["writes"] += 1
+            self._writes_since_evict += 1
+            due = self._writes_since_evict >= self._evict_every
+            if due:
+                self._writes_since_evict = 0
+        if due and (self.max_entries is not None or self.max_age_seconds is not None):
+            self.evict()
+
+    def evict(self) -> int:
+        """Drop expired entries, then the least recently used ones beyond max_entries."""
+        removed = 0
+        with self._lock:
+            if self.max_age_seconds is not None:
+                cur = self._conn.execute("DELETE FROM responses WHERE created < ?", (time.time() - self.max_age_seconds,))
+                removed += cur.rowcount
+            if self.max_entries is not None:
+                cur = self._conn.execute(
+                    "DELETE FROM responses WHERE key IN ("
+                    " SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,),
+                )
+                removed += cur.rowcount
+            self._conn.commit()
+            self.stats["evictions"] += removed
+        return removed
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def close(self):
+        self.evict()
+        with self._lock:
+            self._conn.close()
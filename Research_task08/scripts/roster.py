@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+roster.py
+
+Roster-driven player entity matching shared by analyze_bias.py and validate_claims.py.
+
+A roster maps each canonical player label (the key used in the ground-truth CSV, e.g.
+"Player C") to its aliases (real names, alternative labels). All labels and aliases
+are compiled into one trie-shaped regex, so a text is scanned once regardless of roster
+size, and a mention written as "Player C (Ward)" counts as a single entity.
+
+Roster CSV format (header required):
+    label,aliases
+    Player C,Ward;C. Ward
+"""
+
+import csv
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+DEFAULT_LABELS = ("Player A", "Player B", "Player C")
+
+
+def _normalize(name: str) -> str:
+    return " ".join(name.split()).lower()
+
+
+def _trie_regex(names: Iterable[str]) -> str:
+    """Regex source matching any of `names` (normalized), factored as a character trie."""
+    trie: Dict = {}
+    for name in names:
+        node = trie
+        for ch in name:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + emit(child)
+                for ch, child in sorted(node.items()) if ch != ""]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if "" in node:
+            body = "(?:" + body + ")?"
+        return body
+
+    return emit(trie)
+
+
+class EntityMatcher:
+    """
+    Single-pass matcher over every label and alias of a roster.
+
+    `pattern` is regex source with exactly one capturing group (the entity as written),
+    optionally followed by a parenthesized alias, for embedding in claim patterns.
+    """
+
+    def __init__(self, aliases: Dict[str, str]):
+        # aliases: normalized surface form -> canonical label
+        self.aliases = aliases
+        names = sorted(aliases)
+        entity = _trie_regex(names)
+        # lookarounds rather than \b, which never matches after a label ending in punctuation ("Smith Jr.")
+        self.pattern = r"(?<!\w)(" + entity + r")(?!\w)(?:\s*\((?:" + entity + r")\))?"
+        self.regex = re.compile(self.pattern, re.IGNORECASE)
+
+    def canonical(self, surface: Optional[str]) -> Optional[str]:
+        if not surface:
+            return None
+        return self.aliases.get(_normalize(surface))
+
+    def find_all(self, text: str) -> List[str]:
+        """Canonical labels of all entity mentions in `text`, in order."""
+        return [self.aliases[_normalize(s)] for s in self.regex.findall(text or "")]
+
+    def canonicalize(self, surfaces: Iterable[str]) -> List[str]:
+        return [self.aliases.get(_normalize(s), s) for s in surfaces]
+
+
+class Roster:
+    def __init__(self, entries: Dict[str, List[str]]):
+        # canonical label -> aliases (the label itself is always an alias)
+        self.entries = {label.strip(): [a.strip() for a in aliases if a.strip()] for label, aliases in entries.items()}
+
+    @classmethod
+    def default(cls) -> "Roster":
+        return cls({label: [] for label in DEFAULT_LABELS})
+
+    @classmethod
+    def from_labels(cls, labels: Iterable[str]) -> "Roster":
+        return cls({label: [] for label in labels})
+
+    @classmethod
+    def from_csv(cls, path: Path) -> "Roster":
+        entries = {}
+        with open(path, newline="", encoding="utf8") as f:
+            for row in csv.DictReader(f):
+                label = (row.get("label") or row.get("player") or row.get("Player") or "").strip()
+                if not label:
+                    continue
+                aliases = [a for a in re.split(r"[;|]", row.get("aliases") or "") if a.strip()]
+                if row.get("name"):
+                    aliases.append(row["name"])
+                entries.setdefault(label, []).extend(aliases)
+        return cls(entries)
+
+    def merged(self, other: "Roster") -> "Roster":
+        entries = {label: list(aliases) for label, aliases in self.entries.items()}
+        for label, aliases in other.entries.items():
+            entries.setdefault(label, []).extend(aliases)
+        return Roster(entries)
+
+    def matcher(self) -> EntityMatcher:
+        aliases = {}
+        for label, names in self.entries.items():
+            for name in [label] + names:
+                aliases.setdefault(_normalize(name), label)
+        return EntityMatcher(aliases)
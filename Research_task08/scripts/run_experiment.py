@@ -17,9 +17,39 @@ Design choices:
 - Pluggable backend: define a client wrapper function `call_model(prompt, model_config)` that you should
   implement for your environment (OpenAI, Anthropic, Google, local LLM).
 - Default behavior: the script will read `prompts/*.jsonl` (or .txt), run the model, and save results as NDJSON.
+- Calls run concurrently (`--max-concurrency` in-flight calls per provider). The per-provider limit adapts
+  AIMD-style: it grows on success and is halved on 429 / rate-limit errors, honoring Retry-After (see rate_control.py).
+- Responses are cached on disk keyed by a hash of the full request (see response_cache.py); use --no-cache to
+  bypass it or --refresh-cache to re-query and overwrite.
+- Provider clients are created once and reused (providers.py). `mock:<name>` runs an offline in-process
+  backend; mock_server.py serves the same backend over HTTP for use with --base-url.
+- --batch-mode DIR writes the grid as provider batch-request JSONL files instead of calling models;
+  batch_mode.py ingests the batch results back into the same NDJSON schema.
+- --pipeline DIR validates and analyzes each response in-process as it arrives (pipeline.py), refreshing
+  validations, fabrication rates and bias tables in DIR every --report-interval seconds.
+- --adaptive treats --replicates as a per-cell maximum: replicates run in rounds and a cell stops once its
+  mention/recommendation proportions and mean sentiment are estimated to --precision (adaptive.py).
+- Each record carries per-call instrumentation: latency_ms, ttft_ms (with --stream), queue_wait_ms,
+  prompt/completion tokens, cached_tokens, retries and cache_hit; latency_report.py summarizes them.
+- Prompts with a "prefix" (experiment_design.py) keep that shared prefix first and carry a prefix cache hint
+  (OpenAI prompt_cache_key); --prompt-layout parts sends prefix and question as separate content parts.
+  cached_tokens is the provider-reported count of input tokens served from its prompt prefix cache.
+- --profile records wall/CPU time and peak memory per phase (profiling.py); phases entered from worker
+  threads (model_call, write_record, ...) sum their time across threads.
+- Calls go through dispatch.Dispatcher with one ProviderAdapter per provider: --deadline bounds each request,
+  --hedge issues one duplicate once a request outlives the recent p95 latency and keeps the first to finish;
+  records carry hedges, cancels and hedge_won.
+- An --out ending in .gz/.zst is written as a block-compressed run log with a run_id/prompt_id index
+  (run_log.py); every reader (validate_claims, analyze_bias, latency_report, --resume) accepts it.
+- --resume skips prompt x model x replicate cells already completed in the output file, so a crashed run
+  can be restarted without duplicating records.
+- --shard i/N runs only the cells whose stable hash of (prompt_id, provider, model, replicate) falls in shard i
+  of N (0-based), so N machines can split one grid without coordinating; merge_shards.py combines their logs.
 
 Usage:
     python run_experiment.py --prompts ../prompts/all_prompts.jsonl --models openai:gpt-4 --replicates 3 --out results/h1_runs.ndjson
+    python run_experiment.py --prompts ../prompts/all_prompts.jsonl --models openai:gpt-4 --replicates 30 --shard 2/4 \
+        --out results/h1_runs.shard2.ndjson
 
 NOTES:
 - This script does not include API keys. Add them to env vars or update wrappers.
@@ -27,34 +57,134 @@ NOTES:
 """
 
 import argparse
+import hashlib
 import json
 import os
+import threading
 import time
 import uuid
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List
-import openai
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Optional, Set, Tuple
 
-import os
-os.environ["OPENAI_API_KEY"] = "OPENAI_API_KEY"
+from dispatch import (CallCancelled, DEFAULT_HEDGE_BUDGET, DEFAULT_HEDGE_MIN_SAMPLES, DEFAULT_HEDGE_QUANTILE,
+                      Dispatcher, ProviderAdapter)
+from profiling import add_profile_arguments, phase, profile_session, timed_iter
+from providers import MockPrefixCache, close_clients, configure_mock, get_mock_provider, get_openai_client
+from rate_control import AdaptiveLimiter, is_rate_limit_error
+from response_cache import DEFAULT_CACHE_PATH, ResponseCache, request_key
+from run_log import is_framed_path, iter_lines, recover as recover_run_log
+from run_writer import DEFAULT_FLUSH_INTERVAL, RecordWriter
 
 # ---- Configuration defaults ----
 DEFAULT_TEMPERATURE = 0.0
 DEFAULT_MAX_TOKENS = 512
+DEFAULT_MAX_CONCURRENCY = 8   # max in-flight calls per provider
+DEFAULT_MAX_RETRIES = 5       # retries after a 429 / rate-limit error
+SUBMIT_WINDOW_FACTOR = 4      # cells queued per worker thread
+
+# kwargs for providers.get_openai_client (e.g. base_url of a local mock_server.py)
+OPENAI_CLIENT_CONFIG: Dict[str, Any] = {}
+# call options shared by all worker threads (set from the command line)
+CALL_CONFIG: Dict[str, Any] = {"stream": False, "prompt_layout": "flat", "cache_hints": True}
+PROMPT_LAYOUTS = ("flat", "parts")
+
+# per-call instrumentation added to every record made by run_cell (see make_record)
+METRIC_FIELDS = ("latency_ms", "ttft_ms", "queue_wait_ms", "prompt_tokens", "cached_tokens", "completion_tokens",
+                 "retries", "cache_hit", "hedges", "cancels", "hedge_won")
+# response fields describing one particular call; never stored in the response cache
+CALL_FIELDS = ("ttft_ms", "cached_tokens")
+
+# ---- Prompt layout ----
+
+
+def prompt_prefix(p: Dict[str, Any]) -> Optional[str]:
+    """The prompt's shared prefix (experiment_design.py "prefix"), if it really leads its text."""
+    prefix = p.get("prefix")
+    return prefix if prefix and (p.get("text") or "").startswith(prefix) else None
+
+
+def prefix_cache_key(prefix: str) -> str:
+    return hashlib.sha256(prefix.encode("utf8")).hexdigest()[:32]
+
+
+def openai_chat_request(prompt: str, prefix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    messages (and cache hints) for an OpenAI-compatible chat request. The shared prefix
+    always leads, so automatic prefix caching applies; with a prefix the request also
+    carries prompt_cache_key so requests sharing it are routed to the same cache
+    (CALL_CONFIG["cache_hints"]). Layout "parts" sends prefix and remainder as separate
+    text parts, an explicit breakpoint for endpoints that cache at part boundaries.
+    """
+    if not prefix or not prompt.startswith(prefix):
+        return {"messages": [{"role": "user", "content": prompt}]}
+    if CALL_CONFIG["prompt_layout"] == "parts":
+        content = [{"type": "text", "text": prefix}, {"type": "text", "text": prompt[len(prefix):]}]
+    else:
+        content = prompt
+    request = {"messages": [{"role": "user", "content": content}]}
+    if CALL_CONFIG["cache_hints"]:
+        request["prompt_cache_key"] = prefix_cache_key(prefix)
+    return request
+
+
+def _cached_tokens(usage) -> Optional[int]:
+    return getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None)
+
 
 # ---- Utility / placeholder for model calls ----
 
 
-def call_model_openai(prompt: str, model: str = "gpt-4", temperature: float = 0.0, max_tokens: int = 512) -> dict:
+def call_model_openai(prompt: str, model: str = "gpt-4", temperature: float = 0.0, max_tokens: int = 512,
+                      stream: bool = False, prefix: Optional[str] = None, cancel: Optional[threading.Event] = None,
+                      timeout: Optional[float] = None) -> dict:
     """
     Updated OpenAI API call for openai>=1.0.0
+    With stream=True the response is streamed and the time to first token is returned as ttft_ms.
+    `prefix` is the prompt's shared leading part (see openai_chat_request). `timeout` bounds
+    the HTTP request; `cancel` stops reading a stream (a non-streamed request runs to completion).
     """
-    client = openai.OpenAI()  # initialize client using env API key
+    client = get_openai_client(**OPENAI_CLIENT_CONFIG)  # shared, connection-pooled client
+    if timeout is not None:
+        client = client.with_options(timeout=timeout)
+    request = openai_chat_request(prompt, prefix)
+
+    if stream:
+        start = time.perf_counter()
+        chunks = client.chat.completions.create(
+            model=model,
+            **request,
+            temperature=temperature,
+            max_tokens=max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        parts, ttft_ms, usage = [], None, None
+        for chunk in chunks:
+            if cancel is not None and cancel.is_set():
+                chunks.close()
+                raise CallCancelled("stream cancelled")
+            if chunk.usage is not None:
+                usage = chunk.usage
+            for choice in chunk.choices:
+                if choice.delta.content:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - start) * 1000
+                    parts.append(choice.delta.content)
+        return {
+            "text": "".join(parts),
+            "tokens": getattr(usage, "total_tokens", None),
+            "prompt_tokens": getattr(usage, "prompt_tokens", None),
+            "cached_tokens": _cached_tokens(usage),
+            "completion_tokens": getattr(usage, "completion_tokens", None),
+            "model": model,
+            "ttft_ms": ttft_ms,
+        }
 
     resp = client.chat.completions.create(
         model=model,
-        messages=[{"role": "user", "content": prompt}],
+        **request,
         temperature=temperature,
         max_tokens=max_tokens
     )
@@ -65,109 +195,564 @@ def call_model_openai(prompt: str, model: str = "gpt-4", temperature: float = 0.
     return {
         "text": text,
         "tokens": tokens_used,
+        "prompt_tokens": getattr(resp.usage, "prompt_tokens", None),
+        "cached_tokens": _cached_tokens(resp.usage),
+        "completion_tokens": getattr(resp.usage, "completion_tokens", None),
         "model": model
     }
 
 
-def call_model_generic(prompt: str, provider: str, model: str, temperature: float, max_tokens: int) -> Dict[str, Any]:
+def call_model_mock(prompt: str, model: str = "mock", temperature: float = 0.0, max_tokens: int = 512,
+                    stream: bool = False, prefix: Optional[str] = None, cancel: Optional[threading.Event] = None) -> dict:
     """
-    Dispatch to the provider-specific wrapper. Extend this for other providers.
+    In-process offline backend (see providers.MockProvider). Like mock_server.py, the
+    mock only sees the prefix as a cache breakpoint with --prompt-layout parts.
     """
-    if provider.lower() in ("openai", "gpt"):
-        return call_model_openai(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    mock = get_mock_provider()
+    if CALL_CONFIG["prompt_layout"] != "parts":
+        prefix = None
+    if not stream:
+        return mock.complete(prompt, model=model, temperature=temperature, max_tokens=max_tokens, prefix=prefix,
+                             cancel=cancel)
+    start = time.perf_counter()
+    result, pieces = mock.stream(prompt, model=model, temperature=temperature, max_tokens=max_tokens, prefix=prefix,
+                                 cancel=cancel)
+    ttft_ms = None
+    for _ in pieces:
+        if ttft_ms is None:
+            ttft_ms = (time.perf_counter() - start) * 1000
+    return dict(result, ttft_ms=ttft_ms)
+
+
+PROVIDER_ADAPTERS: Dict[str, ProviderAdapter] = {
+    "openai": ProviderAdapter("openai", call_model_openai, cancellable=True, timeout=True),
+    "gpt": ProviderAdapter("openai", call_model_openai, cancellable=True, timeout=True),
+    "mock": ProviderAdapter("mock", call_model_mock, cancellable=True),
     # Add other providers as needed (anthropic, google, local)
-    # e.g., if provider == 'anthropic': return call_anthropic(prompt, model, ...)
-    # For now fallback to OpenAI placeholder
-    return call_model_openai(prompt, model=model, temperature=temperature, max_tokens=max_tokens)
+    # e.g., "anthropic": ProviderAdapter("anthropic", call_anthropic),
+}
 
+# Deadlines and hedging for every provider call; set from the command line (--deadline, --hedge*).
+DISPATCHER = Dispatcher(PROVIDER_ADAPTERS)
 
-def read_prompts(prompts_path: Path) -> List[Dict[str, Any]]:
-    prompts = []
+
+def configure_dispatch(**options) -> Dispatcher:
+    """Replace DISPATCHER with one using `options` (Dispatcher keyword arguments)."""
+    global DISPATCHER
+    DISPATCHER = Dispatcher(PROVIDER_ADAPTERS, **options)
+    return DISPATCHER
+
+
+def call_model_generic(prompt: str, provider: str, model: str, temperature: float, max_tokens: int,
+                       stream: Optional[bool] = None, prefix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    One direct call through the provider's adapter in PROVIDER_ADAPTERS (no deadline or hedging).
+    stream defaults to CALL_CONFIG["stream"] (--stream). `prefix` (the prompt's shared
+    leading part) is only passed to wrappers when known.
+    """
+    adapter = PROVIDER_ADAPTERS.get(provider.lower())
+    if adapter is None:
+        raise ValueError(f"Unknown provider {provider!r}; expected one of {sorted(PROVIDER_ADAPTERS)}")
+    if stream is None:
+        stream = CALL_CONFIG["stream"]
+    return adapter.call(prompt, model, temperature, max_tokens, stream=stream, prefix=prefix)
+
+
+def iter_prompts(prompts_path: Path) -> Iterator[Dict[str, Any]]:
+    """
+    Stream prompts one at a time: a .jsonl file, a directory of JSONL shards
+    (prompts-*.jsonl, as written by experiment_design.py --factorial), a directory
+    of .txt files, or a single .txt file.
+    """
     if prompts_path.suffix == ".jsonl":
         with open(prompts_path, "r", encoding="utf8") as f:
             for line in f:
-                prompts.append(json.loads(line))
+                if line.strip():
+                    yield json.loads(line)
     elif prompts_path.is_dir():
+        shards = sorted(prompts_path.glob("prompts-*.jsonl"))
+        if shards:
+            for shard in shards:
+                yield from iter_prompts(shard)
+            return
         # read all .txt files in dir
         for p in sorted(prompts_path.glob("*.txt")):
             with open(p, "r", encoding="utf8") as f:
-                prompts.append({"prompt_id": p.stem, "title": p.stem, "text": f.read()})
+                yield {"prompt_id": p.stem, "title": p.stem, "text": f.read()}
     else:
         # single txt
         with open(prompts_path, "r", encoding="utf8") as f:
-            prompts.append({"prompt_id": prompts_path.stem, "title": prompts_path.stem, "text": f.read()})
-    return prompts
+            yield {"prompt_id": prompts_path.stem, "title": prompts_path.stem, "text": f.read()}
+
+
+def read_prompts(prompts_path: Path) -> List[Dict[str, Any]]:
+    return list(iter_prompts(prompts_path))
+
+
+def parse_model_spec(spec: str) -> Tuple[str, str]:
+    """ "openai:gpt-4" -> ("openai", "gpt-4"); a bare model name defaults to openai. """
+    return tuple(spec.split(":", 1)) if ":" in spec else ("openai", spec)
+
+
+def call_with_rate_control(limiter: AdaptiveLimiter, prompt: str, provider: str, model: str,
+                           temperature: float, max_tokens: int, max_retries: int = DEFAULT_MAX_RETRIES,
+                           metrics: Optional[Dict[str, Any]] = None, prefix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Call the provider under its adaptive limiter through DISPATCHER (deadline, hedging),
+    retrying rate-limit errors after the Retry-After window. Any other error (or the last
+    rate-limit error) is re-raised. A --deadline covers all attempts and the backoff between
+    them (DeadlineExceeded once it has passed). If `metrics` is given it is filled in (also on error)
+    with queue_wait_ms (time blocked in the limiter, including backoff), latency_ms of the
+    last attempt, retries, and the dispatcher's hedges, cancels and hedge_won.
+    """
+    metrics = {} if metrics is None else metrics
+    metrics.update(queue_wait_ms=0.0, retries=0)
+    attempt = 0
+    deadline_at = None  # one deadline per request, from its first attempt across retries and backoff
+    while True:
+        wait_start = time.perf_counter()
+        acquired = limiter.acquire(None if deadline_at is None else max(0.0, deadline_at - wait_start))
+        call_start = time.perf_counter()
+        metrics["queue_wait_ms"] += (call_start - wait_start) * 1000
+        if not acquired:
+            metrics["latency_ms"] = 0.0
+            raise DISPATCHER.deadline_error(provider, model)
+        if deadline_at is None:
+            deadline_at = DISPATCHER.deadline_at()
+        try:
+            # the dispatcher releases the limiter slot (and any hedge's) with the outcome
+            resp = DISPATCHER.call(prompt, provider, model, temperature, max_tokens, stream=CALL_CONFIG["stream"],
+                                   prefix=prefix, limiter=limiter, metrics=metrics, deadline_at=deadline_at)
+        except Exception as e:
+            metrics["latency_ms"] = (time.perf_counter() - call_start) * 1000
+            if is_rate_limit_error(e) and attempt < max_retries:
+                attempt += 1
+                metrics["retries"] = attempt
+                continue
+            raise
+        metrics["latency_ms"] = (time.perf_counter() - call_start) * 1000
+        return resp
+
+
+def cache_identity(provider: str) -> Tuple[str, Optional[str]]:
+    """(adapter name, endpoint) for response-cache keys: aliases share entries, --base-url runs do not."""
+    adapter = PROVIDER_ADAPTERS.get(provider.lower())
+    name = adapter.name if adapter is not None else provider.lower()
+    endpoint = None
+    if name == "openai":
+        endpoint = OPENAI_CLIENT_CONFIG.get("base_url") or os.environ.get("OPENAI_BASE_URL")
+    return name, endpoint
+
+
+def cached_call(cache: Optional[ResponseCache], limiter: AdaptiveLimiter, prompt: str, provider: str, model: str,
+                temperature: float, max_tokens: int, replicate: int, max_retries: int = DEFAULT_MAX_RETRIES,
+                metrics: Optional[Dict[str, Any]] = None, prefix: Optional[str] = None) -> Dict[str, Any]:
+    """
+    call_with_rate_control behind the persistent response cache. Hits never take a
+    rate-limit slot; errors are never cached. `metrics` gets cache_hit and, on a hit,
+    the lookup time as latency_ms.
+    """
+    metrics = {} if metrics is None else metrics
+    metrics["cache_hit"] = False
+    if cache is None:
+        return call_with_rate_control(limiter, prompt, provider, model, temperature, max_tokens, max_retries, metrics,
+                                      prefix)
+    name, endpoint = cache_identity(provider)
+    key = request_key(name, model, prompt, temperature, max_tokens, replicate, endpoint=endpoint)
+    start = time.perf_counter()
+    with phase("cache_get"):
+        resp = cache.get(key)
+    if resp is None:
+        resp = call_with_rate_control(limiter, prompt, provider, model, temperature, max_tokens, max_retries, metrics,
+                                      prefix)
+        with phase("cache_put"):
+            cache.put(key, {k: v for k, v in resp.items() if k not in CALL_FIELDS})
+    else:
+        metrics.update(cache_hit=True, latency_ms=(time.perf_counter() - start) * 1000, queue_wait_ms=0.0, retries=0)
+    return resp
+
+
+def make_record(run_id: str, ts: str, p: Dict[str, Any], provider: str, model: str, temperature: float, rep: int,
+                response_text: Optional[str], response_tokens: Optional[int], notes: str,
+                metrics: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    The NDJSON run record schema consumed by validate_claims.py and analyze_bias.py.
+    With `metrics`, the METRIC_FIELDS are appended (None where unknown).
+    """
+    record = {
+        "run_id": run_id,
+        "timestamp_utc": ts,
+        "prompt_id": p.get("prompt_id"),
+        "prompt_title": p.get("title"),
+        "prompt_text": p.get("text"),
+        "model_provider": provider,
+        "model": model,
+        "temperature": temperature,
+        "response_text": response_text,
+        "response_tokens": response_tokens,
+        "replicate": rep,
+        "notes": notes
+    }
+    if metrics is not None:
+        record.update({f: metrics.get(f) for f in METRIC_FIELDS})
+    return record
+
+
+def run_cell(p: Dict[str, Any], provider: str, model: str, rep: int, temperature: float,
+             limiter: AdaptiveLimiter, max_retries: int = DEFAULT_MAX_RETRIES,
+             cache: Optional[ResponseCache] = None) -> Dict[str, Any]:
+    """Run one prompt x model x replicate cell and return its NDJSON record."""
+    run_id = str(uuid.uuid4())
+    ts = datetime.utcnow().isoformat() + "Z"
+    metrics: Dict[str, Any] = {}
+    try:
+        with phase("model_call"):
+            resp = cached_call(cache, limiter, p["text"], provider, model, temperature, DEFAULT_MAX_TOKENS, rep,
+                               max_retries, metrics, prompt_prefix(p))
+        response_text, response_tokens, notes = resp["text"], resp.get("tokens"), ""
+        metrics.update({f: resp.get(f) for f in ("prompt_tokens", "cached_tokens", "completion_tokens", "ttft_ms")})
+    except Exception as e:
+        response_text, response_tokens, notes = None, None, f"error: {repr(e)}"
+    for f in ("latency_ms", "ttft_ms", "queue_wait_ms"):
+        if metrics.get(f) is not None:
+            metrics[f] = round(metrics[f], 3)
+    return make_record(run_id, ts, p, provider, model, temperature, rep, response_text, response_tokens, notes, metrics)
+
+
+def cell_key(prompt_id: Any, provider: str, model: str, replicate: int) -> Tuple[Any, str, str, int]:
+    return (prompt_id, provider, model, int(replicate))
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """ "2/4" -> (2, 4): shard index (0-based) and shard count. """
+    try:
+        index, count = (int(v) for v in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"shard must look like i/N, got {spec!r}") from None
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"shard index must be in 0..N-1, got {spec!r}")
+    return index, count
+
+
+def shard_of(prompt_id: Any, provider: str, model: str, replicate: int, shards: int) -> int:
+    """
+    Shard (0..shards-1) of a grid cell, from SHA-1 of its key: the same on every machine
+    and Python version (unlike hash()), and independent of prompt order.
+    """
+    key = json.dumps([prompt_id, provider, model, int(replicate)], ensure_ascii=False)
+    return int.from_bytes(hashlib.sha1(key.encode("utf8")).digest()[:8], "big") % shards
+
+
+def load_completed_cells(out_path: Path) -> Set[Tuple[Any, str, str, int]]:
+    """
+    Scan an existing run log once and return the keys of cells that finished successfully.
+    Records whose notes start with "error:" and truncated trailing lines are not counted.
+    """
+    done = set()
+    if not out_path.exists():
+        return done
+    for line in iter_lines(out_path):
+        try:
+            r = json.loads(line)
+        except ValueError:
+            continue
+        if (r.get("notes") or "").startswith("error:") or r.get("replicate") is None:
+            continue
+        done.add(cell_key(r.get("prompt_id"), r.get("model_provider"), r.get("model"), r.get("replicate")))
+    return done
+
+
+def iter_cells(prompts: Iterable[Dict[str, Any]], specs: List[Tuple[str, str]], replicates: int,
+               completed: Optional[Set[Tuple[Any, str, str, int]]] = None, shard: Optional[Tuple[int, int]] = None):
+    """
+    Yield (prompt, provider, model, replicate) for every grid cell not in `completed`
+    (and, given shard=(i, N), only the cells of shard i; see shard_of).
+    `prompts` is consumed in a single pass, so it may be a lazy stream (iter_prompts).
+    """
+    completed = completed or set()
+    for p in prompts:
+        pid = p.get("prompt_id")
+        for provider, model in specs:
+            for rep in range(replicates):
+                if shard is not None and shard_of(pid, provider, model, rep, shard[1]) != shard[0]:
+                    continue
+                if cell_key(pid, provider, model, rep) not in completed:
+                    yield p, provider, model, rep
+
+
+def terminate_partial_line(out_path: Path):
+    """If a crash left a half-written last line, end it so new records start on a fresh line."""
+    if not out_path.exists() or out_path.stat().st_size == 0:
+        return
+    if is_framed_path(out_path):
+        # a compressed log loses its partial last frame instead
+        recover_run_log(out_path)
+        return
+    with open(out_path, "rb+") as fh:
+        fh.seek(-1, os.SEEK_END)
+        if fh.read(1) != b"\n":
+            fh.write(b"\n")
+
 
+def make_limiters(providers: Iterable[str], max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Dict[str, AdaptiveLimiter]:
+    return {provider: AdaptiveLimiter(max_concurrency) for provider in providers}
 
-def run_batch(prompts: List[Dict[str, Any]], model_specs: List[str], replicates: int, temperature: float, out_path: Path):
+
+def run_cells(cells: Iterable[Tuple[Dict[str, Any], str, str, int]], limiters: Dict[str, AdaptiveLimiter],
+              out_path: Path, temperature: float, max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+              max_retries: int = DEFAULT_MAX_RETRIES, cache: Optional[ResponseCache] = None,
+              flush_interval: float = DEFAULT_FLUSH_INTERVAL, fsync_interval: Optional[float] = None,
+              on_record: Optional[Callable[[Dict[str, Any]], None]] = None) -> int:
+    """
+    Run (prompt, provider, model, replicate) cells concurrently and append their records to
+    `out_path`, with at most `max_concurrency` calls in flight per provider; the actual limit
+    adapts (AIMD) to 429 responses (`limiters`, one per provider, may be reused across calls). Records are handed to a single background RecordWriter as
+    they complete, so line order follows completion order rather than grid order.
+    `on_record` (e.g. pipeline.StreamingPipeline.submit) is called with each record after it
+    is queued for writing. Returns the number of records written.
+    """
+    with RecordWriter(out_path, flush_interval=flush_interval, fsync_interval=fsync_interval) as writer:
+        def work(p, provider, model, rep):
+            record = run_cell(p, provider, model, rep, temperature, limiters[provider], max_retries, cache)
+            with phase("write_record"):
+                writer.write(record)
+            if on_record is not None:
+                with phase("on_record"):
+                    on_record(record)
+
+        max_workers = max_concurrency * len(limiters)
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            # keep a bounded window of submitted cells so a lazy prompt stream is never materialized
+            pending = set()
+            for p, provider, model, rep in cells:
+                pending.add(pool.submit(work, p, provider, model, rep))
+                if len(pending) >= SUBMIT_WINDOW_FACTOR * max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        fut.result()
+            for fut in as_completed(pending):
+                fut.result()
+    return writer.records_written
+
+
+def run_batch(prompts: Iterable[Dict[str, Any]], model_specs: List[str], replicates: int, temperature: float, out_path: Path,
+              max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_retries: int = DEFAULT_MAX_RETRIES,
+              cache: Optional[ResponseCache] = None, resume: bool = False,
+              flush_interval: float = DEFAULT_FLUSH_INTERVAL, fsync_interval: Optional[float] = None,
+              on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+              shard: Optional[Tuple[int, int]] = None) -> int:
     """
     model_specs: list like ["openai:gpt-4", "openai:gpt-4o-mini"]
+
+    Runs every prompt x model x replicate cell through run_cells and returns the number
+    of records written. If `cache` is given, identical requests are answered from it
+    instead of the provider. With resume=True, cells already completed in `out_path`
+    are skipped. shard=(i, N) restricts the grid to shard i of N.
     """
     out_path.parent.mkdir(parents=True, exist_ok=True)
-    runs = []
-    for spec in model_specs:
-        provider, model = spec.split(":", 1) if ":" in spec else ("openai", spec)
-        for p in prompts:
-            for rep in range(replicates):
-                run_id = str(uuid.uuid4())
-                ts = datetime.utcnow().isoformat() + "Z"
-                try:
-                    resp = call_model_generic(p["text"], provider=provider, model=model, temperature=temperature, max_tokens=DEFAULT_MAX_TOKENS)
-                    record = {
-                        "run_id": run_id,
-                        "timestamp_utc": ts,
-                        "prompt_id": p.get("prompt_id"),
-                        "prompt_title": p.get("title"),
-                        "prompt_text": p.get("text"),
-                        "model_provider": provider,
-                        "model": model,
-                        "temperature": temperature,
-                        "response_text": resp["text"],
-                        "response_tokens": resp.get("tokens"),
-                        "replicate": rep,
-                        "notes": ""
-                    }
-                except Exception as e:
-                    record = {
-                        "run_id": run_id,
-                        "timestamp_utc": ts,
-                        "prompt_id": p.get("prompt_id"),
-                        "prompt_title": p.get("title"),
-                        "prompt_text": p.get("text"),
-                        "model_provider": provider,
-                        "model": model,
-                        "temperature": temperature,
-                        "response_text": None,
-                        "response_tokens": None,
-                        "replicate": rep,
-                        "notes": f"error: {repr(e)}"
-                    }
-                # append and write line-by-line for streaming safety
-                with open(out_path, "a", encoding="utf8") as fh:
-                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
-                runs.append(record)
-                # small sleep to avoid rate-limit bursts
-                time.sleep(0.25)
-    return runs
-
-
-def main():
+    specs = [parse_model_spec(s) for s in model_specs]
+    completed = set()
+    if resume:
+        terminate_partial_line(out_path)
+        with phase("resume_scan"):
+            completed = load_completed_cells(out_path)
+    if completed:
+        print(f"resume: {len(completed)} cells already completed in {out_path}")
+    limiters = make_limiters({provider for provider, _ in specs}, max_concurrency)
+    return run_cells(iter_cells(prompts, specs, replicates, completed, shard), limiters, out_path,
+                     temperature, max_concurrency=max_concurrency, max_retries=max_retries, cache=cache,
+                     flush_interval=flush_interval, fsync_interval=fsync_interval, on_record=on_record)
+
+
+def run_adaptive_batch(prompts: List[Dict[str, Any]], model_list: List[str], args, out_path: Path,
+                       cache: Optional[ResponseCache] = None, pipeline=None) -> int:
+    """--adaptive: rounds of replicates chosen by adaptive.AdaptiveScheduler; existing records in out_path count."""
+    from adaptive import AdaptiveScheduler, run_adaptive
+
+    specs = [parse_model_spec(s) for s in model_list]
+    scheduler = AdaptiveScheduler(prompts, specs, args.replicates, min_replicates=args.min_replicates,
+                                  round_size=args.round_size, precision=args.precision,
+                                  sentiment_precision=args.sentiment_precision, budget=args.budget)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    if out_path.exists():
+        terminate_partial_line(out_path)
+        print(f"adaptive: {scheduler.replay(out_path)} existing records in {out_path}")
+    limiters = make_limiters({provider for provider, _ in specs}, args.max_concurrency)
+
+    def on_record(record):
+        scheduler.observe(record)
+        if pipeline is not None:
+            pipeline.submit(record)
+
+    written = run_adaptive(scheduler, lambda cells: run_cells(
+        cells, limiters, out_path, args.temperature, max_concurrency=args.max_concurrency,
+        max_retries=args.max_retries, cache=cache, flush_interval=args.flush_interval,
+        fsync_interval=args.fsync_interval, on_record=on_record))
+    summary = scheduler.summary()
+    summary_path = out_path.with_name(out_path.name + ".adaptive.json")
+    with open(summary_path, "w", encoding="utf8") as fh:
+        json.dump(summary, fh, indent=2)
+    print(f"adaptive: {summary['calls']} calls vs {summary['fixed_design_calls']} for the fixed design "
+          f"(stopped by {summary['stopped_by']}); per-cell summary in {summary_path}")
+    return written
+
+
+def main(argv=None):
     parser = argparse.ArgumentParser()
-    parser.add_argument("--prompts", required=True, help="Path to prompts JSONL or directory or plain txt")
+    parser.add_argument("--prompts", required=True, help="Path to prompts JSONL, directory (JSONL shards or .txt files) or plain txt")
     parser.add_argument("--models", required=True, help="Comma-separated model specs: provider:model (e.g. openai:gpt-4,openai:gpt-4o-mini)")
     parser.add_argument("--replicates", type=int, default=3, help="Number of replicates per prompt")
     parser.add_argument("--temperature", type=float, default=DEFAULT_TEMPERATURE)
     parser.add_argument("--out", required=True, help="Output NDJSON file path (append-safe)")
-    args = parser.parse_args()
+    parser.add_argument("--max-concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="Max in-flight calls per provider")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES, help="Retries per call after rate-limit (429) errors")
+    parser.add_argument("--batch-mode", metavar="DIR", default=None,
+                        help="Write provider batch-request files to DIR instead of calling models (ingest with batch_mode.py)")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream responses and record time to first token (ttft_ms) per call")
+    parser.add_argument("--prompt-layout", choices=PROMPT_LAYOUTS, default="flat",
+                        help="How a prompt's shared prefix is sent: one text message (flat) or separate content parts")
+    parser.add_argument("--no-cache-hints", action="store_true",
+                        help="Do not send prompt_cache_key (for OpenAI-compatible endpoints that reject it)")
+    parser.add_argument("--base-url", default=None, help="Override the OpenAI-compatible endpoint (e.g. a local mock_server.py)")
+    parser.add_argument("--mock-latency", type=float, default=0.0, help="Latency in seconds for the mock: provider")
+    parser.add_argument("--mock-token-latency", type=float, default=0.0, help="Seconds between streamed tokens for the mock: provider")
+    parser.add_argument("--mock-prefix-cache", type=int, default=4096,
+                        help="Prefix cache entries for the mock: provider (0 disables cached_tokens)")
+    parser.add_argument("--mock-slow-rate", type=float, default=0.0,
+                        help="Fraction of mock: calls that stall for --mock-slow-latency (a latency tail)")
+    parser.add_argument("--mock-slow-latency", type=float, default=1.0, help="Latency in seconds of a stalled mock: call")
+    parser.add_argument("--mock-error-rate", type=float, default=0.0, help="Error rate for the mock: provider")
+    parser.add_argument("--mock-rate-limit-rate", type=float, default=0.0, help="429 rate for the mock: provider")
+    parser.add_argument("--deadline", type=float, default=None,
+                        help="Seconds a request may take (hedges included) before it fails with a deadline error")
+    parser.add_argument("--hedge", action="store_true",
+                        help="Issue one duplicate of a request still running after the recent --hedge-quantile latency; "
+                             "the first to finish wins and the other is cancelled")
+    parser.add_argument("--hedge-quantile", type=float, default=DEFAULT_HEDGE_QUANTILE,
+                        help="Latency percentile (per provider/model) after which a request is hedged")
+    parser.add_argument("--hedge-budget", type=float, default=DEFAULT_HEDGE_BUDGET,
+                        help="Max hedges as a fraction of requests")
+    parser.add_argument("--hedge-min-samples", type=int, default=DEFAULT_HEDGE_MIN_SAMPLES,
+                        help="Completed calls per provider/model before hedging starts")
+    parser.add_argument("--resume", action="store_true", help="Skip cells already completed (without error) in --out")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL, help="Seconds between output flushes (0 = flush every batch of records)")
+    parser.add_argument("--fsync-interval", type=float, default=None, help="Seconds between fsyncs of the output (default: only on close)")
+    parser.add_argument("--cache-path", default=str(DEFAULT_CACHE_PATH), help="SQLite response cache location")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the response cache entirely")
+    parser.add_argument("--refresh-cache", action="store_true", help="Ignore cached responses but store the fresh ones")
+    parser.add_argument("--cache-max-entries", type=int, default=None, help="Evict least recently used entries beyond this count")
+    parser.add_argument("--cache-max-age", type=float, default=None, help="Evict entries older than this many seconds")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Run replicates in rounds and stop each cell once its outcomes are settled (--replicates = max per cell)")
+    parser.add_argument("--min-replicates", type=int, default=3, help="Replicates every cell gets before --adaptive may stop it")
+    parser.add_argument("--round-size", type=int, default=2, help="Replicates added per unsettled cell per --adaptive round")
+    parser.add_argument("--precision", type=float, default=0.15,
+                        help="--adaptive target: 95%% CI half-width for mention/recommendation proportions")
+    parser.add_argument("--sentiment-precision", type=float, default=0.02,
+                        help="--adaptive target: 95%% CI half-width for mean sentiment")
+    parser.add_argument("--budget", type=int, default=None, help="--adaptive cap on total calls (including resumed ones)")
+    parser.add_argument("--shard", metavar="i/N", default=None,
+                        help="Run only shard i (0-based) of N of the grid, split by a stable hash of each cell; "
+                             "combine the shard outputs with merge_shards.py")
+    parser.add_argument("--pipeline", metavar="DIR", default=None,
+                        help="Validate and analyze responses as they arrive, writing live reports to DIR (needs --gt)")
+    parser.add_argument("--gt", default=None, help="Ground truth CSV for --pipeline claim validation")
+    parser.add_argument("--roster", default=None, help="Roster CSV (label,aliases) for --pipeline")
+    parser.add_argument("--report-interval", type=float, default=30.0, help="Seconds between --pipeline report flushes")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with profile_session(args, Path(args.out + ".profile.json"), "run_experiment") as prof:
+        written = _run(parser, args)
+        if prof is not None:
+            prof.extra["records"] = written
+    print("done.")
 
+
+def _run(parser: argparse.ArgumentParser, args) -> int:
     prompts_path = Path(args.prompts)
-    prompts = read_prompts(prompts_path)
+    prompts = timed_iter(iter_prompts(prompts_path), "load_prompts")
     model_list = [m.strip() for m in args.models.split(",") if m.strip()]
     out_path = Path(args.out)
+    for spec in model_list:
+        provider = parse_model_spec(spec)[0]
+        if provider.lower() not in PROVIDER_ADAPTERS:
+            parser.error(f"unknown provider {provider!r} in --models; expected one of {sorted(PROVIDER_ADAPTERS)}")
+    if args.pipeline and not args.gt:
+        parser.error("--pipeline requires --gt")
+    shard = None
+    if args.shard:
+        try:
+            shard = parse_shard(args.shard)
+        except ValueError as e:
+            parser.error(f"--shard: {e}")
+        if args.adaptive:
+            # adaptive stopping needs every replicate of a cell in one process
+            parser.error("--shard cannot be combined with --adaptive")
+    CALL_CONFIG.update(stream=args.stream, prompt_layout=args.prompt_layout, cache_hints=not args.no_cache_hints)
+    if args.batch_mode:
+        from batch_mode import build_batch_files
 
-    print(f"Running {len(prompts)} prompts x {len(model_list)} models x {args.replicates} replicates => writing to {out_path}")
-    run_batch(prompts, model_list, args.replicates, args.temperature, out_path)
-    print("done.")
+        with phase("build_batch_files"):
+            files = build_batch_files(prompts, model_list, args.replicates, args.temperature, Path(args.batch_mode),
+                                      shard=shard)
+        print(f"Wrote {len(files)} batch request files to {args.batch_mode}; ingest results with batch_mode.py --out {out_path}")
+        return 0
+    if args.base_url:
+        OPENAI_CLIENT_CONFIG["base_url"] = args.base_url
+    configure_mock(latency=args.mock_latency, error_rate=args.mock_error_rate, rate_limit_rate=args.mock_rate_limit_rate,
+                   token_latency=args.mock_token_latency, prefix_cache=MockPrefixCache(max_entries=args.mock_prefix_cache),
+                   slow_rate=args.mock_slow_rate, slow_latency=args.mock_slow_latency)
+    dispatcher = configure_dispatch(deadline=args.deadline, hedge=args.hedge, hedge_quantile=args.hedge_quantile,
+                                    hedge_budget=args.hedge_budget, hedge_min_samples=args.hedge_min_samples)
+
+    cache = None
+    if not args.no_cache:
+        cache = ResponseCache(Path(args.cache_path), max_entries=args.cache_max_entries,
+                              max_age_seconds=args.cache_max_age, refresh=args.refresh_cache)
+
+    pipeline = None
+    if args.pipeline:
+        # imported here so plain runs do not load pandas
+        from pipeline import StreamingPipeline
+        from roster import Roster
+        from validate_claims import load_inputs
+
+        roster_path = Path(args.roster) if args.roster else None
+        matcher = Roster.from_csv(roster_path).matcher() if roster_path else None
+        pipeline = StreamingPipeline(Path(args.pipeline), load_inputs(Path(args.gt), roster_path), matcher=matcher,
+                                     report_interval=args.report_interval)
+        if args.resume and out_path.exists():
+            print(f"pipeline: replayed {pipeline.replay(out_path)} existing records from {out_path}")
+
+    print(f"Running prompts from {prompts_path} x {len(model_list)} models x {args.replicates} replicates"
+          + (f" (shard {shard[0]}/{shard[1]})" if shard else "") + f" => writing to {out_path}")
+    written = 0
+    try:
+        if args.adaptive:
+            written = run_adaptive_batch(list(prompts), model_list, args, out_path, cache, pipeline)
+        else:
+            written = run_batch(prompts, model_list, args.replicates, args.temperature, out_path,
+                                max_concurrency=args.max_concurrency, max_retries=args.max_retries, cache=cache,
+                                resume=args.resume, flush_interval=args.flush_interval,
+                                fsync_interval=args.fsync_interval, on_record=pipeline.submit if pipeline else None,
+                                shard=shard)
+        print(f"{written} records written")
+    finally:
+        if pipeline is not None:
+            with phase("pipeline_close"):
+                pipeline.close()
+            print(f"pipeline: {pipeline.records_processed} records analyzed, reports in {args.pipeline}")
+        close_clients()
+        if args.hedge or args.deadline is not None:
+            st = dispatcher.stats
+            print(f"dispatch: {st['requests']} requests, {st['hedges']} hedged ({st['hedge_wins']} won), "
+                  f"{st['cancels']} cancelled, {st['deadline_exceeded']} past the deadline")
+        if cache is not None:
+            cache.close()
+            print(f"cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses, {cache.stats['evictions']} evicted")
+    return written
 
 
 if __name__ == "__main__":
@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+run_log.py
+
+Block-compressed run logs: NDJSON stored as a sequence of independently compressed
+frames, with a sidecar index for random access.
+
+Format:
+    runs.ndjson.gz    gzip members, each holding whole NDJSON lines (~1 MiB uncompressed).
+                      Concatenated members are a valid gzip stream, so `zcat` and
+                      gzip.open() still read the file as plain NDJSON.
+    runs.ndjson.zst   the same with zstd frames (needs the zstandard package).
+    <log>.idx         JSONL, one line per frame: offset, length, records, run_ids and
+                      (distinct) prompt_ids. Written after its frame, so a reader never
+                      sees an index entry for a frame that is not on disk.
+
+Readers stream frames in order without the index (iter_lines), decode frames on a
+thread pool when it is available (workers > 1; zlib and zstd release the GIL), and look
+up single runs or all runs of a prompt by seeking straight to their frames (RunLog).
+A frame cut short by a crash is ignored by readers and dropped by recover(), which the
+writer runs before appending. Plain NDJSON paths are read as before through the same
+functions.
+
+Usage:
+    python run_log.py compress --src ../results/h1_runs.ndjson --dst ../results/h1_runs.ndjson.gz
+    python run_log.py cat --log ../results/h1_runs.ndjson.gz > h1_runs.ndjson
+    python run_log.py get --log ../results/h1_runs.ndjson.gz --run-id 5f0c...
+    python run_log.py index --log ../results/h1_runs.ndjson.gz
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+
+FRAMED_SUFFIXES = {".gz": "gzip", ".zst": "zstd"}
+INDEX_SUFFIX = ".idx"
+DEFAULT_FRAME_BYTES = 1 << 20   # uncompressed bytes per frame
+DEFAULT_MAX_FRAME_AGE = 60.0    # seconds a buffered record may wait for its frame (flushes)
+READ_SIZE = 1 << 20
+
+
+# ---- codecs ----
+
+class _GzipCodec:
+    name = "gzip"
+    default_level = 6
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        return gzip.compress(data, compresslevel=level, mtime=0)
+
+    def decompress(self, frame: bytes) -> bytes:
+        return zlib.decompress(frame, wbits=31)
+
+    def decompressor(self):
+        # stops at the end of one gzip member; the rest is left in unused_data
+        return zlib.decompressobj(wbits=31)
+
+
+class _ZstdCodec:
+    name = "zstd"
+    default_level = 3
+
+    def __init__(self):
+        try:
+            import zstandard
+        except ImportError:
+            raise RuntimeError(".zst run logs need the zstandard package (pip install zstandard)") from None
+        self._zstd = zstandard
+
+    def compress(self, data: bytes, level: int) -> bytes:
+        return self._zstd.ZstdCompressor(level=level, write_content_size=True).compress(data)
+
+    def decompress(self, frame: bytes) -> bytes:
+        return self._zstd.ZstdDecompressor().decompress(frame)
+
+    def decompressor(self):
+        return self._zstd.ZstdDecompressor().decompressobj()
+
+
+def codec_name(path: Path) -> Optional[str]:
+    return FRAMED_SUFFIXES.get(Path(path).suffix.lower())
+
+
+def is_framed_path(path: Path) -> bool:
+    return codec_name(path) is not None
+
+
+def get_codec(path: Path):
+    name = codec_name(path)
+    if name is None:
+        raise ValueError(f"{path} is not a compressed run log ({', '.join(FRAMED_SUFFIXES)})")
+    return _GzipCodec() if name == "gzip" else _ZstdCodec()
+
+
+def index_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+# ---- frames and index ----
+
+def _split_lines(data: bytes) -> List[bytes]:
+    return [line for line in data.split(b"\n") if line.strip()]
+
+
+def index_entry(offset: int, length: int, lines: Iterable[bytes]) -> Dict[str, Any]:
+    """Index line for a frame, from its decoded lines."""
+    run_ids, prompt_ids = [], {}
+    n = 0
+    for line in lines:
+        r = json.loads(line)
+        run_ids.append(r.get("run_id"))
+        prompt_ids.setdefault(r.get("prompt_id"), None)
+        n += 1
+    return {"offset": offset, "length": length, "records": n, "run_ids": run_ids, "prompt_ids": list(prompt_ids)}
+
+
+def scan_frames(path: Path, start_offset: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """
+    Stream (offset, end, decoded bytes) for each complete frame from `start_offset` (a frame
+    boundary) on, without the index. A trailing partial frame (still being written) is skipped.
+    """
+    codec = get_codec(path)
+    with open(path, "rb") as fh:
+        fh.seek(start_offset)
+        frame_start, fed, parts, d = start_offset, 0, [], None
+        pending = fh.read(READ_SIZE)
+        while pending:
+            if d is None:
+                d = codec.decompressor()
+            parts.append(d.decompress(pending))
+            if d.eof:
+                rest = d.unused_data
+                end = frame_start + fed + len(pending) - len(rest)
+                yield frame_start, end, b"".join(parts)
+                frame_start, fed, parts, d = end, 0, [], None
+                pending = rest or fh.read(READ_SIZE)
+            else:
+                fed += len(pending)
+                pending = fh.read(READ_SIZE)
+
+
+def load_index(path: Path) -> List[Dict[str, Any]]:
+    """
+    The index entries of complete frames, in file order. Entries past the end of the
+    file, out of sequence or unreadable (an interrupted write) end the list.
+    """
+    idx = index_path(path)
+    if not idx.exists() or not Path(path).exists():
+        return []
+    size = Path(path).stat().st_size
+    frames, expected = [], 0
+    with open(idx, "r", encoding="utf8") as fh:
+        for line in fh:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                break
+            if entry.get("offset") != expected or entry["offset"] + entry["length"] > size:
+                break
+            frames.append(entry)
+            expected = entry["offset"] + entry["length"]
+    return frames
+
+
+def _indexed_end(frames: List[Dict[str, Any]]) -> int:
+    return frames[-1]["offset"] + frames[-1]["length"] if frames else 0
+
+
+def recover(path: Path) -> Tuple[int, int]:
+    """
+    Make a framed log safe to append to: truncate a partial trailing frame and bring the
+    index up to date (rebuilding it from the frames if needed). Returns (frames, bytes dropped).
+    """
+    path = Path(path)
+    if not path.exists():
+        return 0, 0
+    frames = load_index(path)
+    new = []
+    for offset, end, data in scan_frames(path, _indexed_end(frames)):
+        new.append(index_entry(offset, end - offset, _split_lines(data)))
+    size = path.stat().st_size
+    good = _indexed_end(new or frames)
+    if good < size:
+        with open(path, "rb+") as fh:
+            fh.truncate(good)
+    idx = index_path(path)
+    on_disk = 0
+    if idx.exists():
+        with open(idx, "rb") as fh:
+            on_disk = sum(1 for _ in fh)
+    if on_disk != len(frames):
+        # stale or damaged tail in the index: rewrite what is valid
+        with open(idx, "w", encoding="utf8") as fh:
+            fh.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in frames)
+    if new:
+        with open(idx, "a", encoding="utf8") as fh:
+            fh.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in new)
+    return len(frames) + len(new), size - good
+
+
+def iter_frame_data(path: Path, start_offset: int = 0, workers: int = 1) -> Iterator[Tuple[int, bytes]]:
+    """
+    (end offset, decoded bytes) per complete frame in file order. With workers > 1 the
+    indexed frames are decoded on a thread pool (at most 2 x workers in flight); frames
+    beyond the index are streamed.
+    """
+    frames = [f for f in load_index(path) if f["offset"] >= start_offset] if workers > 1 else []
+    if frames and frames[0]["offset"] != start_offset:
+        frames = []
+    if frames:
+        codec = get_codec(path)
+        with open(path, "rb") as fh, ThreadPoolExecutor(max_workers=workers) as pool:
+            pending = deque()
+            for f in frames:
+                fh.seek(f["offset"])
+                pending.append((f["offset"] + f["length"], pool.submit(codec.decompress, fh.read(f["length"]))))
+                if len(pending) >= 2 * workers:
+                    end, fut = pending.popleft()
+                    yield end, fut.result()
+            while pending:
+                end, fut = pending.popleft()
+                yield end, fut.result()
+        start_offset = _indexed_end(frames)
+    for _, end, data in scan_frames(path, start_offset):
+        yield end, data
+
+
+# ---- readers (plain or framed) ----
+
+def iter_lines(path: Path, workers: int = 1) -> Iterator[str]:
+    """Non-blank lines (newline kept) of a plain or framed NDJSON run log."""
+    path = Path(path)
+    if not is_framed_path(path):
+        with open(path, "r", encoding="utf8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield line
+        return
+    for _, data in iter_frame_data(path, workers=workers):
+        for line in data.decode("utf8").split("\n"):
+            if line.strip():
+                yield line + "\n"
+
+
+def iter_records(path: Path, workers: int = 1) -> Iterator[Dict[str, Any]]:
+    for line in iter_lines(path, workers):
+        yield json.loads(line)
+
+
+class RunLog:
+    """Random access into a framed run log through its index (rebuilt in memory if missing)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.codec = get_codec(self.path)
+        self.frames = load_index(self.path)
+        for offset, end, data in scan_frames(self.path, _indexed_end(self.frames)):
+            self.frames.append(index_entry(offset, end - offset, _split_lines(data)))
+        self._by_run: Dict[Any, int] = {}
+        self._by_prompt: Dict[Any, List[int]] = {}
+        for i, f in enumerate(self.frames):
+            for rid in f["run_ids"]:
+                self._by_run[rid] = i
+            for pid in f["prompt_ids"]:
+                self._by_prompt.setdefault(pid, []).append(i)
+
+    def __len__(self) -> int:
+        return len(self._by_run)
+
+    def read_frame(self, i: int) -> List[Dict[str, Any]]:
+        f = self.frames[i]
+        with open(self.path, "rb") as fh:
+            fh.seek(f["offset"])
+            data = self.codec.decompress(fh.read(f["length"]))
+        return [json.loads(line) for line in _split_lines(data)]
+
+    def get(self, run_id) -> Optional[Dict[str, Any]]:
+        i = self._by_run.get(run_id)
+        if i is None:
+            return None
+        return next((r for r in self.read_frame(i) if r.get("run_id") == run_id), None)
+
+    def records_for_prompt(self, prompt_id) -> Iterator[Dict[str, Any]]:
+        for i in self._by_prompt.get(prompt_id, []):
+            for r in self.read_frame(i):
+                if r.get("prompt_id") == prompt_id:
+                    yield r
+
+
+# ---- writer ----
+
+class FramedWriter:
+    """
+    Appends frames to a framed run log and its index. Lines are buffered until
+    `frame_bytes` (uncompressed) accumulate; flush() also cuts a frame once the oldest
+    buffered line is `max_frame_age` seconds old, and close()/sync() always do.
+    """
+
+    def __init__(self, path: Path, frame_bytes: int = DEFAULT_FRAME_BYTES,
+                 max_frame_age: float = DEFAULT_MAX_FRAME_AGE, level: Optional[int] = None, append: bool = True):
+        self.path = Path(path)
+        self.codec = get_codec(self.path)
+        self.level = self.codec.default_level if level is None else level
+        self.frame_bytes = frame_bytes
+        self.max_frame_age = max_frame_age
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        if append:
+            recover(self.path)
+        else:
+            index_path(self.path).unlink(missing_ok=True)
+        self._fh = open(self.path, "ab" if append else "wb")
+        self._idx = open(index_path(self.path), "a" if append else "w", encoding="utf8")
+        self._offset = self._fh.tell()
+        self._lines: List[bytes] = []
+        self._run_ids: List[Any] = []
+        self._prompt_ids: Dict[Any, None] = {}
+        self._size = 0
+        self._since = None
+
+    def add(self, line: str, run_id=None, prompt_id=None):
+        """Buffer one NDJSON line (newline included)."""
+        data = line.encode("utf8")
+        if self._since is None:
+            self._since = time.monotonic()
+        self._lines.append(data)
+        self._run_ids.append(run_id)
+        self._prompt_ids.setdefault(prompt_id, None)
+        self._size += len(data)
+        if self._size >= self.frame_bytes:
+            self.cut_frame()
+
+    def cut_frame(self):
+        if not self._lines:
+            return
+        frame = self.codec.compress(b"".join(self._lines), self.level)
+        self._fh.write(frame)
+        self._fh.flush()
+        # the index line follows its frame, so it never points past the data
+        self._idx.write(json.dumps({"offset": self._offset, "length": len(frame), "records": len(self._lines),
+                                    "run_ids": self._run_ids, "prompt_ids": list(self._prompt_ids)},
+                                   ensure_ascii=False) + "\n")
+        self._idx.flush()
+        self._offset += len(frame)
+        self._lines, self._run_ids, self._prompt_ids, self._size, self._since = [], [], {}, 0, None
+
+    def flush(self):
+        if self._since is not None and time.monotonic() - self._since >= self.max_frame_age:
+            self.cut_frame()
+
+    def sync(self):
+        self.cut_frame()
+        os.fsync(self._fh.fileno())
+        os.fsync(self._idx.fileno())
+
+    def close(self):
+        try:
+            self.cut_frame()
+        finally:
+            self._fh.close()
+            self._idx.close()
+
+
+def compress_log(src: Path, dst: Path, frame_bytes: int = DEFAULT_FRAME_BYTES, level: Optional[int] = None) -> int:
+    """Write the run log `src` (plain or framed) as the framed log `dst`; returns records."""
+    writer = FramedWriter(dst, frame_bytes=frame_bytes, level=level, append=False)
+    n = 0
+    try:
+        for line in iter_lines(src):
+            r = json.loads(line)
+            writer.add(line, r.get("run_id"), r.get("prompt_id"))
+            n += 1
+    finally:
+        writer.close()
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("compress", help="Convert a run log to a framed .gz/.zst log with index")
+    p.add_argument("--src", required=True, help="Run log to read (plain or framed)")
+    p.add_argument("--dst", required=True, help="Framed log to write (.ndjson.gz or .ndjson.zst)")
+    p.add_argument("--frame-bytes", type=int, default=DEFAULT_FRAME_BYTES, help="Uncompressed bytes per frame")
+    p.add_argument("--level", type=int, default=None, help="Compression level (codec default if omitted)")
+    p = sub.add_parser("cat", help="Write a run log to stdout as plain NDJSON")
+    p.add_argument("--log", required=True)
+    p.add_argument("--workers", type=int, default=1, help="Threads decoding frames")
+    p = sub.add_parser("get", help="Print the runs with a run_id or prompt_id")
+    p.add_argument("--log", required=True)
+    p.add_argument("--run-id", default=None)
+    p.add_argument("--prompt-id", default=None)
+    p = sub.add_parser("index", help="Drop a partial trailing frame and rebuild/extend the index")
+    p.add_argument("--log", required=True)
+    args = parser.parse_args(argv)
+
+    if args.command == "compress":
+        start = time.perf_counter()
+        n = compress_log(Path(args.src), Path(args.dst), args.frame_bytes, args.level)
+        src_size, dst_size = Path(args.src).stat().st_size, Path(args.dst).stat().st_size
+        print(f"{n} records: {src_size} -> {dst_size} bytes ({dst_size / max(1, src_size):.1%}) "
+              f"in {time.perf_counter() - start:.1f}s; index {index_path(Path(args.dst))}")
+    elif args.command == "cat":
+        for line in iter_lines(Path(args.log), args.workers):
+            sys.stdout.write(line)
+    elif args.command == "get":
+        log = RunLog(Path(args.log))
+        if args.run_id is not None:
+            records = [r for r in [log.get(args.run_id)] if r is not None]
+        else:
+            records = list(log.records_for_prompt(args.prompt_id))
+        for r in records:
+            print(json.dumps(r, ensure_ascii=False))
+        if not records:
+            print("not found", file=sys.stderr)
+            return 1
+    else:
+        frames, dropped = recover(Path(args.log))
+        print(f"{frames} frames indexed; {dropped} bytes of partial frame dropped")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+run_store.py
+
+Compact SQLite store for run logs and claim validations, with converters to/from
+the NDJSON files written by run_experiment.py and validate_claims.py.
+
+Schema:
+    prompts      one row per distinct prompt, keyed by SHA-256 of its text
+    runs         one row per run, referencing prompts.prompt_hash (no repeated prompt text)
+    validations  one row per validated run, referencing runs.run_id (no repeated response text)
+
+Readers select only the columns they need (iter_runs) and the database is opened with
+a memory-mapped I/O window, so analysis passes skip JSON parsing entirely. Fields not
+in the fixed schema are kept in an `extra` JSON column so conversions round-trip.
+
+Usage:
+    python run_store.py import --db results/runs.sqlite --runs results/h1_runs.ndjson --validations results/validations.ndjson
+    python run_store.py export --db results/runs.sqlite --runs out_runs.ndjson --validations out_validations.ndjson
+"""
+
+import argparse
+import hashlib
+import json
+import sqlite3
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Sequence
+
+from profiling import add_profile_arguments, phase, profile_session
+from run_log import FramedWriter, is_framed_path, iter_records
+
+STORE_SUFFIXES = (".sqlite", ".sqlite3", ".db")
+MMAP_SIZE = 1 << 30
+
+RUN_COLUMNS = ("run_id", "timestamp_utc", "prompt_id", "prompt_title", "prompt_text", "model_provider", "model",
+               "temperature", "response_text", "response_tokens", "replicate", "notes")
+# columns stored directly on the runs table (prompt_title/prompt_text live in prompts)
+_RUN_TABLE_COLUMNS = ("run_id", "timestamp_utc", "prompt_id", "model_provider", "model", "temperature",
+                      "response_text", "response_tokens", "replicate", "notes")
+VALIDATION_COLUMNS = ("run_id", "prompt_id", "model", "provider", "response_text", "claims_extracted", "validations")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    prompt_hash TEXT PRIMARY KEY,
+    prompt_id TEXT,
+    title TEXT,
+    text TEXT
+);
+CREATE TABLE IF NOT EXISTS runs (
+    seq INTEGER PRIMARY KEY,
+    run_id TEXT UNIQUE,
+    timestamp_utc TEXT,
+    prompt_hash TEXT REFERENCES prompts(prompt_hash),
+    prompt_id TEXT,
+    model_provider TEXT,
+    model TEXT,
+    temperature REAL,
+    response_text TEXT,
+    response_tokens INTEGER,
+    replicate INTEGER,
+    notes TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS runs_prompt ON runs(prompt_id);
+CREATE TABLE IF NOT EXISTS validations (
+    seq INTEGER PRIMARY KEY,
+    run_id TEXT,
+    prompt_id TEXT,
+    model TEXT,
+    provider TEXT,
+    claims_extracted TEXT,
+    validations TEXT,
+    response_text TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS validations_run ON validations(run_id);
+"""
+
+
+def is_store_path(path: Path) -> bool:
+    return Path(path).suffix.lower() in STORE_SUFFIXES
+
+
+def connect(db_path: Path, readonly: bool = False) -> sqlite3.Connection:
+    if readonly:
+        conn = sqlite3.connect(f"file:{Path(db_path)}?mode=ro", uri=True)
+    else:
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(db_path))
+        conn.executescript(SCHEMA)
+    conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+    return conn
+
+
+def prompt_hash(text: Optional[str]) -> Optional[str]:
+    return None if text is None else hashlib.sha256(text.encode("utf8")).hexdigest()
+
+
+def _extra(record: Dict[str, Any], known: Sequence[str]) -> Optional[str]:
+    extra = {k: v for k, v in record.items() if k not in known}
+    return json.dumps(extra, ensure_ascii=False) if extra else None
+
+
+def _iter_ndjson(path: Path) -> Iterator[Dict[str, Any]]:
+    # plain NDJSON or a compressed run log (run_log.py)
+    yield from iter_records(path)
+
+
+# ---- NDJSON -> store ----
+
+def import_runs(conn: sqlite3.Connection, records, batch_size: int = 5000) -> int:
+    n = 0
+    batch = []
+    seen_prompts = set()
+
+    def flush():
+        conn.executemany(
+            "INSERT OR REPLACE INTO runs (run_id, timestamp_utc, prompt_hash, prompt_id, model_provider, model, "
+            "temperature, response_text, response_tokens, replicate, notes, extra) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+            batch)
+        batch.clear()
+
+    for r in records:
+        text = r.get("prompt_text")
+        h = prompt_hash(text)
+        if h is not None and h not in seen_prompts:
+            conn.execute("INSERT OR IGNORE INTO prompts (prompt_hash, prompt_id, title, text) VALUES (?,?,?,?)",
+                         (h, r.get("prompt_id"), r.get("prompt_title"), text))
+            seen_prompts.add(h)
+        batch.append((r.get("run_id"), r.get("timestamp_utc"), h, r.get("prompt_id"), r.get("model_provider"),
+                      r.get("model"), r.get("temperature"), r.get("response_text"), r.get("response_tokens"),
+                      r.get("replicate"), r.get("notes"), _extra(r, RUN_COLUMNS)))
+        n += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    conn.commit()
+    return n
+
+
+def import_validations(conn: sqlite3.Connection, records, batch_size: int = 5000) -> int:
+    n = 0
+    batch = []
+    known_runs = conn.execute("SELECT run_id, response_text FROM runs").fetchall()
+    run_text = dict(known_runs)
+
+    def flush():
+        conn.executemany(
+            "INSERT INTO validations (run_id, prompt_id, model, provider, claims_extracted, validations, "
+            "response_text, extra) VALUES (?,?,?,?,?,?,?,?)", batch)
+        batch.clear()
+
+    for v in records:
+        rid = v.get("run_id")
+        resp = v.get("response_text")
+        # the response text is only stored here when it cannot be recovered from the runs table
+        if rid in run_text and (run_text[rid] or "") == (resp or ""):
+            resp = None
+        batch.append((rid, v.get("prompt_id"), v.get("model"), v.get("provider"),
+                      json.dumps(v.get("claims_extracted"), ensure_ascii=False),
+                      json.dumps(v.get("validations"), ensure_ascii=False), resp, _extra(v, VALIDATION_COLUMNS)))
+        n += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    conn.commit()
+    return n
+
+
+# ---- store -> readers / NDJSON ----
+
+def iter_runs(conn: sqlite3.Connection, fields: Sequence[str] = RUN_COLUMNS, chunksize: int = 50000,
+              after_seq: int = 0) -> Iterator[List[tuple]]:
+    """Yield lists of row tuples holding only `fields`, in insertion order."""
+    select = []
+    for f in fields:
+        if f == "prompt_title":
+            select.append("p.title")
+        elif f == "prompt_text":
+            select.append("p.text")
+        elif f in _RUN_TABLE_COLUMNS:
+            select.append(f"r.{f}")
+        else:
+            select.append("NULL")
+    join = " LEFT JOIN prompts p ON p.prompt_hash = r.prompt_hash" if {"prompt_title", "prompt_text"} & set(fields) else ""
+    cur = conn.execute(f"SELECT {', '.join(select)} FROM runs r{join} WHERE r.seq > ? ORDER BY r.seq", (after_seq,))
+    while True:
+        rows = cur.fetchmany(chunksize)
+        if not rows:
+            return
+        yield rows
+
+
+def iter_run_records(conn: sqlite3.Connection) -> Iterator[Dict[str, Any]]:
+    cur = conn.execute(
+        "SELECT r.run_id, r.timestamp_utc, r.prompt_id, p.title, p.text, r.model_provider, r.model, r.temperature, "
+        "r.response_text, r.response_tokens, r.replicate, r.notes, r.extra "
+        "FROM runs r LEFT JOIN prompts p ON p.prompt_hash = r.prompt_hash ORDER BY r.seq")
+    for row in cur:
+        record = dict(zip(RUN_COLUMNS, row[:-1]))
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        yield record
+
+
+def iter_validation_records(conn: sqlite3.Connection) -> Iterator[Dict[str, Any]]:
+    cur = conn.execute(
+        "SELECT v.run_id, v.prompt_id, v.model, v.provider, COALESCE(v.response_text, r.response_text, ''), "
+        "v.claims_extracted, v.validations, v.extra "
+        "FROM validations v LEFT JOIN runs r ON r.run_id = v.run_id ORDER BY v.seq")
+    for rid, pid, model, provider, resp, claims, validations, extra in cur:
+        record = {"run_id": rid, "prompt_id": pid, "model": model, "provider": provider, "response_text": resp,
+                  "claims_extracted": json.loads(claims), "validations": json.loads(validations)}
+        if extra:
+            record.update(json.loads(extra))
+        yield record
+
+
+def _write_ndjson(records, out_path: Path) -> int:
+    n = 0
+    if is_framed_path(out_path):
+        writer = FramedWriter(out_path, append=False)
+        try:
+            for r in records:
+                writer.add(json.dumps(r, ensure_ascii=False) + "\n", r.get("run_id"), r.get("prompt_id"))
+                n += 1
+        finally:
+            writer.close()
+        return n
+    with open(out_path, "w", encoding="utf8") as fh:
+        for r in records:
+            fh.write(json.dumps(r, ensure_ascii=False) + "\n")
+            n += 1
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("import", "Load NDJSON files into the store"), ("export", "Write the store back to NDJSON")):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument("--db", required=True, help="SQLite store path")
+        p.add_argument("--runs", default=None, help="Runs NDJSON file")
+        p.add_argument("--validations", default=None, help="Validations NDJSON file")
+        add_profile_arguments(p)
+    args = parser.parse_args(argv)
+
+    with profile_session(args, Path(f"{args.db}.{args.command}.profile.json"), "run_store"):
+        if args.command == "import":
+            conn = connect(Path(args.db))
+            if args.runs:
+                with phase("import_runs"):
+                    print(f"{import_runs(conn, _iter_ndjson(Path(args.runs)))} runs imported")
+            if args.validations:
+                with phase("import_validations"):
+                    print(f"{import_validations(conn, _iter_ndjson(Path(args.validations)))} validations imported")
+        else:
+            conn = connect(Path(args.db), readonly=True)
+            if args.runs:
+                with phase("export_runs"):
+                    print(f"{_write_ndjson(iter_run_records(conn), Path(args.runs))} runs exported")
+            if args.validations:
+                with phase("export_validations"):
+                    print(f"{_write_ndjson(iter_validation_records(conn), Path(args.validations))} validations exported")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
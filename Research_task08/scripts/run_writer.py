@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+run_writer.py
+
+Single background writer for NDJSON run records.
+
+Workers call `RecordWriter.write(record)`; a dedicated thread owns the open file and
+is the only thing that writes to it, so every record lands as one whole line no
+matter how many workers produce results. Lines are batched and flushed every
+`flush_interval` seconds, or after every batch when it is 0 (and fsync'd every
+`fsync_interval` seconds if set).
+
+A .gz/.zst output path is written as a framed, indexed run log (run_log.py): records
+are grouped into compressed frames, cut when a frame is full, at every fsync and on
+close, and otherwise after run_log.DEFAULT_MAX_FRAME_AGE seconds.
+"""
+
+import json
+import os
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from run_log import FramedWriter, is_framed_path
+
+DEFAULT_FLUSH_INTERVAL = 1.0
+DEFAULT_QUEUE_SIZE = 10000
+
+_STOP = object()
+
+
+def drain_until_stop(q: "queue.Queue", stop_marker: object, stop_seen: bool):
+    """
+    After a consumer thread fails, empty its queue so producers blocked on a full queue
+    are released: up to `stop_marker`, or only what is already queued if the marker was
+    consumed before the failure (blocking then would never return).
+    """
+    if stop_seen:
+        while True:
+            try:
+                q.get_nowait()
+            except queue.Empty:
+                return
+    while q.get() is not stop_marker:
+        pass
+
+
+class RecordWriter:
+    """
+    Append-only NDJSON writer fed by a bounded queue.
+
+    Use as a context manager; close() drains the queue, flushes and fsyncs. Errors
+    raised in the writer thread are re-raised from write()/close().
+    """
+
+    def __init__(self, out_path: Path, flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 fsync_interval: Optional[float] = None, queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.out_path = Path(out_path)
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self.records_written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._error = None
+        self._closed = False
+        self.out_path.parent.mkdir(parents=True, exist_ok=True)
+        self._framed = FramedWriter(self.out_path) if is_framed_path(self.out_path) else None
+        self._fh = None if self._framed else open(self.out_path, "a", encoding="utf8")
+        self._thread = threading.Thread(target=self._run, name="RecordWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, record: Dict[str, Any]):
+        if self._error is not None:
+            raise self._error
+        if self._closed:
+            raise ValueError("write to closed RecordWriter")
+        # serialize in the producer so the writer thread only does I/O
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        self._queue.put((line, record.get("run_id"), record.get("prompt_id")) if self._framed else line)
+
+    def _run(self):
+        last_flush = last_fsync = time.monotonic()
+        pending = []
+        stop = False
+        try:
+            while not stop:
+                # flush_interval <= 0 flushes every batch: block for the next record instead of polling
+                timeout = (None if self.flush_interval <= 0
+                           else max(0.0, self.flush_interval - (time.monotonic() - last_flush)))
+                try:
+                    item = self._queue.get(timeout=timeout)
+                    while True:
+                        if item is _STOP:
+                            stop = True
+                            break
+                        pending.append(item)
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+                if pending:
+                    if self._framed:
+                        for line, run_id, prompt_id in pending:
+                            self._framed.add(line, run_id, prompt_id)
+                    else:
+                        self._fh.write("".join(pending))
+                    self.records_written += len(pending)
+                    pending = []
+
+                now = time.monotonic()
+                if stop or now - last_flush >= self.flush_interval:
+                    if self._framed:
+                        self._framed.flush()
+                    else:
+                        self._fh.flush()
+                    last_flush = now
+                    if stop or (self.fsync_interval is not None and now - last_fsync >= self.fsync_interval):
+                        if self._framed:
+                            self._framed.sync()
+                        else:
+                            os.fsync(self._fh.fileno())
+                        last_fsync = now
+        except BaseException as e:
+            self._error = e
+            drain_until_stop(self._queue, _STOP, stop)
+        finally:
+            try:
+                (self._framed or self._fh).close()
+            except BaseException as e:
+                # closing flushes too; keep the first error
+                if self._error is None:
+                    self._error = e
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+sentiment.py
+
+Lexicon sentiment engine used by analyze_bias.py.
+
+The lexicon (stem -> weight, positive or negative) is compiled once into a character
+trie. Each distinct word is scored once by walking the trie from every start position
+("substring" match, the rule used by analyze_bias.simple_sentiment) or from position 0
+only ("prefix" match), and the result is memoized, so scoring cost per word no longer
+grows with the lexicon size.
+
+A word contributes the largest positive weight plus the most negative weight among
+the stems it contains; with the default +1/-1 lexicon this reproduces
+simple_sentiment exactly: (#positive words - #negative words) / #words.
+
+Lexicon files are CSV/TSV lines of `stem,weight` (a bare stem means weight 1.0;
+lines starting with # are ignored).
+"""
+
+import re
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+WORD_PATTERN = re.compile(r"\w+")
+DEFAULT_NEGATORS = frozenset({"not", "no", "never", "without", "hardly", "nor"})
+_END = ""  # trie key marking the end of a stem; never a character of a word
+
+
+def load_lexicon(path: Path) -> Dict[str, float]:
+    lexicon = {}
+    with open(path, "r", encoding="utf8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = re.split(r"[,\t]", line)
+            stem = parts[0].strip().lower()
+            if stem:
+                lexicon[stem] = float(parts[1]) if len(parts) > 1 and parts[1].strip() else 1.0
+    return lexicon
+
+
+class SentimentEngine:
+    """
+    Compiled lexicon scorer.
+
+    match: "substring" (stem anywhere in the word) or "prefix" (word starts with stem).
+    negation_window: if > 0, a scored word preceded within this many tokens by one of
+    `negators` has its weight flipped.
+    """
+
+    def __init__(self, lexicon: Dict[str, float], match: str = "substring", negation_window: int = 0,
+                 negators: Iterable[str] = DEFAULT_NEGATORS):
+        if match not in ("substring", "prefix"):
+            raise ValueError(f"match must be 'substring' or 'prefix', got {match!r}")
+        self.match = match
+        self.negation_window = negation_window
+        self.negators = frozenset(n.lower() for n in negators)
+        self._trie: Dict = {}
+        for stem, weight in lexicon.items():
+            node = self._trie
+            for ch in stem.lower():
+                node = node.setdefault(ch, {})
+            node[_END] = float(weight)
+        self._cache: Dict[str, float] = {}
+
+    @classmethod
+    def from_word_sets(cls, pos_words: Iterable[str], neg_words: Iterable[str], **kwargs) -> "SentimentEngine":
+        lexicon = {w: 1.0 for w in pos_words}
+        lexicon.update({w: -1.0 for w in neg_words})
+        return cls(lexicon, **kwargs)
+
+    def _compute_word(self, word: str) -> float:
+        best_pos = best_neg = 0.0
+        starts = range(len(word)) if self.match == "substring" else (0,)
+        for i in starts:
+            node = self._trie
+            for ch in word[i:]:
+                node = node.get(ch)
+                if node is None:
+                    break
+                w = node.get(_END)
+                if w is not None:
+                    if w > best_pos:
+                        best_pos = w
+                    elif w < best_neg:
+                        best_neg = w
+        return best_pos + best_neg
+
+    def word_weight(self, word: str) -> float:
+        w = self._cache.get(word)
+        if w is None:
+            w = self._cache[word] = self._compute_word(word)
+        return w
+
+    def score(self, text: Optional[str]) -> float:
+        words = WORD_PATTERN.findall((text or "").lower())
+        if not words:
+            return 0.0
+        cache = self._cache
+        if self.negation_window <= 0:
+            total = 0.0
+            for w in words:
+                v = cache.get(w)
+                total += v if v is not None else self.word_weight(w)
+            return total / len(words)
+
+        total = 0.0
+        last_negator = -self.negation_window - 1
+        for i, w in enumerate(words):
+            if w in self.negators:
+                last_negator = i
+                continue
+            v = self.word_weight(w)
+            if v and i - last_negator <= self.negation_window:
+                v = -v
+            total += v
+        return total / len(words)
+
+    def score_batch(self, texts: Iterable[Optional[str]]) -> List[float]:
+        return [self.score(t) for t in texts]
@@ -3,8 +3,21 @@ import argparse
 import csv
 import json
 import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, Iterator, List, Optional
+
+from claim_extractor import ClaimExtractor
+from profiling import Profiler, active as active_profiler, add_profile_arguments, phase, profile_session, timed_iter
+from roster import EntityMatcher, Roster
+from run_log import iter_lines
+from run_store import connect as connect_store, is_store_path, iter_runs as iter_store_runs
+
+DEFAULT_CHUNK_LINES = 500
+EXTRACTORS = ("legacy", "single-pass")
+METRICS = ("goals", "assists", "shots", "turnovers")
 
 # ---------------------
 # Utility
@@ -18,24 +31,108 @@ def to_int(val):
 # ---------------------
 # Claim Patterns
 # ---------------------
-NUMERIC_PATTERNS = [
-    (re.compile(r"(Player [ABC])\s+(?:scor(?:ed|es)|has)\s+(\d+)\s+goals?", re.IGNORECASE), "HAS_GOALS"),
-    (re.compile(r"(Player [ABC])\s+has\s+(\d+)\s+assists?", re.IGNORECASE), "HAS_ASSISTS"),
-    (re.compile(r"(Player [ABC])\s+has\s+(\d+)\s+shots?", re.IGNORECASE), "HAS_SHOTS"),
-    (re.compile(r"(Player [ABC])\s+has\s+(\d+)\s+turnovers?", re.IGNORECASE), "HAS_TURNOVERS"),
+# "{entity}" is replaced by the roster matcher's pattern (one capturing group:
+# the player as written, optionally followed by a parenthesized alias).
+NUMERIC_CLAIM_TEMPLATES = [
+    (r"{entity}\s+(?:scor(?:ed|es)|has)\s+(\d+)\s+goals?", "HAS_GOALS"),
+    (r"{entity}\s+has\s+(\d+)\s+assists?", "HAS_ASSISTS"),
+    (r"{entity}\s+has\s+(\d+)\s+shots?", "HAS_SHOTS"),
+    (r"{entity}\s+has\s+(\d+)\s+turnovers?", "HAS_TURNOVERS"),
 ]
 
-COMPARATIVE_PATTERNS = [
-    (re.compile(r"(Player [ABC]).*most assists", re.IGNORECASE), "MOST_ASSISTS"),
-    (re.compile(r"(Player [ABC]).*most shots", re.IGNORECASE), "MOST_SHOTS"),
-    (re.compile(r"(Player [ABC]).*most turnovers|highest number of turnovers", re.IGNORECASE), "MOST_TURNOVERS"),
-    (re.compile(r"(Player [ABC]).*least goals", re.IGNORECASE), "LEAST_GOALS"),
+COMPARATIVE_CLAIM_TEMPLATES = [
+    (r"{entity}.*most assists", "MOST_ASSISTS"),
+    (r"{entity}.*most shots", "MOST_SHOTS"),
+    (r"{entity}.*most turnovers|highest number of turnovers", "MOST_TURNOVERS"),
+    (r"{entity}.*least goals", "LEAST_GOALS"),
 ]
 
+
+def build_claim_patterns(matcher: EntityMatcher, templates):
+    return [(re.compile(t.replace("{entity}", matcher.pattern), re.IGNORECASE), ctype) for t, ctype in templates]
+
+
+class ClaimPatterns:
+    """The legacy claim patterns and the single-pass extractor for one roster."""
+
+    def __init__(self, matcher: EntityMatcher):
+        self.numeric = build_claim_patterns(matcher, NUMERIC_CLAIM_TEMPLATES)
+        self.comparative = build_claim_patterns(matcher, COMPARATIVE_CLAIM_TEMPLATES)
+        self.single_pass = ClaimExtractor(matcher)
+
+
+def configure_claim_patterns(matcher: EntityMatcher):
+    """
+    Rebuild the default NUMERIC_PATTERNS / COMPARATIVE_PATTERNS (and single-pass extractor)
+    used when extract_claims gets no patterns. Ground truth carries its own (GroundTruth.claim_patterns).
+    """
+    global DEFAULT_CLAIM_PATTERNS, NUMERIC_PATTERNS, COMPARATIVE_PATTERNS, SINGLE_PASS_EXTRACTOR
+    DEFAULT_CLAIM_PATTERNS = ClaimPatterns(matcher)
+    NUMERIC_PATTERNS = DEFAULT_CLAIM_PATTERNS.numeric
+    COMPARATIVE_PATTERNS = DEFAULT_CLAIM_PATTERNS.comparative
+    SINGLE_PASS_EXTRACTOR = DEFAULT_CLAIM_PATTERNS.single_pass
+
+
+def configure_extractor(name: str):
+    """Select the claim extractor used by extract_claims: "legacy" (the patterns) or "single-pass" (claim_extractor.py)."""
+    global EXTRACTOR
+    if name not in EXTRACTORS:
+        raise ValueError(f"extractor must be one of {EXTRACTORS}, got {name!r}")
+    EXTRACTOR = name
+
+
+DEFAULT_CLAIM_PATTERNS = None
+NUMERIC_PATTERNS = []
+COMPARATIVE_PATTERNS = []
+SINGLE_PASS_EXTRACTOR = None
+EXTRACTOR = "legacy"
+configure_claim_patterns(Roster.default().matcher())
+
 # ---------------------
 # Load Ground Truth
 # ---------------------
-def load_ground_truth(csv_path: Path) -> Dict[str, Dict[str, Any]]:
+def build_gt_index(gt: Dict[str, Dict[str, Any]]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Per-metric index over the ground truth: max/min values, the players attaining
+    them (argmax/argmin, in ground-truth order) and each player's rank (1 = highest).
+    """
+    index = {}
+    for metric in METRICS:
+        values = [(p, to_int(v.get(metric))) for p, v in gt.items() if v.get(metric) is not None]
+        values = [(p, v) for p, v in values if v is not None]
+        if not values:
+            index[metric] = None
+            continue
+        hi = max(v for _, v in values)
+        lo = min(v for _, v in values)
+        rank = {v: i + 1 for i, v in enumerate(sorted({v for _, v in values}, reverse=True))}
+        argmax = [p for p, v in values if v == hi]
+        argmin = [p for p, v in values if v == lo]
+        index[metric] = {
+            "max": hi, "min": lo,
+            "argmax": argmax, "argmin": argmin,
+            "argmax_set": frozenset(argmax), "argmin_set": frozenset(argmin),
+            "ranks": {p: rank[v] for p, v in values},
+        }
+    return index
+
+
+class GroundTruth(dict):
+    """
+    player -> parsed stats, as before, plus what claim validation needs precomputed once:
+    `index` (see build_gt_index), `matcher` resolving labels/aliases to player keys and
+    `claim_patterns` (ClaimPatterns) extracting claims about these players.
+    """
+
+    def __init__(self, rows: Dict[str, Dict[str, Any]], roster: Optional[Roster] = None):
+        super().__init__(rows)
+        players = Roster.from_labels(self.keys())
+        self.matcher = (players.merged(roster) if roster else players).matcher()
+        self.index = build_gt_index(self)
+        self.claim_patterns = ClaimPatterns(self.matcher)
+
+
+def load_ground_truth(csv_path: Path, roster: Optional[Roster] = None) -> Dict[str, Dict[str, Any]]:
     gt = {}
     with open(csv_path, newline="", encoding="utf8") as f:
         reader = csv.DictReader(f)
@@ -80,20 +177,27 @@ def load_ground_truth(csv_path: Path) -> Dict[str, Dict[str, Any]]:
 
             gt[player.strip()] = parsed
 
-    return gt
+    return GroundTruth(gt, roster)
 
 
 # ---------------------
 # Extract Claims
 # ---------------------
-def extract_claims(response_text: str) -> List[Dict[str, Any]]:
+def extract_claims(response_text: str, patterns: Optional[ClaimPatterns] = None) -> List[Dict[str, Any]]:
+    """Claims in a response, with `patterns` (a roster's ClaimPatterns; default Player A/B/C) and EXTRACTOR."""
+    if EXTRACTOR == "single-pass":
+        return (patterns.single_pass if patterns else SINGLE_PASS_EXTRACTOR).extract(response_text)
+    return extract_claims_legacy(response_text, patterns)
+
+
+def extract_claims_legacy(response_text: str, patterns: Optional[ClaimPatterns] = None) -> List[Dict[str, Any]]:
     claims = []
     # numeric claims
-    for pattern, ctype in NUMERIC_PATTERNS:
+    for pattern, ctype in (patterns.numeric if patterns else NUMERIC_PATTERNS):
         for m in pattern.finditer(response_text):
             claims.append({"claim_type": ctype, "claim_text": m.group(0), "groups": list(m.groups())})
     # comparative claims
-    for pattern, ctype in COMPARATIVE_PATTERNS:
+    for pattern, ctype in (patterns.comparative if patterns else COMPARATIVE_PATTERNS):
         for m in pattern.finditer(response_text):
             player_name = m.group(1).strip() if m.group(1) else None
             claims.append({"claim_type": ctype, "claim_text": m.group(0), "groups": [player_name] if player_name else []})
@@ -108,9 +212,11 @@ def validate_claim(claim: Dict[str, Any], gt: Dict[str, Dict[str, Any]]) -> Dict
     status = "unverifiable"
     evidence = None
 
-    # safely extract player if present
+    # safely extract player if present, resolving aliases to the ground-truth key
     player_raw = groups[0] if len(groups) > 0 else None
     player = player_raw.strip() if player_raw else None
+    if player and isinstance(gt, GroundTruth):
+        player = gt.matcher.canonical(player) or player
 
     try:
         # Numeric claims
@@ -147,19 +253,20 @@ def validate_claim(claim: Dict[str, Any], gt: Dict[str, Dict[str, Any]]) -> Dict
             }
 
             metric = metric_map[ctype]
-            # collect all players that have a numeric value for this metric
-            values = [(p, to_int(v.get(metric))) for p, v in gt.items() if v.get(metric) is not None]
+            entry = (gt.index if isinstance(gt, GroundTruth) else build_gt_index(gt)).get(metric)
 
-            if values:
-                # max for MOST_*, min for LEAST_GOALS
-                comp_val = min([v for _, v in values]) if ctype == "LEAST_GOALS" else max([v for _, v in values])
-                comp_players = [p for p, v in values if v == comp_val]
+            if entry:
+                # min for LEAST_GOALS, max for MOST_*
+                if ctype == "LEAST_GOALS":
+                    comp_val, comp_players, comp_set = entry["min"], entry["argmin"], entry["argmin_set"]
+                else:
+                    comp_val, comp_players, comp_set = entry["max"], entry["argmax"], entry["argmax_set"]
 
                 if player:
-                    status = "true" if player in comp_players else "false"
+                    status = "true" if player in comp_set else "false"
                 else:
                     status = "unverifiable"
-                evidence = {"metric": metric, "value": comp_val, "players": comp_players}
+                evidence = {"metric": metric, "value": comp_val, "players": list(comp_players)}
             else:
                 status = "unverifiable"
                 evidence = {"error": "No valid numeric data in ground truth"}
@@ -170,34 +277,165 @@ def validate_claim(claim: Dict[str, Any], gt: Dict[str, Dict[str, Any]]) -> Dict
 
     return {"claim": claim, "validation": {"status": status, "evidence": evidence}}
 
+# ---------------------
+# Per-run processing
+# ---------------------
+def validate_run(run: Dict[str, Any], gt: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    resp = run.get("response_text") or ""
+    with phase("extract_claims"):
+        claims = extract_claims(resp, gt.claim_patterns if isinstance(gt, GroundTruth) else None)
+    with phase("validate_claim"):
+        validations = [validate_claim(c, gt) for c in claims]
+    return {
+        "run_id": run.get("run_id"),
+        "prompt_id": run.get("prompt_id"),
+        "model": run.get("model"),
+        "provider": run.get("model_provider"),
+        "response_text": resp,
+        "claims_extracted": claims,
+        "validations": validations
+    }
+
+
+def validate_lines(lines: Iterable[str], gt: Dict[str, Dict[str, Any]]) -> List[str]:
+    out = []
+    for line in lines:
+        with phase("load_runs"):
+            run = json.loads(line)
+        result = validate_run(run, gt)
+        with phase("output"):
+            out.append(json.dumps(result, ensure_ascii=False) + "\n")
+    return out
+
+
+# ---------------------
+# Multi-process mode
+# ---------------------
+_WORKER_GT = None
+
+
+def load_inputs(gt_path: Path, roster_path: Optional[Path] = None) -> GroundTruth:
+    """Load the ground truth (plus optional roster aliases), with claim patterns for its players."""
+    with phase("load_ground_truth"):
+        roster = Roster.from_csv(roster_path) if roster_path else None
+        gt = load_ground_truth(gt_path, roster)
+    return gt
+
+
+def _init_worker(gt_path: str, roster_path: Optional[str], profile_mode: Optional[str] = None,
+                 extractor: str = "legacy"):
+    # ground truth is loaded once per worker process instead of being pickled per task
+    global _WORKER_GT
+    if profile_mode:
+        Profiler(profile_mode).start()
+    configure_extractor(extractor)
+    _WORKER_GT = load_inputs(Path(gt_path), Path(roster_path) if roster_path else None)
+
+
+def _validate_chunk(lines: List[str]):
+    # with profiling on, each chunk carries the worker's phase totals since the previous one
+    out = validate_lines(lines, _WORKER_GT)
+    prof = active_profiler()
+    return out, prof.drain() if prof else None
+
+
+STORE_FIELDS = ("run_id", "prompt_id", "model", "model_provider", "response_text")
+
+
+def iter_store_lines(db_path: Path) -> Iterator[str]:
+    """Runs from a run_store.py database as NDJSON lines holding only the fields validation uses."""
+    conn = connect_store(db_path, readonly=True)
+    try:
+        for rows in iter_store_runs(conn, STORE_FIELDS):
+            for row in rows:
+                yield json.dumps(dict(zip(STORE_FIELDS, row)), ensure_ascii=False)
+    finally:
+        conn.close()
+
+
+def iter_run_lines(runs_path: Path, decode_workers: int = 1) -> Iterator[str]:
+    """Run lines from an NDJSON log, a compressed run log (run_log.py) or a run store."""
+    if is_store_path(runs_path):
+        yield from iter_store_lines(runs_path)
+        return
+    yield from iter_lines(runs_path, decode_workers)
+
+
+def _chunks(lines: Iterable[str], size: int) -> Iterator[List[str]]:
+    it = iter(lines)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_parallel(lines: Iterable[str], gt_path: Path, workers: int, chunk_lines: int = DEFAULT_CHUNK_LINES,
+                      roster_path: Optional[Path] = None) -> Iterator[List[str]]:
+    """
+    Validate chunks of run lines in a process pool, yielding output chunks in input
+    order. At most 2 x workers chunks are in flight, so memory stays bounded. Under an
+    active profiler the workers' phase times are merged in (summed across workers).
+    """
+    prof = active_profiler()
+
+    def result(future):
+        out, phases = future.result()
+        if phases and prof is not None:
+            prof.merge(phases)
+        return out
+
+    initargs = (str(gt_path), str(roster_path) if roster_path else None, prof.mode if prof else None, EXTRACTOR)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=initargs) as pool:
+        pending = deque()
+        for chunk in _chunks(lines, chunk_lines):
+            pending.append(pool.submit(_validate_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield result(pending.popleft())
+        while pending:
+            yield result(pending.popleft())
+
+
 # ---------------------
 # Main Script
 # ---------------------
-def main():
+def main(argv=None):
     parser = argparse.ArgumentParser()
     parser.add_argument("--gt", required=True, help="Ground truth CSV file path")
-    parser.add_argument("--runs", required=True, help="NDJSON runs file")
+    parser.add_argument("--runs", required=True, help="NDJSON runs file (.gz/.zst run_log.py logs and run_store.py SQLite stores too)")
     parser.add_argument("--out", required=True, help="Output NDJSON claims validation file")
-    args = parser.parse_args()
+    parser.add_argument("--roster", default=None, help="Optional roster CSV (label,aliases) adding player aliases")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes (output order matches input)")
+    parser.add_argument("--extractor", choices=EXTRACTORS, default="legacy",
+                        help="Claim extractor: the legacy per-pattern regexes or the sentence-level single pass "
+                             "(claim_extractor.py)")
+    parser.add_argument("--chunk-lines", type=int, default=DEFAULT_CHUNK_LINES, help="Runs per task in multi-process mode")
+    add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    configure_extractor(args.extractor)
 
-    gt = load_ground_truth(Path(args.gt))
-
-    with open(args.runs, "r", encoding="utf8") as fh_in, open(args.out, "w", encoding="utf8") as fh_out:
-        for line in fh_in:
-            run = json.loads(line)
-            resp = run.get("response_text") or ""
-            claims = extract_claims(resp)
-            validations = [validate_claim(c, gt) for c in claims]
-            result = {
-                "run_id": run.get("run_id"),
-                "prompt_id": run.get("prompt_id"),
-                "model": run.get("model"),
-                "provider": run.get("model_provider"),
-                "response_text": resp,
-                "claims_extracted": claims,
-                "validations": validations
-            }
-            fh_out.write(json.dumps(result, ensure_ascii=False) + "\n")
+    roster_path = Path(args.roster) if args.roster else None
+    with profile_session(args, Path(args.out + ".profile.json"), "validate_claims") as prof, \
+            open(args.out, "w", encoding="utf8") as fh_out:
+        # reading the input is timed as load_runs; with --workers the worker phases are summed across processes
+        lines = timed_iter(iter_run_lines(Path(args.runs), args.workers), "load_runs")
+        records = 0
+        if args.workers > 1:
+            for out_lines in validate_parallel(lines, Path(args.gt), args.workers, args.chunk_lines, roster_path):
+                with phase("output"):
+                    fh_out.writelines(out_lines)
+                records += len(out_lines)
+        else:
+            gt = load_inputs(Path(args.gt), roster_path)
+            for line in lines:
+                with phase("load_runs"):
+                    run = json.loads(line)
+                result = validate_run(run, gt)
+                with phase("output"):
+                    fh_out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                records += 1
+        if prof is not None:
+            prof.extra.update({"records": records, "workers": args.workers})
 
     print(f"Validations written to {args.out}")
 
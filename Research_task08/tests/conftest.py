@@ -0,0 +1,30 @@
+import sys
+import threading
+from pathlib import Path
+
+import pytest
+
+# the scripts import each other as top-level modules
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+
+@pytest.fixture
+def close_within():
+    """close() `obj` on a thread; fail if it has not returned after `seconds`. Returns what it raised."""
+
+    def run(obj, seconds: float = 10.0):
+        errors = []
+
+        def target():
+            try:
+                obj.close()
+            except BaseException as e:
+                errors.append(e)
+
+        t = threading.Thread(target=target, daemon=True)
+        t.start()
+        t.join(seconds)
+        assert not t.is_alive(), "close() did not return"
+        return errors
+
+    return run
@@ -0,0 +1,36 @@
+import json
+from pathlib import Path
+
+from batch_mode import ingest_batch_results
+from run_experiment import METRIC_FIELDS, make_record
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "batch"
+
+
+def test_ingest_fixture_results(tmp_path):
+    out = tmp_path / "runs.ndjson"
+    counts = ingest_batch_results(FIXTURES, [FIXTURES / "output.jsonl", FIXTURES / "errors.jsonl"], out)
+    assert counts == {"written": 3, "errors": 1, "unknown": 1, "duplicates": 1, "missing": 1}
+
+    records = [json.loads(line) for line in out.read_text(encoding="utf8").splitlines()]
+    schema = list(make_record("", "", {}, "", "", 0.0, 0, None, None, "", metrics={}))
+    assert all(list(r) == schema for r in records)
+    assert set(METRIC_FIELDS) <= set(schema)
+
+    by_cell = {(r["prompt_id"], r["replicate"]): r for r in records}
+    first = by_cell[("H1_neg", 0)]
+    # the first result for a cell wins over its duplicate
+    assert first["response_text"] == "Player A has 3 goals." and first["notes"] == ""
+    assert first["prompt_text"] == "Summarize Player A's game."
+    assert (first["response_tokens"], first["prompt_tokens"], first["cached_tokens"]) == (29, 20, 16)
+    assert first["timestamp_utc"] == "2025-10-09T08:53:20Z"
+    failed = by_cell[("H1_neg", 1)]
+    assert failed["response_text"] is None and failed["notes"].startswith("error:")
+    assert "server_error" in failed["notes"]
+    assert ("H1_pos", 1) not in by_cell
+
+    # re-ingesting gives the same run_ids
+    again = tmp_path / "again.ndjson"
+    ingest_batch_results(FIXTURES, [FIXTURES / "output.jsonl", FIXTURES / "errors.jsonl"], again)
+    assert [json.loads(line)["run_id"] for line in again.read_text(encoding="utf8").splitlines()] == \
+        [r["run_id"] for r in records]
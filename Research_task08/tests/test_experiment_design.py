@@ -0,0 +1,24 @@
+from experiment_design import main
+
+
+def test_overwrite_removes_stale_txt(tmp_path):
+    out = tmp_path / "prompts"
+    main(["--outdir", str(out), "--factorial", "--templates", "H1_neg,H1_pos", "--label-schemes", "letters",
+          "--max-orders", "2"])
+    first = {p.name for p in out.glob("*.txt")}
+    (out / "notes.txt").write_text("not a prompt")
+
+    main(["--outdir", str(out), "--factorial", "--templates", "H1_neg", "--label-schemes", "letters",
+          "--max-orders", "1", "--overwrite"])
+    ids = {line.split('"prompt_id": "')[1].split('"')[0]
+           for shard in out.glob("prompts-*.jsonl") for line in shard.read_text(encoding="utf8").splitlines()}
+    assert {p.name for p in out.glob("*.txt")} == {f"{pid}.txt" for pid in ids} | {"notes.txt"}
+    assert len(ids) < len(first)
+
+
+def test_overwrite_default_design_keeps_other_txt(tmp_path):
+    out = tmp_path / "prompts"
+    main(["--outdir", str(out)])
+    (out / "H9_old.txt").write_text("left by hand")
+    main(["--outdir", str(out), "--overwrite"])
+    assert (out / "H9_old.txt").exists() and (out / "H1_neg.txt").exists()
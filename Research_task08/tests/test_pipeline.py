@@ -0,0 +1,16 @@
+from pipeline import StreamingPipeline
+from validate_claims import GroundTruth
+
+
+def test_close_reraises_error_in_final_report(tmp_path, close_within):
+    pipeline = StreamingPipeline(tmp_path / "live", GroundTruth({"Player A": {"goals": 1}}), report_interval=60.0)
+
+    def fail():
+        raise OSError(28, "No space left on device")
+
+    # with a 60s interval the only report is the final one, after close() queued the stop marker
+    pipeline.write_reports = fail
+    pipeline.submit({"run_id": "r1", "prompt_id": "H1_neg", "model_provider": "mock", "model": "m",
+                     "response_text": "Player A has 1 goals."})
+    errors = close_within(pipeline)
+    assert len(errors) == 1 and isinstance(errors[0], OSError)
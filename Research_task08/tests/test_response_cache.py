@@ -0,0 +1,27 @@
+import run_experiment
+from response_cache import ResponseCache, request_key
+
+
+def _key(provider: str) -> str:
+    name, endpoint = run_experiment.cache_identity(provider)
+    return request_key(name, "gpt-4", "p", 0.0, 512, 0, endpoint=endpoint)
+
+
+def test_key_separates_endpoints_and_merges_aliases(monkeypatch):
+    monkeypatch.delenv("OPENAI_BASE_URL", raising=False)
+    monkeypatch.setattr(run_experiment, "OPENAI_CLIENT_CONFIG", {})
+    real = _key("openai")
+    assert _key("GPT") == real
+    # keys for the default endpoint are what they were before endpoints were keyed
+    assert real == request_key("openai", "gpt-4", "p", 0.0, 512, 0)
+    monkeypatch.setattr(run_experiment, "OPENAI_CLIENT_CONFIG", {"base_url": "http://127.0.0.1:8000/v1"})
+    assert _key("openai") != real
+
+
+def test_max_entries_enforced_during_a_run(tmp_path):
+    cache = ResponseCache(tmp_path / "cache.sqlite", max_entries=16)
+    for i in range(100):
+        cache.put(f"k{i}", {"text": str(i)})
+        assert len(cache) <= 16 + 16 // 8
+    assert cache.get("k99") == {"text": "99"}
+    cache.close()
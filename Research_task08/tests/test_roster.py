@@ -0,0 +1,15 @@
+from roster import Roster
+from validate_claims import GroundTruth, validate_run
+
+
+def test_labels_ending_in_punctuation_match():
+    matcher = Roster({"Smith Jr.": ["J. Smith"], "O'Neal Sr.": [], "Player A": []}).matcher()
+    text = "Smith Jr. has 3 goals, O'Neal Sr.'s defense held, and J. Smith (Smith Jr.) led. Player AB is no one."
+    assert matcher.find_all(text) == ["Smith Jr.", "O'Neal Sr.", "Smith Jr."]
+    assert matcher.find_all("Player A's assists") == ["Player A"]
+
+
+def test_punctuated_label_is_validated():
+    gt = GroundTruth({"Smith Jr.": {"goals": 3}, "Player A": {"goals": 1}})
+    result = validate_run({"response_text": "Smith Jr. has 3 goals."}, gt)
+    assert [v["validation"]["status"] for v in result["validations"]] == ["true"]
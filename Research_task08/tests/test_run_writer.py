@@ -0,0 +1,14 @@
+from run_writer import RecordWriter
+
+
+def test_close_reraises_error_in_final_flush(tmp_path, close_within):
+    writer = RecordWriter(tmp_path / "runs.ndjson", flush_interval=60.0)
+
+    def fail():
+        raise OSError(28, "No space left on device")
+
+    # with a 60s interval the only flush is the final one, after close() queued the stop marker
+    writer._fh.flush = fail
+    writer.write({"run_id": "r1", "prompt_id": "p1"})
+    errors = close_within(writer)
+    assert len(errors) == 1 and isinstance(errors[0], OSError)